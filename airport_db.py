@@ -0,0 +1,318 @@
+"""
+Airport database of external region packs
+
+Airports live in JSON region packs under airports/ (one airport per line),
+described by airports/index.json: the packs with their airport counts and
+a prebuilt ICAO -> region index. Packs are loaded lazily, so looking up
+one airport reads only its region. A parsed pack is cached next to the
+packs in marshal form, keyed by the pack's size and mtime, and so is the
+index; later loads skip JSON parsing entirely. ``build`` precompiles them,
+e.g. before deploying to a read-only location.
+
+Airports with coordinates (latitude/longitude, as written by
+airport_import.py) are also reachable through a grid spatial index, so
+airports can be selected by region, country or distance from a point.
+
+    python airport_db.py build      # rebuild index.json and the compiled cache after editing packs
+    python airport_db.py info
+"""
+import argparse
+import json
+import marshal
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+AIRPORT_PACKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "airports")
+INDEX_FILE = "index.json"
+CACHE_DIR = "__cache__"
+
+# Version of the compiled cache; bump when its layout changes
+_CACHE_VERSION = 1
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class SpatialIndex:
+    """Grid of airports in cells of ``cell_deg`` degrees; airports without coordinates are left out."""
+
+    def __init__(self, airports: Iterable[Dict], cell_deg: float = 1.0):
+        self.cell_deg = cell_deg
+        self._columns = int(math.ceil(360 / cell_deg))
+        self._cells: Dict[Tuple[int, int], List[Dict]] = {}
+        self._count = 0
+        for airport in airports:
+            if airport.get("latitude") is None or airport.get("longitude") is None:
+                continue
+            key = (self._row(airport["latitude"]), self._column(airport["longitude"]))
+            self._cells.setdefault(key, []).append(airport)
+            self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _row(self, lat: float) -> int:
+        return int(math.floor(lat / self.cell_deg))
+
+    def _column(self, lon: float) -> int:
+        return min(int(math.floor((lon + 180) / self.cell_deg)), self._columns - 1)
+
+    def within_box(self, south: float, west: float, north: float, east: float) -> List[Dict]:
+        """Airports inside a latitude/longitude box; west > east crosses the antimeridian."""
+        first, last = self._column(west), self._column(east)
+        if west <= east:
+            columns = range(first, last + 1)
+        else:
+            columns = [*range(first, self._columns), *range(0, last + 1)]
+        found = []
+        for row in range(self._row(max(south, -90.0)), self._row(min(north, 90.0)) + 1):
+            for column in columns:
+                for airport in self._cells.get((row, column), ()):
+                    lat, lon = airport["latitude"], airport["longitude"]
+                    inside = west <= lon <= east if west <= east else lon >= west or lon <= east
+                    if south <= lat <= north and inside:
+                        found.append(airport)
+        return found
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        """Airports within ``radius_km`` of a point, nearest first."""
+        dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+        south, north = lat - dlat, lat + dlat
+        cos_lat = math.cos(math.radians(lat))
+        if north >= 90 or south <= -90 or dlat / max(cos_lat, 1e-9) >= 180:
+            west, east = -180.0, 180.0  # the circle reaches a pole or spans all longitudes
+        else:
+            dlon = dlat / cos_lat
+            west = (lon - dlon + 180) % 360 - 180
+            east = (lon + dlon + 180) % 360 - 180
+        candidates = ((distance_km(lat, lon, a["latitude"], a["longitude"]), a)
+                      for a in self.within_box(south, west, north, east))
+        return [a for d, a in sorted((c for c in candidates if c[0] <= radius_km),
+                                     key=lambda c: c[0])]
+
+
+class AirportDatabase:
+    """Region packs with an ICAO index; each pack is loaded on first use."""
+
+    def __init__(self, directory: str = AIRPORT_PACKS_DIR):
+        self.directory = directory
+        index = self._load(INDEX_FILE)
+        self._packs: Dict[str, Dict] = index["regions"]
+        self._icao: Dict[str, str] = index["icao"]
+        self._regions: Dict[str, List[Dict]] = {}
+        self._by_icao: Dict[str, Dict] = {}
+        self._spatial: Optional[SpatialIndex] = None
+        self._lock = threading.Lock()
+
+    def regions(self) -> List[str]:
+        return list(self._packs)
+
+    def region(self, name: str) -> List[Dict]:
+        """Airports of one region pack, loaded on first use."""
+        airports = self._regions.get(name)
+        if airports is None:
+            if name not in self._packs:
+                raise KeyError(f"Unknown airport region: {name}")
+            with self._lock:
+                airports = self._regions.get(name)
+                if airports is None:
+                    airports = self._load(self._packs[name]["file"])
+                    self._by_icao.update((a["icao"], a) for a in airports)
+                    self._regions[name] = airports
+        return airports
+
+    def airports(self, regions: Optional[Iterable[str]] = None) -> List[Dict]:
+        """Airports of the given regions (all regions by default), in pack order."""
+        return [airport for name in (self.regions() if regions is None else regions)
+                for airport in self.region(name)]
+
+    def get(self, icao: str) -> Optional[Dict]:
+        """Airport by ICAO code; loads only the pack that holds it."""
+        region = self._icao.get(icao.upper())
+        if region is None:
+            return None
+        self.region(region)
+        return self._by_icao[icao.upper()]
+
+    def country(self, code: str) -> List[Dict]:
+        """Airports of one country (ISO code); loads only the packs listing it."""
+        code = code.upper()
+        return [airport for name, pack in self._packs.items()
+                if code in pack.get("countries", (code,))
+                for airport in self.region(name) if airport.get("country") == code]
+
+    def spatial_index(self) -> SpatialIndex:
+        """Spatial index over all packs, built on first use."""
+        if self._spatial is None:
+            self._spatial = SpatialIndex(self.airports())
+        return self._spatial
+
+    def near(self, lat: float, lon: float, radius_km: float) -> List[Dict]:
+        """Airports within ``radius_km`` of a point, nearest first."""
+        return self.spatial_index().within(lat, lon, radius_km)
+
+    def select(self, regions: Optional[Iterable[str]] = None,
+               countries: Optional[Iterable[str]] = None,
+               near: Optional[Tuple[float, float]] = None,
+               radius_km: float = 250.0) -> List[Dict]:
+        """Airports of the given regions and countries, limited to ``radius_km``
+        around ``near`` when it is given; no regions or countries means all.
+        Raises ValueError for ``near`` when none of those airports has coordinates.
+        """
+        if regions is None and countries is None:
+            selected = None if near is not None else self.airports()
+        else:
+            selected = self.airports(regions or ())
+            for code in countries or ():
+                selected += self.country(code)
+        if near is not None:
+            candidates = self.airports() if selected is None else selected
+            if not any(a.get("latitude") is not None for a in candidates):
+                raise ValueError("The selected airports have no coordinates; selecting near a point "
+                                 "needs region packs from airport_import.py")
+            nearby = self.near(near[0], near[1], radius_km)
+            if selected is not None:
+                chosen = {id(airport) for airport in selected}
+                nearby = [airport for airport in nearby if id(airport) in chosen]
+            selected = nearby
+        # A country can also be covered by a selected region
+        unique = {airport["icao"]: airport for airport in selected}
+        return list(unique.values())
+
+    def __contains__(self, icao: str) -> bool:
+        return icao.upper() in self._icao
+
+    def __len__(self) -> int:
+        return len(self._icao)
+
+    def _load(self, filename: str):
+        """Parse a pack or the index, through its compiled cache when that is current."""
+        path = os.path.join(self.directory, filename)
+        stat = os.stat(path)
+        key = (_CACHE_VERSION, stat.st_size, stat.st_mtime_ns)
+        cache_path = os.path.join(self.directory, CACHE_DIR, filename + ".marshal")
+        try:
+            with open(cache_path, "rb") as f:
+                # loads() of the whole file; load() reads a file object piecewise
+                cached_key, parsed = marshal.loads(f.read())
+            if tuple(cached_key) == key:
+                return parsed
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        with open(path, encoding="utf-8") as f:
+            parsed = json.load(f)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump((key, parsed), f)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # a read-only install parses the JSON every time
+        return parsed
+
+
+_default: Optional[AirportDatabase] = None
+
+
+def default_database() -> AirportDatabase:
+    """The shared database of the bundled region packs."""
+    global _default
+    if _default is None:
+        _default = AirportDatabase()
+    return _default
+
+
+def write_pack(path: str, airports: List[Dict]) -> None:
+    """Write a region pack as a JSON array with one airport per line."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(json.dumps(a, ensure_ascii=False, separators=(",", ":"))
+                           for a in airports))
+        f.write("\n]\n")
+
+
+def compile_packs(directory: str = AIRPORT_PACKS_DIR) -> int:
+    """Write the compiled cache of the index and every pack; returns the airport count."""
+    return len(AirportDatabase(directory).airports())
+
+
+def build_index(directory: str = AIRPORT_PACKS_DIR, regions: Optional[Dict] = None) -> Dict:
+    """Rebuild index.json from the packs in ``directory``; duplicate ICAO codes are errors.
+    The packs of the existing index are kept (unless their file is gone) and new
+    ``<region>.json`` packs are added; ``regions`` ({name: {"file": ..., "name": ...}})
+    adds or replaces packs on top of that.
+    """
+    index_path = os.path.join(directory, INDEX_FILE)
+    try:
+        with open(index_path) as f:
+            existing = json.load(f)["regions"]
+    except FileNotFoundError:
+        existing = {}
+    merged = {name: pack for name, pack in existing.items()
+              if os.path.exists(os.path.join(directory, pack["file"]))}
+    # New packs are picked up as <region>.json
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json") and filename != INDEX_FILE:
+            name = filename[:-len(".json")].upper()
+            if all(pack["file"] != filename for pack in merged.values()):
+                merged[name] = {"file": filename}
+    for name, pack in (regions or {}).items():
+        # A replaced pack may have been listed under another name before
+        merged = {other: p for other, p in merged.items() if p["file"] != pack["file"]}
+        merged[name] = pack
+    regions = merged
+
+    icao: Dict[str, str] = {}
+    for name, pack in regions.items():
+        with open(os.path.join(directory, pack["file"]), encoding="utf-8") as f:
+            airports = json.load(f)
+        for airport in airports:
+            if airport["icao"] in icao:
+                raise ValueError(f"{airport['icao']} is in both {icao[airport['icao']]} and {name}")
+            icao[airport["icao"]] = name
+        pack["count"] = len(airports)
+        pack["countries"] = sorted({a["country"] for a in airports if a.get("country")})
+
+    index = {"regions": regions, "icao": icao}
+    with open(index_path, "w") as f:
+        json.dump(index, f, indent=1, ensure_ascii=False)
+        f.write("\n")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the airport region packs")
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--directory", default=AIRPORT_PACKS_DIR)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_index(args.directory)
+        compile_packs(args.directory)
+        print(f"✓ Indexed and compiled {len(index['icao'])} airports "
+              f"in {len(index['regions'])} region packs")
+        return
+
+    started = time.perf_counter()
+    database = AirportDatabase(args.directory)
+    airports = database.airports()
+    elapsed = time.perf_counter() - started
+    for name in database.regions():
+        print(f"  {name}: {len(database.region(name))} airports")
+    print(f"{len(airports)} airports loaded in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
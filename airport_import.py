@@ -0,0 +1,270 @@
+"""
+Offline import of OurAirports-style CSV dumps into airport region packs
+
+Reads airports.csv and runways.csv (plus airport-frequencies.csv and
+countries.csv when present) from a directory in one streaming pass each
+and writes one region pack per country, in the airport schema of the
+bundled packs plus latitude/longitude:
+
+- icao: icao_code, gps_code or ident, whichever is a four-letter code
+- runways: one entry per runway end; the heading follows the designator,
+  ends without a runway number are named after their true heading;
+  lengths in meters
+- ils: the dumps carry no ILS data, so paved, lighted runways of at least
+  ILS_MIN_LENGTH_M at medium and large airports are taken to have one
+- transition_altitude: per country (TRANSITION_ALTITUDES), at least
+  1000 ft above the airport rounded up to the next thousand
+- default_freq: the ATIS frequency, else tower
+
+Rows that do not validate are skipped and counted by reason.
+
+    python airport_import.py ~/ourairports --output airports_world
+    python airport_import.py ~/ourairports --countries FR IT --types large_airport
+"""
+import argparse
+import csv
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+from airport_db import build_index, compile_packs, write_pack
+from config import AIRPORT_IMPORT_DIR
+
+AIRPORT_TYPES = ("large_airport", "medium_airport")
+ILS_MIN_LENGTH_M = 1800
+DEFAULT_TRANSITION_ALTITUDE = 5000
+# Countries whose transition altitude differs from the default
+TRANSITION_ALTITUDES = {
+    "US": 18000, "CA": 18000, "MX": 18500, "AU": 10000, "NZ": 13000,
+    "GB": 6000, "IE": 5000, "NL": 3000, "BE": 4500, "ES": 6000, "IT": 6000,
+    "RU": 10000, "IN": 4000, "JP": 14000, "CN": 9800, "BR": 7000, "ZA": 8000,
+}
+
+_ICAO = re.compile(r"^[A-Z]{4}$")
+_DESIGNATOR = re.compile(r"^(0?[1-9]|[12][0-9]|3[0-6])([LCR]?)$")
+_PAVED = ("ASP", "CON", "PEM", "BIT", "TAR", "PAV", "ASF")
+_FREQUENCY_TYPES = ("ATIS", "TWR")
+
+
+def _read_rows(path: str) -> Iterator[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _number(value: Optional[str]) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def transition_altitude(country: str, elevation_ft: Optional[int]) -> int:
+    """Transition altitude of an airport from its country and elevation."""
+    altitude = TRANSITION_ALTITUDES.get(country, DEFAULT_TRANSITION_ALTITUDE)
+    if elevation_ft is not None:
+        altitude = max(altitude, int(math.ceil((elevation_ft + 1000) / 1000)) * 1000)
+    return altitude
+
+
+def runway_end(ident: str, heading_deg: Optional[float]) -> Optional[Dict]:
+    """Designator and heading of one runway end, or None if it has neither."""
+    match = _DESIGNATOR.match(ident.strip().upper())
+    if match:
+        number, side = int(match.group(1)), match.group(2)
+    elif heading_deg is not None:
+        # Ends named N, NE, ... get the designator of their true heading
+        number, side = int(round(heading_deg / 10)) % 36 or 36, ""
+    else:
+        return None
+    return {"designator": f"{number:02d}{side}", "heading": number * 10}
+
+
+class OurAirportsImporter:
+    """Streaming import of an OurAirports-style dump; see the module docstring."""
+
+    def __init__(self, directory: str, types=AIRPORT_TYPES, countries=None,
+                 ils_min_length_m: int = ILS_MIN_LENGTH_M):
+        self.directory = directory
+        self.types = set(types)
+        self.countries = {c.upper() for c in countries} if countries else None
+        self.ils_min_length_m = ils_min_length_m
+        self.skipped: Counter = Counter()
+        self.stats = {"airport_rows": 0, "runway_rows": 0, "airports": 0, "runways": 0}
+
+    def _path(self, name: str) -> Optional[str]:
+        path = os.path.join(self.directory, name)
+        return path if os.path.exists(path) else None
+
+    def _airport(self, row: Dict[str, str]) -> Optional[Dict]:
+        """Airport record of a CSV row, or None (counted in ``skipped``)."""
+        if row.get("type") not in self.types:
+            self.skipped["airport type"] += 1
+            return None
+        country = (row.get("iso_country") or "").upper()
+        if self.countries is not None and country not in self.countries:
+            self.skipped["country"] += 1
+            return None
+        icao = next((code for code in (row.get("icao_code"), row.get("gps_code"), row.get("ident"))
+                     if code and _ICAO.match(code.strip().upper())), None)
+        if icao is None:
+            self.skipped["no ICAO code"] += 1
+            return None
+        lat, lon = _number(row.get("latitude_deg")), _number(row.get("longitude_deg"))
+        if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            self.skipped["bad coordinates"] += 1
+            return None
+        if not row.get("name") or len(country) != 2:
+            self.skipped["missing name or country"] += 1
+            return None
+        elevation = _number(row.get("elevation_ft"))
+        elevation = int(round(elevation)) if elevation is not None else None
+        return {
+            "icao": icao.strip().upper(),
+            "name": row["name"].strip(),
+            "city": (row.get("municipality") or "").strip() or None,
+            "country": country,
+            "elevation_ft": elevation,
+            "transition_altitude": transition_altitude(country, elevation),
+            "default_freq": None,
+            "latitude": round(lat, 6),
+            "longitude": round(lon, 6),
+            "runways": []
+        }
+
+    def _runways(self, row: Dict[str, str], large: bool) -> List[Dict]:
+        """Runway ends of a CSV row, or [] (counted in ``skipped``)."""
+        if row.get("closed") == "1":
+            self.skipped["closed runway"] += 1
+            return []
+        length_ft = _number(row.get("length_ft"))
+        if not length_ft or length_ft <= 0:
+            self.skipped["runway without length"] += 1
+            return []
+        length_m = int(round(length_ft * 0.3048))
+        surface = (row.get("surface") or "").strip().upper()
+        ils = (large and row.get("lighted") == "1" and surface.startswith(_PAVED)
+               and length_m >= self.ils_min_length_m)
+        ends = []
+        for prefix in ("le", "he"):
+            end = runway_end(row.get(f"{prefix}_ident") or "",
+                             _number(row.get(f"{prefix}_heading_degT")))
+            if end is not None:
+                ends.append({**end, "length_m": length_m, "ils": ils})
+        if not ends:
+            self.skipped["runway without designator"] += 1
+        return ends
+
+    def read(self) -> List[Dict]:
+        """Read and validate the dump; returns airports that have at least one runway."""
+        airports_path = self._path("airports.csv")
+        runways_path = self._path("runways.csv")
+        if airports_path is None or runways_path is None:
+            raise FileNotFoundError(f"{self.directory} needs airports.csv and runways.csv")
+
+        # Rows are joined on the dump's ident, which differs from the ICAO code for some airports
+        airports: Dict[str, Dict] = {}
+        seen = set()
+        for row in _read_rows(airports_path):
+            self.stats["airport_rows"] += 1
+            airport = self._airport(row)
+            if airport is None:
+                continue
+            if airport["icao"] in seen:
+                self.skipped["duplicate ICAO code"] += 1
+                continue
+            seen.add(airport["icao"])
+            airport["_large"] = row["type"] != "small_airport"
+            airports[row["ident"]] = airport
+
+        for row in _read_rows(runways_path):
+            self.stats["runway_rows"] += 1
+            airport = airports.get(row.get("airport_ident"))
+            if airport is not None:
+                airport["runways"] += self._runways(row, airport["_large"])
+
+        frequencies_path = self._path("airport-frequencies.csv")
+        if frequencies_path is not None:
+            for row in _read_rows(frequencies_path):
+                airport = airports.get(row.get("airport_ident"))
+                kind = (row.get("type") or "").upper()
+                if airport is None or kind not in _FREQUENCY_TYPES or _number(row.get("frequency_mhz")) is None:
+                    continue
+                # An ATIS frequency wins over tower
+                if airport["default_freq"] is None or kind == "ATIS":
+                    airport["default_freq"] = f"{float(row['frequency_mhz']):.3f}"
+
+        result = []
+        for airport in airports.values():
+            del airport["_large"]
+            if not airport["runways"]:
+                self.skipped["no usable runway"] += 1
+                continue
+            result.append(airport)
+        self.stats["airports"] = len(result)
+        self.stats["runways"] = sum(len(a["runways"]) for a in result)
+        return result
+
+    def country_names(self) -> Dict[str, str]:
+        path = self._path("countries.csv")
+        if path is None:
+            return {}
+        return {row["code"]: row["name"] for row in _read_rows(path) if row.get("code")}
+
+    def write(self, output: str) -> Dict:
+        """Import the dump into one region pack per country in ``output``; returns the
+        index, which also lists the packs already in ``output``.
+        """
+        airports = self.read()
+        by_country: Dict[str, List[Dict]] = {}
+        for airport in airports:
+            by_country.setdefault(airport["country"], []).append(airport)
+        names = self.country_names()
+
+        os.makedirs(output, exist_ok=True)
+        regions = {}
+        for country in sorted(by_country):
+            filename = f"{country.lower()}.json"
+            write_pack(os.path.join(output, filename),
+                       sorted(by_country[country], key=lambda a: a["icao"]))
+            regions[country] = {"file": filename, "name": names.get(country, country)}
+        self.stats["packs"] = len(regions)
+        # Packs of earlier imports into ``output`` stay in the index
+        return build_index(output, regions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an OurAirports-style CSV dump into airport region packs")
+    parser.add_argument("directory", help="directory with airports.csv and runways.csv")
+    parser.add_argument("--output", default=AIRPORT_IMPORT_DIR, help="directory of the region packs")
+    parser.add_argument("--types", nargs="+", default=list(AIRPORT_TYPES),
+                        help="airport types to import (large_airport, medium_airport, small_airport)")
+    parser.add_argument("--countries", nargs="+", metavar="CODE", help="import only these countries")
+    parser.add_argument("--ils-min-length", type=int, default=ILS_MIN_LENGTH_M,
+                        help="shortest runway (m) assumed to have an ILS")
+    args = parser.parse_args()
+
+    print(f"✈️ Importing airports from {args.directory}...")
+    started = time.perf_counter()
+    importer = OurAirportsImporter(args.directory, types=args.types, countries=args.countries,
+                                   ils_min_length_m=args.ils_min_length)
+    index = importer.write(args.output)
+    elapsed = time.perf_counter() - started
+
+    stats = importer.stats
+    print(f"  Read {stats['airport_rows']} airport and {stats['runway_rows']} runway rows")
+    for reason, count in importer.skipped.most_common():
+        print(f"  ↷ Skipped {count}: {reason}")
+    print(f"  ✓ {stats['airports']} airports with {stats['runways']} runway ends "
+          f"in {stats['packs']} region packs ({elapsed:.2f}s); "
+          f"{len(index['regions'])} packs in the index")
+
+    # Precompile so the first generator run loads quickly
+    compile_packs(args.output)
+    print(f"  Packs written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
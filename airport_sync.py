@@ -0,0 +1,116 @@
+"""
+Incremental airport sync
+
+Every airport record is hashed, and the hash is stored with the airport in
+Directus (field sync_hash). A sync fetches only id, icao and sync_hash,
+inserts airports that are missing, and batch-PATCHes those whose hash
+differs, for example after a runway change in the airport data. Inserts
+and updates run concurrently in batches.
+
+The resulting ICAO -> id mapping is cached locally together with the
+hashes it was built from. While the local airport data is unchanged, a
+warm run takes the mapping from the cache without any request; pass
+refresh=True (main.py --refresh-airports) after changing airports in
+Directus by hand.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from config import AIRPORT_CACHE_PATH, AIRPORT_SYNC_BATCH_SIZE, AIRPORT_SYNC_CONCURRENCY
+from directus_client import DirectusClient
+
+
+def airport_record(airport: Dict) -> Dict:
+    """The airport fields stored in Directus, with the hash of their values."""
+    record = {
+        "icao": airport["icao"],
+        "name": airport["name"],
+        "city": airport.get("city"),
+        "country": airport.get("country"),
+        "elevation_ft": airport.get("elevation_ft"),
+        "transition_altitude": airport.get("transition_altitude", 5000),
+        "default_freq": airport.get("default_freq"),
+        "runways": airport.get("runways")
+    }
+    payload = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    record["sync_hash"] = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return record
+
+
+class AirportSync:
+    """Diff-based upload of airport records with a local ICAO -> id cache."""
+
+    def __init__(self, client: DirectusClient, cache_path: Optional[str] = AIRPORT_CACHE_PATH,
+                 batch_size: int = AIRPORT_SYNC_BATCH_SIZE,
+                 concurrency: int = AIRPORT_SYNC_CONCURRENCY):
+        self.client = client
+        self.cache_path = cache_path
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+
+    def _load_cache(self) -> Optional[Dict]:
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return cache if cache.get("base_url") == self.client.base_url else None
+
+    def _save_cache(self, hashes: Dict[str, str], mapping: Dict[str, int]) -> None:
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"base_url": self.client.base_url, "hashes": hashes, "mapping": mapping}, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def run(self, airports: List[Dict], refresh: bool = False) -> Dict[str, int]:
+        """Bring the airport collection up to date; returns ICAO -> Directus id."""
+        records = {airport["icao"]: airport_record(airport) for airport in airports}
+        hashes = {icao: record["sync_hash"] for icao, record in records.items()}
+
+        cache = None if refresh else self._load_cache()
+        if cache is not None and cache["hashes"] == hashes:
+            print(f"  ✓ Airports unchanged, using cached ids of {len(cache['mapping'])} airports")
+            return cache["mapping"]
+
+        remote = {row["icao"]: row for row in self.client.iter_items(
+            "airport", fields=["icao", "sync_hash"], page_size=5000) if row.get("icao")}
+        mapping = {icao: row["id"] for icao, row in remote.items()}
+        new = [record for icao, record in records.items() if icao not in remote]
+        changed = [{"id": remote[icao]["id"], **record} for icao, record in records.items()
+                   if icao in remote and remote[icao].get("sync_hash") != record["sync_hash"]]
+        if remote:
+            print(f"  Found {len(remote)} existing airports")
+
+        def insert(batch: List[Dict]) -> Optional[List[Dict]]:
+            return self.client.create_items("airport", batch, fields=("id", "icao"))
+
+        def update(batch: List[Dict]) -> bool:
+            return self.client.update_items("airport", batch)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            inserts = [pool.submit(insert, new[i:i + self.batch_size])
+                       for i in range(0, len(new), self.batch_size)]
+            updates = [pool.submit(update, changed[i:i + self.batch_size])
+                       for i in range(0, len(changed), self.batch_size)]
+            failed = 0
+            for future in inserts:
+                created = future.result()
+                if created is None:
+                    failed += 1
+                    continue
+                mapping.update((row["icao"], row["id"]) for row in created)
+            failed += sum(1 for future in updates if not future.result())
+
+        unchanged = len(records) - len(new) - len(changed)
+        print(f"  ✓ {len(new)} airports inserted, {len(changed)} updated, {unchanged} unchanged")
+        if failed:
+            print(f"  ✗ {failed} airport batches failed; the cache is not updated")
+        else:
+            self._save_cache(hashes, mapping)
+        return mapping
@@ -0,0 +1,195 @@
+"""
+Pre-generated ATIS pool for on-demand serving
+
+Keeps buffers of ready-rendered ATIS entries per difficulty and, once an
+airport has been requested, per (difficulty, airport). A request pops an
+entry from its buffer; a background thread refills every buffer that drops
+below its low-water mark, so generation stays off the request path. With an
+executor (the HTTP server passes its process pool) the refills are generated
+and rendered in the worker processes, and the thread only hands out the work,
+so the serving process keeps the GIL. An empty buffer falls back to
+generating synchronously, counted as a miss.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from generator import ATISGenerator
+from pipeline import DIFFICULTIES
+
+# (difficulty, airport ICAO or None for any airport)
+PoolKey = Tuple[str, Optional[str]]
+
+# Entries generated per refill task
+REFILL_BATCH = 16
+
+
+def generate_rendered(airports: List[Dict], difficulty: str, seed: float) -> List[Dict]:
+    """Executor task: one entry per airport with its full_text rendered, as plain dicts."""
+    generator = ATISGenerator(rng=random.Random(seed))
+    entries = []
+    for airport in airports:
+        entry = generator.generate_atis(airport, difficulty)
+        entry.render()
+        entries.append(dict(entry))
+    return entries
+
+
+class _Buffer:
+    __slots__ = ("entries", "hits", "misses", "refills", "refill_lag_total",
+                 "refill_lag_max", "low_since")
+
+    def __init__(self):
+        self.entries: Deque[Dict] = deque()
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_lag_total = 0.0
+        self.refill_lag_max = 0.0
+        # When the buffer dropped below the low-water mark (None while above it)
+        self.low_since: Optional[float] = None
+
+
+class ATISPool:
+    """Buffers of ready ATIS entries refilled by a background thread."""
+
+    def __init__(self, airports: List[Dict], difficulties: Iterable[str] = DIFFICULTIES,
+                 capacity: int = 64, low_water: int = 16, seed: Optional[int] = None,
+                 executor: Optional[Executor] = None):
+        self.airports = {a["icao"]: a for a in airports}
+        self.capacity = capacity
+        self.low_water = low_water
+        # Runs the refills when given; otherwise the refill thread generates them
+        self.executor = executor
+        self.refill_errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Separate generators, so the refill thread never shares one with requests
+        self._refill_generator = ATISGenerator(rng=random.Random(self._rng.random()))
+        self._request_generator = ATISGenerator(rng=random.Random(self._rng.random()))
+        self._buffers: Dict[PoolKey, _Buffer] = {(d, None): _Buffer() for d in difficulties}
+
+    def start(self, prefill: bool = True) -> "ATISPool":
+        """Start the refill thread; ``prefill`` fills the difficulty buffers first."""
+        if prefill:
+            for key in list(self._buffers):
+                self._fill(key)
+        self._thread = threading.Thread(target=self._refill_loop, name="atis-pool-refill",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _buffer(self, difficulty: str, airport: Optional[str]) -> _Buffer:
+        key = (difficulty, airport)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            if difficulty not in {d for d, _ in self._buffers}:
+                raise ValueError(f"Unknown difficulty: {difficulty}")
+            if airport not in self.airports:
+                raise ValueError(f"Unknown airport: {airport}")
+            with self._lock:
+                buffer = self._buffers.setdefault(key, _Buffer())
+        return buffer
+
+    def try_get(self, difficulty: str = "medium", airport: Optional[str] = None) -> Optional[Dict]:
+        """A ready entry, or None (counted as a miss) if the buffer is empty."""
+        buffer = self._buffer(difficulty, airport)
+        try:
+            entry = buffer.entries.popleft()
+            buffer.hits += 1
+        except IndexError:
+            entry = None
+            buffer.misses += 1
+
+        if len(buffer.entries) < self.low_water and buffer.low_since is None:
+            buffer.low_since = time.perf_counter()
+            self._wake.set()
+        return entry
+
+    def get(self, difficulty: str = "medium", airport: Optional[str] = None) -> Dict:
+        """A ready ATIS entry for a difficulty and optional airport ICAO code.
+        Generates one synchronously when the buffer is empty.
+        """
+        entry = self.try_get(difficulty, airport)
+        if entry is None:
+            with self._lock:
+                entry = self._request_generator.generate_atis(self.airports.get(airport), difficulty)
+        return entry
+
+    def _generate(self, key: PoolKey, count: int) -> List[Dict]:
+        difficulty, airport = key
+        if airport is None:
+            airports = list(self.airports.values())
+            chosen = [self._rng.choice(airports) for _ in range(count)]
+        else:
+            chosen = [self.airports[airport]] * count
+        if self.executor is not None:
+            return self.executor.submit(generate_rendered, chosen, difficulty,
+                                        self._rng.random()).result()
+        entries = [self._refill_generator.generate_atis(a, difficulty) for a in chosen]
+        # Rendered here so requests get the text ready-made
+        for entry in entries:
+            entry.render()
+        return entries
+
+    def _fill(self, key: PoolKey) -> None:
+        buffer = self._buffers[key]
+        while len(buffer.entries) < self.capacity and not self._stop.is_set():
+            count = min(REFILL_BATCH, self.capacity - len(buffer.entries))
+            buffer.entries.extend(self._generate(key, count))
+
+    def _refill_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+            for key, buffer in list(self._buffers.items()):
+                if buffer.low_since is None and len(buffer.entries) >= self.low_water:
+                    continue
+                try:
+                    self._fill(key)
+                except Exception as e:
+                    # Requests fall back to generating on a miss; the next wake-up retries
+                    self.refill_errors += 1
+                    print(f"  ✗ ATIS pool refill of {key[0]}/{key[1] or '*'} failed: {e}")
+                    continue
+                if buffer.low_since is not None:
+                    lag = time.perf_counter() - buffer.low_since
+                    buffer.low_since = None
+                    buffer.refills += 1
+                    buffer.refill_lag_total += lag
+                    buffer.refill_lag_max = max(buffer.refill_lag_max, lag)
+
+    def stats(self) -> Dict:
+        """Hit rate, buffer level and refill lag per buffer and in total."""
+        buffers = {}
+        hits = misses = 0
+        for (difficulty, airport), buffer in sorted(self._buffers.items(),
+                                                    key=lambda item: (item[0][0], item[0][1] or "")):
+            requests = buffer.hits + buffer.misses
+            hits += buffer.hits
+            misses += buffer.misses
+            buffers[f"{difficulty}/{airport or '*'}"] = {
+                "level": len(buffer.entries),
+                "hits": buffer.hits,
+                "misses": buffer.misses,
+                "hit_rate": buffer.hits / requests if requests else None,
+                "refills": buffer.refills,
+                "refill_lag_avg_ms": (buffer.refill_lag_total / buffer.refills * 1000
+                                      if buffer.refills else None),
+                "refill_lag_max_ms": buffer.refill_lag_max * 1000,
+            }
+        total = hits + misses
+        return {"hits": hits, "misses": misses,
+                "hit_rate": hits / total if total else None,
+                "refill_errors": self.refill_errors, "buffers": buffers}
@@ -0,0 +1,306 @@
+"""
+Local HTTP service for ATIS generation and practice selection
+
+A small asyncio HTTP/1.1 server (standard library only, keep-alive):
+
+    GET /atis?difficulty=&airport=&seed=        one entry
+    GET /atis/batch?count=&difficulty=&airport=&seed=
+    GET /practice?difficulty=&airport=&approach_type=&low_visibility=&cb=
+    GET /corpus?difficulty=&airport=
+    GET /stats
+
+Unseeded entries come from an ATISPool when its buffer has one ready.
+Pool refills, seeded, batch and pool-miss generation are CPU-bound and run
+in a process pool; practice picks read the local practice store on a
+thread. The event loop itself only parses requests and writes responses.
+
+/corpus picks from a memory-mapped corpus (corpus.py). Several server
+processes started with --reuse-port share one port and one copy of it:
+
+    python atis_server.py --port 8080 --workers 4
+    python atis_server.py --port 8080 --workers 1 --corpus /dev/shm/corpus.atis --reuse-port
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from atis_pool import ATISPool
+from config import PRACTICE_STORE_PATH, SERVER_HOST, SERVER_PORT
+from corpus import CorpusHandle
+from airport_db import default_database
+from data import DIFFICULTY_SETTINGS
+from generator import ATISGenerator
+from pipeline import worker_context
+from serialization import get_serializer
+
+MAX_BATCH = 1000
+MAX_REQUEST_HEAD = 16 * 1024
+MAX_REQUEST_BODY = 64 * 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def entry_payload(generator: ATISGenerator, atis: Dict) -> Dict:
+    """Response form of a generated entry (airport given by ICAO code)."""
+    return generator.to_directus_format(atis, atis["airport"]["icao"])
+
+
+def generate_entries(difficulty: str, airport: Optional[str], seed: Optional[str],
+                     count: int) -> List[Dict]:
+    """Worker process task: generate ``count`` entries, reproducibly for a seed."""
+    generator = ATISGenerator(rng=random.Random(seed))
+    # Airports load lazily, so a worker reads only the pack of the requested airport
+    found = default_database().get(airport) if airport else None
+    return [entry_payload(generator, generator.generate_atis(found, difficulty))
+            for _ in range(count)]
+
+
+class ATISServer:
+    """Routes requests to the pool, the worker processes or the practice store."""
+
+    def __init__(self, workers: int = os.cpu_count() or 1, pool_capacity: int = 64,
+                 pool_low_water: int = 16, practice_store_path: str = PRACTICE_STORE_PATH,
+                 corpus_path: Optional[str] = None):
+        # Workers are started lazily, after the pool thread runs; forking then would
+        # copy a process with running threads, so they start from a fresh interpreter
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=worker_context())
+        from data import DACH_AIRPORTS
+
+        # Refills run in the worker processes, so they never hold this process's GIL
+        self.pool = ATISPool(DACH_AIRPORTS, capacity=pool_capacity, low_water=pool_low_water,
+                             executor=self.executor)
+        self.serializer = get_serializer()
+        self.practice_store_path = practice_store_path
+        self._store = None
+        self.corpus = CorpusHandle(corpus_path) if corpus_path else None
+        self._generator = ATISGenerator()
+        self.requests = 0
+
+    def _practice_store(self):
+        if self._store is None:
+            if not os.path.exists(self.practice_store_path):
+                raise HTTPError(503, f"No practice store at {self.practice_store_path}; "
+                                     f"run python practice_store.py --sync")
+            from practice_store import PracticeStore
+
+            self._store = PracticeStore(self.practice_store_path)
+        return self._store
+
+    @staticmethod
+    def _params(query: str) -> Dict[str, str]:
+        return {name: values[-1] for name, values in parse_qs(query).items()}
+
+    @staticmethod
+    def _selection(params: Dict[str, str]) -> Tuple[str, Optional[str]]:
+        # A seeded request also picks its difficulty reproducibly
+        rng = random.Random(params["seed"]) if "seed" in params else random
+        difficulty = params.get("difficulty") or rng.choice(list(DIFFICULTY_SETTINGS))
+        if difficulty not in DIFFICULTY_SETTINGS:
+            raise HTTPError(400, f"Unknown difficulty: {difficulty}")
+        airport = params.get("airport") or None
+        if airport is not None:
+            airport = airport.upper()
+            if airport not in default_database():
+                raise HTTPError(400, f"Unknown airport: {airport}")
+        return difficulty, airport
+
+    async def _generate(self, difficulty: str, airport: Optional[str], seed: Optional[str],
+                        count: int) -> List[Dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, generate_entries,
+                                          difficulty, airport, seed, count)
+
+    async def route(self, method: str, target: str):
+        if method != "GET":
+            raise HTTPError(405, f"{method} not supported")
+        url = urlsplit(target)
+        params = self._params(url.query)
+
+        if url.path == "/atis":
+            difficulty, airport = self._selection(params)
+            seed = params.get("seed")
+            if seed is None:
+                atis = self.pool.try_get(difficulty, airport)
+                if atis is not None:
+                    return entry_payload(self._generator, atis)
+            return (await self._generate(difficulty, airport, seed, 1))[0]
+
+        if url.path == "/atis/batch":
+            difficulty, airport = self._selection(params)
+            try:
+                count = int(params.get("count", "10"))
+            except ValueError:
+                raise HTTPError(400, "count must be an integer")
+            if not 1 <= count <= MAX_BATCH:
+                raise HTTPError(400, f"count must be between 1 and {MAX_BATCH}")
+            return await self._generate(difficulty, airport, params.get("seed"), count)
+
+        if url.path == "/practice":
+            store = self._practice_store()
+            filters = {
+                "difficulty": params.get("difficulty"),
+                "airport": params["airport"].upper() if params.get("airport") else None,
+                "approach_type": params.get("approach_type"),
+                "low_visibility": params.get("low_visibility") in ("1", "true") or None,
+                "has_cb": params.get("cb") in ("1", "true") or None,
+            }
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(None, lambda: store.pick(**filters))
+            if entry is None:
+                raise HTTPError(404, "No practice entry matches the filters")
+            return entry
+
+        if url.path == "/corpus":
+            if self.corpus is None:
+                raise HTTPError(503, "No corpus loaded; start with --corpus PATH")
+            difficulty = params.get("difficulty") or None
+            airport = params["airport"].upper() if params.get("airport") else None
+            # Reads go straight to the shared mapping; a pick decodes one row
+            entry = self.corpus.current().pick(difficulty=difficulty, airport=airport)
+            if entry is None:
+                raise HTTPError(404, "No corpus entry matches the filters")
+            return entry
+
+        if url.path == "/stats":
+            stats = {"requests": self.requests, "pool": self.pool.stats()}
+            if self.corpus is not None:
+                corpus = self.corpus.current()
+                stats["corpus"] = {"path": corpus.path, "entries": len(corpus),
+                                   "created_at": corpus.created_at, "swaps": self.corpus.swaps}
+            return stats
+
+        raise HTTPError(404, f"No route for {url.path}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests of one keep-alive connection."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 413, {"error": "Request head too large"}, False)
+                    return
+
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip().lower()
+                keep_alive = (headers.get("connection") != "close" if version == "HTTP/1.1"
+                              else headers.get("connection") == "keep-alive")
+                # Bodies are read and discarded; a bad length gets an answer, not a dropped connection
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+                    return
+                if length > MAX_REQUEST_BODY:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, False)
+                    return
+                if length:
+                    try:
+                        await reader.readexactly(length)
+                    except asyncio.IncompleteReadError:
+                        await self._respond(writer, 400, {"error": "Truncated request body"}, False)
+                        return
+
+                self.requests += 1
+                try:
+                    status, body = 200, await self.route(method, target)
+                except HTTPError as e:
+                    status, body = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, body = 500, {"error": str(e)}
+                await self._respond(writer, status, body, keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, body, keep_alive: bool) -> None:
+        payload = self.serializer.dumps(body)
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+            + payload
+        )
+        await writer.drain()
+
+    async def serve(self, host: str = SERVER_HOST, port: int = SERVER_PORT,
+                    reuse_port: bool = False) -> None:
+        loop = asyncio.get_running_loop()
+        # SIGTERM shuts down like Ctrl-C, so the worker processes are stopped too
+        # instead of outliving the server
+        try:
+            loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
+        # Start the workers up front, so the first requests do not wait for them
+        await asyncio.gather(*(loop.run_in_executor(self.executor, generate_entries,
+                                                    "medium", None, None, 0)
+                               for _ in range(self.workers)))
+        self.pool.start()
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_HEAD,
+                                            reuse_port=reuse_port or None)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"ATIS service listening on http://{host}:{port}", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.pool.stop()
+            self.executor.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve ATIS generation over HTTP")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="generation worker processes")
+    parser.add_argument("--pool-capacity", type=int, default=64)
+    parser.add_argument("--pool-low-water", type=int, default=16)
+    parser.add_argument("--practice-store", default=PRACTICE_STORE_PATH)
+    parser.add_argument("--corpus", help="memory-mapped corpus file served on /corpus")
+    parser.add_argument("--reuse-port", action="store_true",
+                        help="let several server processes share the port")
+    args = parser.parse_args()
+
+    server = ATISServer(workers=args.workers, pool_capacity=args.pool_capacity,
+                        pool_low_water=args.pool_low_water,
+                        practice_store_path=args.practice_store,
+                        corpus_path=args.corpus)
+    try:
+        asyncio.run(server.serve(args.host, args.port, reuse_port=args.reuse_port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
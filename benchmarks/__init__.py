@@ -0,0 +1,4 @@
+"""
+Benchmarks for the ATIS generator (run from the repository root, e.g.
+``python -m benchmarks.upload``)
+"""
@@ -0,0 +1,187 @@
+"""
+Generation, rendering and serialization throughput
+
+Measures entries/sec and per-entry latency percentiles for each difficulty,
+for every stage that runs before the network: ``generate_atis``,
+``generate_full_text``, ``to_directus_format`` and JSON encoding. Inputs are
+generated from fixed seeds, every case is warmed up before it is timed, and
+peak memory is taken from a separate tracemalloc pass so tracing does not
+skew the timings.
+
+    python -m benchmarks.generation --output results.json
+    python -m benchmarks.generation --baseline results.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DIFFICULTIES = ["super_easy", "easy", "medium", "hard"]
+
+# Airport id used for to_directus_format; its value does not affect timing
+AIRPORT_ID = 1
+
+
+def _percentile(ordered: List[int], q: float) -> float:
+    """Nearest-rank percentile of sorted nanosecond samples, in microseconds."""
+    index = min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))
+    return ordered[index] / 1e3
+
+
+def build_cases(generator, serializer, difficulty: str, inputs: List[Dict]) -> Dict[str, Callable]:
+    """Per-entry callables for each benchmarked stage, taking an input index."""
+    records = [generator.to_directus_format(atis, AIRPORT_ID) for atis in inputs]
+    return {
+        "generate_atis": lambda i: generator.generate_atis(inputs[i]["airport"], difficulty),
+        "generate_full_text": lambda i: generator.generate_full_text(inputs[i]["airport"], inputs[i]),
+        "to_directus_format": lambda i: generator.to_directus_format(inputs[i], AIRPORT_ID),
+        "json_encode": lambda i: serializer.dumps(records[i]),
+    }
+
+
+def time_case(case: Callable, count: int, warmup: int) -> Dict:
+    """Time ``count`` calls of a case individually after ``warmup`` untimed calls."""
+    for i in range(warmup):
+        case(i % count)
+
+    clock = time.perf_counter_ns
+    samples = [0] * count
+    started = clock()
+    for i in range(count):
+        call_started = clock()
+        case(i)
+        samples[i] = clock() - call_started
+    elapsed_ns = clock() - started
+
+    samples.sort()
+    return {
+        "entries": count,
+        "entries_per_s": count / (elapsed_ns / 1e9),
+        "p50_us": _percentile(samples, 0.50),
+        "p90_us": _percentile(samples, 0.90),
+        "p99_us": _percentile(samples, 0.99),
+        "max_us": samples[-1] / 1e3,
+    }
+
+
+def peak_memory(case: Callable, count: int) -> int:
+    """Peak traced allocation in bytes while running ``count`` calls of a case."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        # Keep the results alive, as a caller collecting entries would
+        results = [case(i) for i in range(count)]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    return peak - baseline
+
+
+def run(count: int, warmup: int, seed: int, serializer_name: str,
+        memory_count: int) -> Dict:
+    """Run every case for every difficulty and return the results document."""
+    from generator import ATISGenerator
+    from serialization import get_serializer
+
+    serializer = get_serializer(serializer_name)
+    results: Dict[str, Dict[str, Dict]] = {}
+
+    for difficulty in DIFFICULTIES:
+        # Inputs and timed calls draw from fixed, per-difficulty seeds
+        generator = ATISGenerator(rng=random.Random(f"{seed}-{difficulty}-inputs"))
+        inputs = [generator.generate_atis(difficulty=difficulty) for _ in range(count)]
+        for atis in inputs:
+            atis.render()  # Render the text up front, outside the timed cases
+        generator.rng = random.Random(f"{seed}-{difficulty}")
+
+        for name, case in build_cases(generator, serializer, difficulty, inputs).items():
+            result = time_case(case, count, warmup)
+            result["peak_memory_bytes"] = peak_memory(case, min(memory_count, count))
+            results.setdefault(name, {})[difficulty] = result
+            print(f"  {name:<20} {difficulty:<11} {result['entries_per_s']:>10.0f} entries/s  "
+                  f"p50 {result['p50_us']:7.1f} us  p99 {result['p99_us']:7.1f} us  "
+                  f"peak {result['peak_memory_bytes'] / 1024:8.0f} KiB")
+
+    return {
+        "benchmark": "generation",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"count": count, "warmup": warmup, "seed": seed,
+                   "serializer": serializer.name, "memory_count": memory_count},
+        "environment": {"python": platform.python_version(),
+                        "implementation": platform.python_implementation(),
+                        "machine": platform.machine()},
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Regressions of ``current`` against ``baseline`` beyond ``threshold`` (0.1 = 10%)."""
+    regressions = []
+    for name, by_difficulty in current["results"].items():
+        for difficulty, result in by_difficulty.items():
+            base = baseline.get("results", {}).get(name, {}).get(difficulty)
+            if base is None:
+                continue
+            checks = (
+                ("entries/s", base["entries_per_s"], result["entries_per_s"], False),
+                ("p99", base["p99_us"], result["p99_us"], True),
+                ("peak memory", base["peak_memory_bytes"], result["peak_memory_bytes"], True),
+            )
+            for metric, old, new, higher_is_worse in checks:
+                if not old:
+                    continue
+                change = (new - old) / old
+                if (change if higher_is_worse else -change) > threshold:
+                    regressions.append(f"{name} [{difficulty}] {metric}: "
+                                       f"{old:.1f} -> {new:.1f} ({change * 100:+.1f}%)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ATIS generation and serialization")
+    parser.add_argument("--count", type=int, default=2000, help="timed entries per case and difficulty")
+    parser.add_argument("--warmup", type=int, default=200, help="untimed calls before each case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--serializer", default="auto", choices=["auto", "orjson", "json"])
+    parser.add_argument("--memory-count", type=int, default=500,
+                        help="entries per case in the tracemalloc pass")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a results file from --output")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative change that counts as a regression")
+    args = parser.parse_args(argv)
+
+    print(f"⏱️ Benchmarking {args.count} entries per case and difficulty (seed {args.seed})")
+    results = run(args.count, args.warmup, args.seed, args.serializer, args.memory_count)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressions against {args.baseline} "
+                  f"(threshold {args.threshold * 100:.0f}%):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\n✓ No regressions against {args.baseline} (threshold {args.threshold * 100:.0f}%)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Load test for the local ATIS HTTP service
+
+Starts atis_server.py in a subprocess and drives it with concurrent
+keep-alive clients for a fixed duration, reporting requests/sec and
+latency percentiles:
+
+    python -m benchmarks.server --clients 64 --duration 10
+    python -m benchmarks.server --path "/atis?difficulty=hard&seed=1"
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def atis_server(args: argparse.Namespace) -> Iterator[str]:
+    """Run atis_server.py on a free port and yield its base URL."""
+    command = [sys.executable, os.path.join(ROOT, "atis_server.py"), "--port", "0",
+               "--workers", str(args.workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    try:
+        line = process.stdout.readline()
+        yield line.rsplit(" ", 1)[-1].strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+async def client(host: str, port: int, paths: List[str], deadline: float,
+                 latencies: List[float], statuses: Dict[int, int]) -> None:
+    """Send requests over one keep-alive connection until the deadline."""
+    reader, writer = await asyncio.open_connection(host, port)
+    index = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[index % len(paths)]
+            index += 1
+            started = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load(base_url: str, paths: List[str], clients: int, duration: float) -> Tuple[List[float], Dict]:
+    url = urlsplit(base_url)
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(url.hostname, url.port, paths[i:] + paths[:i], deadline,
+                                  latencies, statuses)
+                           for i in range(clients)))
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ATIS HTTP service")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per run")
+    parser.add_argument("--warmup", type=float, default=1.0, help="untimed seconds before the run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--path", action="append",
+                        help="request path (repeatable); defaults to a mix of /atis requests")
+    parser.add_argument("--url", help="load an already running service instead of starting one")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    paths = args.path or [f"/atis?difficulty={d}" for d in ("super_easy", "easy", "medium", "hard")]
+
+    def run(base_url: str) -> Dict:
+        asyncio.run(load(base_url, paths, args.clients, args.warmup))
+        latencies, statuses = asyncio.run(load(base_url, paths, args.clients, args.duration))
+        latencies.sort()
+        count = len(latencies)
+        return {
+            "requests": count,
+            "requests_per_s": count / args.duration,
+            "p50_ms": latencies[count // 2] * 1000 if count else None,
+            "p99_ms": latencies[min(count - 1, int(count * 0.99))] * 1000 if count else None,
+            "max_ms": latencies[-1] * 1000 if count else None,
+            "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        }
+
+    if args.url:
+        result = run(args.url)
+    else:
+        with atis_server(args) as base_url:
+            result = run(base_url)
+
+    print(f"\n📊 {result['requests_per_s']:.0f} requests/s with {args.clients} clients, "
+          f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms "
+          f"(status codes {result['status_codes']})")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "paths": paths, **result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
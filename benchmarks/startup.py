@@ -0,0 +1,123 @@
+"""
+Cold-start time of generator-only workflows
+
+Every case runs in a fresh interpreter, as a CLI invocation or a new
+server worker would: importing the generator, generating one entry,
+importing the HTTP service and main.py, and a one-entry offline export.
+A first untimed run of each case warms the OS file cache and the airport
+packs' compiled cache; the timed runs report the minimum and median wall
+time, and the time on top of a bare interpreter.
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+    python -m benchmarks.startup --importtime "import main"
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "interpreter": "pass",
+    "import generator": "import generator",
+    "generate one entry": "from generator import ATISGenerator; ATISGenerator().generate_atis().render()",
+    "import atis_server": "import atis_server",
+    "import main": "import main",
+    "main.py --export (1 entry)": "import sys, main; sys.argv = ['main.py', '--export', {export!r}, "
+                                  "'--count', '1']; main.main()",
+}
+
+
+def time_case(code: str, runs: int) -> List[float]:
+    """Wall times in seconds of ``runs`` fresh interpreters running ``code``, after one warm-up."""
+    samples = []
+    for run in range(runs + 1):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True,
+                       stdout=subprocess.DEVNULL)
+        if run:
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run(runs: int) -> Dict:
+    results = {"python": sys.version.split()[0], "runs": runs, "cases": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        export = os.path.join(tmp, "startup.jsonl")
+        for name, code in CASES.items():
+            samples = time_case(code.format(export=export), runs)
+            results["cases"][name] = {"min_ms": min(samples) * 1000,
+                                      "median_ms": statistics.median(samples) * 1000}
+
+    bare = results["cases"]["interpreter"]["min_ms"]
+    print(f"\n  {'case':<28} {'min':>9} {'median':>9} {'over bare':>10}")
+    for name, case in results["cases"].items():
+        case["over_interpreter_ms"] = max(0.0, case["min_ms"] - bare)
+        print(f"  {name:<28} {case['min_ms']:>7.1f}ms {case['median_ms']:>7.1f}ms "
+              f"{case['over_interpreter_ms']:>8.1f}ms")
+    return results
+
+
+def compare(results: Dict, baseline: Dict) -> None:
+    """Print the speedup of every case over a baseline results file."""
+    print("\n  Speedup over baseline (time on top of a bare interpreter):")
+    for name, case in results["cases"].items():
+        before = baseline["cases"].get(name)
+        if before is None or name == "interpreter":
+            continue
+        # Differences of a millisecond or two are within the noise of process startup
+        speedup = max(before["over_interpreter_ms"], 1.0) / max(case["over_interpreter_ms"], 1.0)
+        print(f"  {name:<28} {before['over_interpreter_ms']:>7.1f}ms -> "
+              f"{case['over_interpreter_ms']:>6.1f}ms  ({speedup:.1f}x)")
+
+
+def importtime(code: str, top: int = 15) -> None:
+    """Print the slowest imports of ``code`` by cumulative time (python -X importtime)."""
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                             check=True, capture_output=True, text=True)
+    rows = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:>8.1f}ms {module}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold-start time of generator workflows")
+    parser.add_argument("--runs", type=int, default=20, help="timed interpreter starts per case")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against a results file from --output")
+    parser.add_argument("--importtime", metavar="CODE",
+                        help="instead, print the slowest imports of CODE")
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        importtime(args.importtime)
+        return 0
+
+    print(f"⏱️ Timing cold starts ({args.runs} runs per case)")
+    results = run(args.runs)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    sys.exit(main())
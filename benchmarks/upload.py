@@ -0,0 +1,138 @@
+"""
+End-to-end upload throughput against a local mock Directus
+
+Starts mock_directus.py in a subprocess (so it does not share the GIL with
+the client), then runs schema setup, airport population and the upload
+pipeline against it and reports entries/sec:
+
+    python -m benchmarks.upload --count 20000 --latency-ms 15 --jitter-ms 5
+    python -m benchmarks.upload --count 20000 --bulk-import --output upload.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def mock_server(args: argparse.Namespace) -> Iterator[str]:
+    """Run mock_directus.py on a free port and yield its base URL."""
+    command = [
+        sys.executable, os.path.join(ROOT, "mock_directus.py"), "--port", "0",
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+        "--token-ttl", str(args.token_ttl), "--seed", str(args.seed)
+    ]
+    if args.no_gzip:
+        command.append("--no-gzip")
+    if args.no_import:
+        command.append("--no-import")
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        line = process.stdout.readline()
+        yield line.rsplit(" ", 1)[-1].strip()
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def run_once(base_url: str, args: argparse.Namespace) -> Dict:
+    """Run one full upload against a fresh mock and return its timings."""
+    from directus_client import DirectusClient, setup_schema
+    from main import generate_atis_entries, populate_airports
+
+    client = DirectusClient(base_url=base_url, serializer=args.serializer,
+                            compression=not args.no_compression)
+    client.login()
+
+    timings = {}
+    started = time.perf_counter()
+    setup_schema(client)
+    timings["schema_s"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Every run uses a fresh mock, so the local id cache must not be used
+    airport_mapping = populate_airports(client, cache_path=None)
+    timings["airports_s"] = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        generate_atis_entries(
+            client, airport_mapping, args.count,
+            generator_workers=args.generator_workers,
+            serializer_workers=args.serializer_workers,
+            uploader_workers=args.uploader_workers,
+            queue_size=args.queue_size,
+            seed=args.seed,
+            journal_path=os.path.join(tmp, "journal.sqlite"),
+            bulk_import=args.bulk_import
+        )
+        timings["upload_s"] = time.perf_counter() - started
+
+    uploaded = len(list(client.iter_items("atis_entries", fields=["id"], page_size=10000)))
+    timings["uploaded"] = uploaded
+    timings["entries_per_s"] = uploaded / timings["upload_s"] if timings["upload_s"] else 0.0
+    timings["requests"] = client.metrics.snapshot()["series"]
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark uploads against a mock Directus")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+
+    client = parser.add_argument_group("client")
+    client.add_argument("--bulk-import", action="store_true")
+    client.add_argument("--serializer", default="auto", choices=["auto", "orjson", "json"])
+    client.add_argument("--no-compression", action="store_true")
+    client.add_argument("--generator-workers", type=int, default=1)
+    client.add_argument("--serializer-workers", type=int, default=1)
+    client.add_argument("--uploader-workers", type=int, default=2)
+    client.add_argument("--queue-size", type=int, default=8)
+
+    server = parser.add_argument_group("mock server")
+    server.add_argument("--latency-ms", type=float, default=10.0)
+    server.add_argument("--jitter-ms", type=float, default=2.0)
+    server.add_argument("--error-rate", type=float, default=0.0)
+    server.add_argument("--rate-limit-rate", type=float, default=0.0)
+    server.add_argument("--token-ttl", type=float, default=900.0)
+    server.add_argument("--no-gzip", action="store_true")
+    server.add_argument("--no-import", action="store_true")
+    args = parser.parse_args()
+
+    runs: List[Dict] = []
+    for repeat in range(args.repeat):
+        # A fresh server per repetition keeps every run identical
+        with mock_server(args) as base_url:
+            runs.append(run_once(base_url, args))
+        print(f"\n⏱️ Run {repeat + 1}/{args.repeat}: {runs[-1]['entries_per_s']:.0f} entries/s "
+              f"({runs[-1]['uploaded']} uploaded in {runs[-1]['upload_s']:.2f}s)")
+
+    rates = sorted(run["entries_per_s"] for run in runs)
+    summary = {
+        "config": vars(args),
+        "runs": runs,
+        "median_entries_per_s": rates[len(rates) // 2],
+        "best_entries_per_s": rates[-1]
+    }
+    print(f"\n📊 Median {summary['median_entries_per_s']:.0f} entries/s, "
+          f"best {summary['best_entries_per_s']:.0f} entries/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -0,0 +1,152 @@
+"""
+Bulk load ATIS entries through the Directus collection import utility
+
+Streams a generated JSON file to /utils/import/<collection> in a single
+chunked upload instead of one insert request per batch. Falls back to the
+batched upload pipeline when the import utility is unavailable.
+"""
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+from directus_client import DirectusClient
+from generator import DIRECTUS_COLUMNS, ATISGenerator
+from journal import BatchPlan, UploadJournal
+from pipeline import DIFFICULTIES, UploadPipeline, fetch_existing_keys, generate_batch
+from profiling import StageProfiler
+
+# Marks the end of the generated file
+_DONE = object()
+
+
+class BulkImportLoader:
+    """Generates a plan and loads it into Directus as one streamed import file."""
+
+    def __init__(self, client: DirectusClient, airport_mapping: Dict[str, int],
+                 airports: List[Dict], collection: str = "atis_entries",
+                 queue_size: int = 32, journal: Optional[UploadJournal] = None,
+                 run_id: Optional[int] = None, fallback: Optional[UploadPipeline] = None,
+                 profiler: Optional[StageProfiler] = None):
+        self.client = client
+        self.airport_mapping = airport_mapping
+        self.airports = [a for a in airports if a["icao"] in airport_mapping]
+        self.collection = collection
+        self.journal = journal
+        self.run_id = run_id
+        # Batched pipeline used when the import utility cannot be used
+        self.fallback = fallback
+        self.profiler = profiler
+
+        # Bounded so generation only runs a little ahead of the upload
+        self.chunks: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self.stats = {
+            "generated": 0,
+            "uploaded": 0,
+            "failed": 0,
+            "skipped": 0,
+            "difficulty_counts": {d: 0 for d in DIFFICULTIES},
+            "errors": []
+        }
+
+    def _put(self, chunk) -> bool:
+        """Queue a fragment unless the upload has stopped reading."""
+        while not self._stop.is_set():
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, batches: List[BatchPlan], existing_keys: set) -> None:
+        """Generate and encode the plan into JSON array fragments."""
+        generator = ATISGenerator(profiler=self.profiler)
+        first = True
+
+        try:
+            self._put(b"[")
+            for _, seed, size in batches:
+                batch = generate_batch(generator, self.airports, seed, size, existing_keys)
+                self.stats["skipped"] += size - len(batch)
+                if not batch:
+                    continue
+
+                records = [
+                    generator.to_directus_record(atis, self.airport_mapping[atis["airport"]["icao"]])
+                    for atis in batch
+                ]
+                encoded = self.client.serializer.dumps_records(DIRECTUS_COLUMNS, records)
+                # Splice the batch's array elements into the single file-level array
+                if not self._put((b"" if first else b",") + encoded[1:-1]):
+                    return
+                first = False
+
+                self.stats["generated"] += len(batch)
+                for atis in batch:
+                    self.stats["difficulty_counts"][atis["difficulty"]] += 1
+            self._put(b"]")
+        except Exception as e:
+            self.stats["errors"].append(f"generator: {e}")
+        finally:
+            self._put(_DONE)
+
+    def _body(self, started: float) -> Iterator[bytes]:
+        """Yield the file fragments as they are produced, reporting progress."""
+        reported = 0
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _DONE:
+                return
+            yield chunk
+
+            generated = self.stats["generated"]
+            if generated - reported >= 10000:
+                reported = generated
+                rate = generated / (time.perf_counter() - started)
+                print(f"  Streamed {generated} entries ({rate:.0f} rows/s)...")
+
+    def run_plan(self, batches: List[BatchPlan]) -> Dict:
+        """Import a batch plan and return the run statistics."""
+        if not self.airports:
+            print("  ✗ No valid airports found in database!")
+            return self.stats
+
+        if not self.client.import_available(self.collection):
+            print("  ℹ️ Import utility unavailable, falling back to batched inserts")
+            return self._fall_back(batches)
+
+        started = time.perf_counter()
+        existing_keys = fetch_existing_keys(self.client, self.collection, batches)
+        producer = threading.Thread(target=self._produce, args=(batches, existing_keys), daemon=True)
+        producer.start()
+
+        try:
+            ok = self.client.import_stream(self.collection, self._body(started),
+                                           filename=f"{self.collection}.json")
+        except Exception as e:
+            ok = False
+            print(f"  ✗ Error streaming import: {e}")
+        self._stop.set()
+        producer.join()
+        elapsed = time.perf_counter() - started
+
+        if not ok or self.stats["errors"]:
+            print("  ℹ️ Bulk import failed, falling back to batched inserts")
+            return self._fall_back(batches)
+
+        self.stats["uploaded"] = self.stats["generated"]
+        self.stats["elapsed_s"] = elapsed
+        if self.journal is not None:
+            for batch_index, _, _ in batches:
+                self.journal.mark_acked(self.run_id, batch_index)
+        print(f"  ✓ Imported {self.stats['uploaded']} entries "
+              f"({self.stats['uploaded'] / elapsed:.0f} rows/s)")
+        return self.stats
+
+    def _fall_back(self, batches: List[BatchPlan]) -> Dict:
+        if self.fallback is None:
+            self.stats["failed"] = sum(size for _, _, size in batches)
+            return self.stats
+        # The fallback skips existing entry keys, so a partial import is not duplicated
+        return self.fallback.run_plan(batches)
@@ -5,3 +5,43 @@ DIRECTUS_PASSWORD = "(Doge_420420)"
 
 # Generation Settings
 NUM_ATIS_TO_GENERATE = 500  # Number of ATIS entries to create
+# Plan seed when --seed is omitted. Entry keys derive from it, so a rerun skips
+# entries already in Directus; pass another --seed to add new entries
+PLAN_SEED = 1
+
+# Upload pipeline (generator -> serializer -> uploader)
+UPLOAD_BATCH_SIZE = 25  # Entries per insert request
+PIPELINE_QUEUE_SIZE = 8  # Batches buffered between stages
+GENERATOR_WORKERS = 1
+SERIALIZER_WORKERS = 1
+UPLOADER_WORKERS = 2
+
+# Retries for throttled (429/503) requests; expired tokens are refreshed automatically
+MAX_RETRIES = 3
+
+# Request encoding
+SERIALIZER = "auto"  # "auto" (orjson if installed), "orjson" or "json"
+REQUEST_COMPRESSION = True  # Gzip large request bodies (falls back if rejected)
+
+# Upload journal for resuming interrupted runs (python main.py --resume)
+JOURNAL_PATH = "upload_journal.sqlite"
+
+# Local practice store (python practice_store.py --sync)
+PRACTICE_STORE_PATH = "practice_store.sqlite"
+
+# Local ATIS HTTP service (python atis_server.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+
+# Partitioned export of atis_entries to local files (python main.py --pull)
+EXPORT_PARTITION_SIZE = 20000  # Ids per partition
+EXPORT_CONCURRENCY = 4  # Partitions fetched at once
+EXPORT_PAGE_SIZE = 2000  # Rows per request within a partition
+
+# Cached ICAO -> airport id mapping of the last airport sync
+AIRPORT_CACHE_PATH = "airport_cache.json"
+
+# Region packs written by airport_import.py (python main.py --airport-packs)
+AIRPORT_IMPORT_DIR = "airports_world"
+AIRPORT_SYNC_BATCH_SIZE = 500  # Airports per insert/update request
+AIRPORT_SYNC_CONCURRENCY = 4
@@ -0,0 +1,431 @@
+"""
+Memory-mapped ATIS corpus shared by worker processes
+
+A generated corpus is published once as a single read-only file of
+columns: fixed-width arrays for the scalar fields, dictionary codes for
+airport, difficulty, approach type and information letter, and offset
+indexed heaps for full_text, remarks and the nested fields (as JSON).
+Row ids grouped by difficulty, airport and both are stored as well, so
+random picks within a filter are constant time.
+
+Workers attach with mmap and read the columns through memoryviews, so
+every process shares the same page-cache pages instead of holding its own
+copy (place the file on /dev/shm to keep it in RAM). Publishing writes a
+temporary file and atomically renames it over the old one; a CorpusHandle
+notices the new file and swaps to it without a restart.
+
+    python corpus.py publish corpus.atis --count 100000 --seed 7
+    python corpus.py info corpus.atis
+"""
+import argparse
+import json
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from generator import DIRECTUS_COLUMNS
+from textcodec import TextCodec
+
+MAGIC = b"ATISCORP"
+VERSION = 1
+_PREFIX = struct.Struct("<8sII")  # magic, version, header length
+_ALIGN = 8
+
+INT_NULL = -2 ** 31
+TIME_NULL = -2 ** 63
+
+# Scalar columns stored as int32 (None -> INT_NULL)
+INT_COLUMNS = ("wind_direction", "wind_speed", "wind_gust", "wind_variable_from",
+               "wind_variable_to", "visibility_meters", "temperature", "dewpoint", "qnh",
+               "transition_level", "cavok")
+# Low-cardinality text columns stored as uint16 dictionary codes
+CODE_COLUMNS = ("airport", "information_letter", "approach_type", "difficulty")
+# Variable-length columns stored in a heap with an offset index
+TEXT_COLUMNS = ("full_text", "remarks", "entry_key")
+# Text columns stored dictionary compressed when the writer has a TextCodec
+COMPRESSED_COLUMNS = ("full_text", "remarks")
+JSON_COLUMNS = ("rvr", "weather_phenomena", "clouds", "active_runways")
+
+# Filters with precomputed row id groups
+GROUPINGS = (("difficulty",), ("airport",), ("difficulty", "airport"))
+
+_INDEX = {name: DIRECTUS_COLUMNS.index(name) for name in DIRECTUS_COLUMNS}
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _time_value(value) -> int:
+    """observation_time as microseconds since the epoch (naive UTC)."""
+    if value is None:
+        return TIME_NULL
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class _Heap:
+    """Offset-indexed heap of byte strings with a validity byte per row."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("Q", [0])
+        self.valid = bytearray()
+
+    def append(self, value: Optional[bytes]) -> None:
+        if value is not None:
+            self.data += value
+        self.offsets.append(len(self.data))
+        self.valid.append(value is not None)
+
+
+class CorpusWriter:
+    """Collects records (tuples in DIRECTUS_COLUMNS order) and publishes them.
+
+    With a ``text_codec``, full_text and remarks are compressed per row and
+    the codec's dictionary is published with the corpus.
+    """
+
+    def __init__(self, text_codec: Optional[TextCodec] = None):
+        self.count = 0
+        self.text_codec = text_codec
+        self._ints = {name: array("i") for name in INT_COLUMNS}
+        self._times = array("q")
+        self._codes = {name: array("H") for name in CODE_COLUMNS}
+        self._dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in CODE_COLUMNS}
+        self._heaps = {name: _Heap() for name in TEXT_COLUMNS + JSON_COLUMNS}
+
+    def add(self, record: Sequence) -> None:
+        for name, column in self._ints.items():
+            value = record[_INDEX[name]]
+            column.append(INT_NULL if value is None else int(value))
+        self._times.append(_time_value(record[_INDEX["observation_time"]]))
+        for name, column in self._codes.items():
+            dictionary = self._dictionaries[name]
+            value = record[_INDEX[name]]
+            code = dictionary.get(value)
+            if code is None:
+                code = dictionary[value] = len(dictionary)
+            column.append(code)
+        codec = self.text_codec
+        for name in TEXT_COLUMNS:
+            value = record[_INDEX[name]]
+            if value is None:
+                self._heaps[name].append(None)
+            elif codec is not None and name in COMPRESSED_COLUMNS:
+                self._heaps[name].append(codec.encode(str(value)))
+            else:
+                self._heaps[name].append(str(value).encode("utf-8"))
+        for name in JSON_COLUMNS:
+            value = record[_INDEX[name]]
+            self._heaps[name].append(None if value is None else
+                                     json.dumps(value, separators=(",", ":")).encode("utf-8"))
+        self.count += 1
+
+    def extend(self, records: Iterable[Sequence]) -> None:
+        for record in records:
+            self.add(record)
+
+    def _groups(self) -> Dict[str, Tuple[array, Dict[str, Tuple[int, int]]]]:
+        groups = {}
+        for fields in GROUPINGS:
+            by_key: Dict[str, array] = {}
+            names = [{code: value for value, code in self._dictionaries[f].items()} for f in fields]
+            columns = [self._codes[f] for f in fields]
+            for row in range(self.count):
+                key = "|".join(str(n[c[row]]) for n, c in zip(names, columns))
+                ids = by_key.get(key)
+                if ids is None:
+                    ids = by_key[key] = array("I")
+                ids.append(row)
+            flat = array("I")
+            ranges = {}
+            for key, ids in by_key.items():
+                ranges[key] = (len(flat), len(flat) + len(ids))
+                flat.extend(ids)
+            groups["|".join(fields)] = (flat, ranges)
+        return groups
+
+    def publish(self, path: str) -> None:
+        """Write the corpus to ``path`` atomically (temporary file and rename)."""
+        blobs: List[Tuple[Dict, bytes]] = []
+
+        def add_blob(meta: Dict, data) -> None:
+            blobs.append((meta, bytes(data)))
+
+        for name, column in self._ints.items():
+            add_blob({"name": name, "kind": "int", "format": "i"}, column)
+        add_blob({"name": "observation_time", "kind": "time", "format": "q"}, self._times)
+        for name, column in self._codes.items():
+            dictionary = sorted(self._dictionaries[name], key=self._dictionaries[name].get)
+            add_blob({"name": name, "kind": "code", "format": "H", "dictionary": dictionary}, column)
+        if self.text_codec is not None:
+            add_blob({"name": "text_dictionary", "kind": "dictionary",
+                      "codec": self.text_codec.name}, self.text_codec.dictionary)
+        for name, heap in self._heaps.items():
+            kind = "json" if name in JSON_COLUMNS else "text"
+            data_meta = {"name": name, "kind": kind, "part": "data"}
+            if self.text_codec is not None and name in COMPRESSED_COLUMNS:
+                data_meta["codec"] = self.text_codec.name
+            add_blob(data_meta, heap.data)
+            add_blob({"name": name, "kind": kind, "part": "offsets", "format": "Q"}, heap.offsets)
+            add_blob({"name": name, "kind": kind, "part": "valid", "format": "B"}, heap.valid)
+        for grouping, (flat, ranges) in self._groups().items():
+            add_blob({"name": grouping, "kind": "group", "format": "I", "ranges": ranges}, flat)
+
+        # Offsets are relative to the end of the header, so the header can be sized first
+        position = 0
+        for meta, data in blobs:
+            meta["offset"] = position
+            meta["size"] = len(data)
+            position += len(data) + (-len(data) % _ALIGN)
+        header = json.dumps({"count": self.count, "created_at": time.time(),
+                             "columns": [meta for meta, _ in blobs]}).encode("utf-8")
+        header += b" " * (-(_PREFIX.size + len(header)) % _ALIGN)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".corpus-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+                f.write(header)
+                for _, data in blobs:
+                    f.write(data)
+                    f.write(b"\0" * (-len(data) % _ALIGN))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+class Corpus:
+    """Read-only, zero-copy view of a published corpus file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views: List[memoryview] = []
+        view = self._view(0, len(self._mm))
+        magic, version, header_size = _PREFIX.unpack_from(view, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an ATIS corpus (version {VERSION})")
+        header = json.loads(bytes(view[_PREFIX.size:_PREFIX.size + header_size]))
+        base = _PREFIX.size + header_size
+
+        self.count: int = header["count"]
+        self.created_at: float = header["created_at"]
+        self._columns: Dict[str, memoryview] = {}
+        self._dictionaries: Dict[str, List[str]] = {}
+        self._heaps: Dict[str, Dict] = {}
+        self._groups: Dict[str, Tuple[memoryview, Dict[str, List[int]]]] = {}
+        self.text_codec: Optional[TextCodec] = None
+        for meta in header["columns"]:
+            blob = self._view(base + meta["offset"], base + meta["offset"] + meta["size"])
+            if meta.get("format"):
+                blob = self._track(blob.cast(meta["format"]))
+            if meta["kind"] in ("int", "time", "code"):
+                self._columns[meta["name"]] = blob
+                if meta["kind"] == "code":
+                    self._dictionaries[meta["name"]] = meta["dictionary"]
+            elif meta["kind"] == "group":
+                self._groups[meta["name"]] = (blob, meta["ranges"])
+            elif meta["kind"] == "dictionary":
+                self.text_codec = TextCodec(bytes(blob))
+            else:
+                heap = self._heaps.setdefault(meta["name"], {"kind": meta["kind"]})
+                heap[meta["part"]] = blob
+                if meta.get("codec"):
+                    heap["compressed"] = True
+
+    def _track(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+
+    def _view(self, start: int, end: int) -> memoryview:
+        return self._track(memoryview(self._mm)[start:end])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def column(self, name: str) -> memoryview:
+        """Zero-copy typed view of a fixed-width column (codes for dictionary columns)."""
+        return self._columns[name]
+
+    def dictionary(self, name: str) -> List[str]:
+        return self._dictionaries[name]
+
+    def raw(self, name: str, row: int) -> Optional[memoryview]:
+        """Zero-copy bytes of a heap column value (still compressed for compressed columns)."""
+        heap = self._heaps[name]
+        if not heap["valid"][row]:
+            return None
+        offsets = heap["offsets"]
+        return heap["data"][offsets[row]:offsets[row + 1]]
+
+    def text(self, name: str, row: int) -> Optional[str]:
+        """Decoded value of a text or JSON heap column."""
+        data = self.raw(name, row)
+        if data is None:
+            return None
+        if self._heaps[name].get("compressed"):
+            return self.text_codec.decode(data)
+        return str(data, "utf-8")
+
+    def text_sizes(self, name: str) -> Tuple[int, bool]:
+        """Stored bytes of a heap column and whether it is compressed."""
+        heap = self._heaps[name]
+        return len(heap["data"]), bool(heap.get("compressed"))
+
+    def entry(self, row: int) -> Dict:
+        """One entry in to_directus_format shape (airport as ICAO code)."""
+        if not 0 <= row < self.count:
+            raise IndexError(row)
+        entry: Dict = {}
+        for name in INT_COLUMNS:
+            value = self._columns[name][row]
+            entry[name] = None if value == INT_NULL else value
+        entry["cavok"] = None if entry["cavok"] is None else bool(entry["cavok"])
+        micros = self._columns["observation_time"][row]
+        entry["observation_time"] = (None if micros == TIME_NULL else
+                                     datetime.utcfromtimestamp(micros / 1e6).isoformat())
+        for name in CODE_COLUMNS:
+            entry[name] = self._dictionaries[name][self._columns[name][row]]
+        for name in TEXT_COLUMNS:
+            entry[name] = self.text(name, row)
+        for name in JSON_COLUMNS:
+            value = self.text(name, row)
+            entry[name] = None if value is None else json.loads(value)
+        return {name: entry[name] for name in DIRECTUS_COLUMNS}
+
+    def ids(self, difficulty: Optional[str] = None, airport: Optional[str] = None) -> Sequence[int]:
+        """Zero-copy row ids matching the filters."""
+        fields = [name for name, value in (("difficulty", difficulty), ("airport", airport))
+                  if value is not None]
+        if not fields:
+            return range(self.count)
+        flat, ranges = self._groups["|".join(fields)]
+        start, end = ranges.get("|".join(v for v in (difficulty, airport) if v is not None), (0, 0))
+        return flat[start:end]
+
+    def pick(self, rng: Optional[random.Random] = None, difficulty: Optional[str] = None,
+             airport: Optional[str] = None) -> Optional[Dict]:
+        """Uniformly random entry matching the filters, in constant time."""
+        ids = self.ids(difficulty, airport)
+        if not len(ids):
+            return None
+        return self.entry(ids[(rng or random).randrange(len(ids))])
+
+    def is_current(self) -> bool:
+        """Whether ``path`` still refers to the file this corpus was opened from."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_ino, stat.st_mtime_ns) == (self._stat.st_ino, self._stat.st_mtime_ns)
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+
+class CorpusHandle:
+    """Follows a corpus path and swaps to a newly published file.
+
+    ``current()`` checks the file at most every ``check_interval`` seconds.
+    A replaced corpus is closed on the following swap, so readers holding
+    it when a swap happens can finish.
+    """
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._corpus = Corpus(path)
+        self._retired: Optional[Corpus] = None
+        self._checked = time.monotonic()
+        self.swaps = 0
+
+    def current(self) -> Corpus:
+        now = time.monotonic()
+        if now - self._checked >= self.check_interval:
+            self._checked = now
+            if not self._corpus.is_current():
+                fresh = Corpus(self.path)
+                if self._retired is not None:
+                    self._retired.close()
+                self._retired, self._corpus = self._corpus, fresh
+                self.swaps += 1
+        return self._corpus
+
+    def close(self) -> None:
+        for corpus in (self._corpus, self._retired):
+            if corpus is not None:
+                corpus.close()
+
+
+def publish_generated(path: str, count: int, seed: Optional[int] = None,
+                      compress_text: bool = False) -> CorpusWriter:
+    """Generate ``count`` entries and publish them as a corpus."""
+    from data import DACH_AIRPORTS
+    from generator import ATISGenerator
+    from journal import plan_batches
+    from pipeline import generate_batch
+
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    generator = ATISGenerator()
+    writer = CorpusWriter(TextCodec.default() if compress_text else None)
+    for _, batch_seed, size in plan_batches(count, 500, seed):
+        for atis in generate_batch(generator, DACH_AIRPORTS, batch_seed, size):
+            writer.add(generator.to_directus_record(atis, atis["airport"]["icao"]))
+    writer.publish(path)
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or inspect a shared ATIS corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="generate entries into a corpus file")
+    publish.add_argument("path")
+    publish.add_argument("--count", type=int, default=10000)
+    publish.add_argument("--seed", type=int)
+    publish.add_argument("--compress-text", action="store_true",
+                         help="dictionary compress full_text and remarks (textcodec.py)")
+    info = commands.add_parser("info", help="summarize a corpus file")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        started = time.perf_counter()
+        publish_generated(args.path, args.count, args.seed, args.compress_text)
+        print(f"✓ Published {args.count} entries to {args.path} "
+              f"({os.path.getsize(args.path) / 1024 / 1024:.1f} MiB, "
+              f"{time.perf_counter() - started:.1f}s)")
+        return
+
+    corpus = Corpus(args.path)
+    print(f"{args.path}: {len(corpus)} entries, {os.path.getsize(args.path) / 1024 / 1024:.1f} MiB")
+    codes = corpus.column("difficulty")
+    names = corpus.dictionary("difficulty")
+    for code, name in enumerate(names):
+        print(f"  {name}: {sum(1 for c in codes if c == code)}")
+    for name in COMPRESSED_COLUMNS:
+        size, compressed = corpus.text_sizes(name)
+        print(f"  {name}: {size / 1024 / 1024:.1f} MiB" + (" (dictionary compressed)" if compressed else ""))
+    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,71 @@
 """
 Directus API client for managing ATIS collections
 """
-import requests
+import hashlib
 import json
-from typing import Optional, Dict, Any, List
-from config import DIRECTUS_URL, DIRECTUS_EMAIL, DIRECTUS_PASSWORD
+import requests
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Sequence, Set, Tuple, Union
+from config import (
+    DIRECTUS_URL, DIRECTUS_EMAIL, DIRECTUS_PASSWORD, SERIALIZER, REQUEST_COMPRESSION,
+    MAX_RETRIES
+)
+from metrics import RequestMetrics
+from serialization import compress_body, get_serializer
+
+try:
+    import ijson  # Optional: incremental decoding of large page bodies
+except ImportError:
+    ijson = None
+
+
+class DirectusError(Exception):
+    """A request that kept failing after its retries."""
+
+
+def _token_expired(response: requests.Response) -> bool:
+    """Check whether a 401 response reports an expired access token."""
+    try:
+        errors = response.json().get("errors") or []
+    except ValueError:
+        return False
+    return any((e.get("extensions") or {}).get("code") == "TOKEN_EXPIRED" for e in errors)
+
+
+def _retry_delay(response: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled request."""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after and retry_after.replace(".", "", 1).isdigit():
+        return min(float(retry_after), 30.0)
+    return min(0.25 * 2 ** attempt, 8.0)
 
 
 class DirectusClient:
-    def __init__(self):
-        self.base_url = DIRECTUS_URL
+    def __init__(self, serializer: str = SERIALIZER, compression: bool = REQUEST_COMPRESSION,
+                 base_url: Optional[str] = None):
+        self.base_url = base_url or DIRECTUS_URL
         self.token: Optional[str] = None
         self.refresh_token: Optional[str] = None
+        # Reuse keep-alive connections across the many small API calls
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Encoder for bulk request bodies, and whether to gzip them
+        self.serializer = get_serializer(serializer)
+        self.compression = compression
+        self._auth_lock = threading.Lock()
+        self.metrics = RequestMetrics()
     
     def login(self) -> bool:
         """Authenticate with Directus and get access token."""
-        response = requests.post(
-            f"{self.base_url}/auth/login",
+        response = self._send(
+            "POST", "/auth/login",
             json={"email": DIRECTUS_EMAIL, "password": DIRECTUS_PASSWORD}
         )
         if response.status_code == 200:
@@ -36,10 +85,59 @@ class DirectusClient:
             "Content-Type": "application/json"
         }
     
+    def _request(self, method: str, path: str, headers: Optional[Dict[str, Optional[str]]] = None,
+                 retries: int = MAX_RETRIES, **kwargs) -> requests.Response:
+        """Send an authenticated API request.
+        
+        An expired access token is refreshed once (shared across threads) and
+        the request repeated; 429/503 responses are retried with backoff,
+        honouring Retry-After. ``headers`` are merged over the defaults, a
+        value of None removes a default header.
+        """
+        for attempt in range(retries + 1):
+            sent_token = self.token
+            request_headers = self._headers()
+            if headers:
+                request_headers.update(headers)
+            response = self._send(method, path, headers=request_headers, **kwargs)
+            if attempt == retries:
+                break
+            
+            if response.status_code == 401 and self.refresh_token and _token_expired(response):
+                self.metrics.record_retry(method, path)
+                with self._auth_lock:
+                    # Another thread may already have refreshed the token
+                    if self.token == sent_token and not self.refresh_auth():
+                        break
+                continue
+            if response.status_code in [429, 503]:
+                self.metrics.record_retry(method, path)
+                time.sleep(_retry_delay(response, attempt))
+                continue
+            break
+        return response
+    
+    def _send(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send one HTTP request and record it in the client metrics."""
+        started = time.perf_counter()
+        response = self.session.request(method, f"{self.base_url}{path}", **kwargs)
+        latency = time.perf_counter() - started
+        
+        body = response.request.body
+        request_bytes = len(body) if isinstance(body, (bytes, str)) else 0
+        if kwargs.get("stream"):
+            # Reading the body here would defeat streaming; trust the header
+            response_bytes = int(response.headers.get("Content-Length") or 0)
+        else:
+            response_bytes = len(response.content)
+        self.metrics.record(method, path, response.status_code, latency,
+                            request_bytes, response_bytes)
+        return response
+    
     def refresh_auth(self) -> bool:
         """Refresh the access token."""
-        response = requests.post(
-            f"{self.base_url}/auth/refresh",
+        response = self._send(
+            "POST", "/auth/refresh",
             json={"refresh_token": self.refresh_token}
         )
         if response.status_code == 200:
@@ -51,9 +149,8 @@ class DirectusClient:
     
     def get_collections(self) -> List[Dict]:
         """Get all collections."""
-        response = requests.get(
-            f"{self.base_url}/collections",
-            headers=self._headers()
+        response = self._request(
+            "GET", "/collections"
         )
         if response.status_code == 200:
             return response.json()["data"]
@@ -66,9 +163,8 @@ class DirectusClient:
     
     def get_fields(self, collection: str) -> List[Dict]:
         """Get all fields for a collection."""
-        response = requests.get(
-            f"{self.base_url}/fields/{collection}",
-            headers=self._headers()
+        response = self._request(
+            "GET", f"/fields/{collection}"
         )
         if response.status_code == 200:
             return response.json()["data"]
@@ -81,9 +177,8 @@ class DirectusClient:
     
     def create_collection(self, collection_config: Dict) -> bool:
         """Create a new collection."""
-        response = requests.post(
-            f"{self.base_url}/collections",
-            headers=self._headers(),
+        response = self._request(
+            "POST", "/collections",
             json=collection_config
         )
         if response.status_code in [200, 204]:
@@ -93,11 +188,23 @@ class DirectusClient:
             print(f"✗ Failed to create collection: {response.json()}")
             return False
     
+    def update_collection(self, collection_config: Dict) -> bool:
+        """Update the meta of an existing collection."""
+        response = self._request(
+            "PATCH", f"/collections/{collection_config['collection']}",
+            json={"meta": collection_config["meta"]}
+        )
+        if response.status_code in [200, 204]:
+            print(f"✓ Updated collection: {collection_config['collection']}")
+            return True
+        else:
+            print(f"✗ Failed to update collection: {response.json()}")
+            return False
+    
     def create_field(self, collection: str, field_config: Dict) -> bool:
         """Create a new field in a collection."""
-        response = requests.post(
-            f"{self.base_url}/fields/{collection}",
-            headers=self._headers(),
+        response = self._request(
+            "POST", f"/fields/{collection}",
             json=field_config
         )
         if response.status_code in [200, 204]:
@@ -108,11 +215,31 @@ class DirectusClient:
             print(f"  ✗ Failed to create field {field_config['field']}: {error_msg}")
             return False
     
+    def update_field(self, collection: str, field_config: Dict) -> bool:
+        """Update an existing field in a collection."""
+        response = self._request(
+            "PATCH", f"/fields/{collection}/{field_config['field']}",
+            json=field_config
+        )
+        if response.status_code in [200, 204]:
+            print(f"  ✓ Updated field: {collection}.{field_config['field']}")
+            return True
+        else:
+            error_msg = response.json() if response.text else "Unknown error"
+            print(f"  ✗ Failed to update field {field_config['field']}: {error_msg}")
+            return False
+    
+    def relation_exists(self, collection: str, field: str) -> bool:
+        """Check if a field already has a relation."""
+        response = self._request(
+            "GET", f"/relations/{collection}/{field}"
+        )
+        return response.status_code == 200 and bool(response.json().get("data"))
+    
     def create_relation(self, relation_config: Dict) -> bool:
         """Create a relation between collections."""
-        response = requests.post(
-            f"{self.base_url}/relations",
-            headers=self._headers(),
+        response = self._request(
+            "POST", "/relations",
             json=relation_config
         )
         if response.status_code in [200, 204]:
@@ -124,9 +251,8 @@ class DirectusClient:
     
     def insert_item(self, collection: str, item: Dict) -> Optional[Dict]:
         """Insert a single item into a collection."""
-        response = requests.post(
-            f"{self.base_url}/items/{collection}",
-            headers=self._headers(),
+        response = self._request(
+            "POST", f"/items/{collection}",
             json=item
         )
         if response.status_code in [200, 204]:
@@ -137,11 +263,8 @@ class DirectusClient:
     
     def insert_items(self, collection: str, items: List[Dict]) -> bool:
         """Insert multiple items into a collection."""
-        response = requests.post(
-            f"{self.base_url}/items/{collection}",
-            headers=self._headers(),
-            json=items
-        )
+        response = self._post_body(f"/items/{collection}",
+                                   self.serializer.dumps(items))
         if response.status_code in [200, 204]:
             print(f"✓ Inserted {len(items)} items into {collection}")
             return True
@@ -149,505 +272,1009 @@ class DirectusClient:
             print(f"✗ Failed to insert items: {response.json()}")
             return False
     
+    def create_items(self, collection: str, items: List[Dict],
+                     fields: Sequence[str] = ("id",)) -> Optional[List[Dict]]:
+        """Insert items and return the created rows with only ``fields``, or None on failure."""
+        response = self._request(
+            "POST", f"/items/{collection}",
+            params={"fields": ",".join(fields)},
+            data=self.serializer.dumps(items)
+        )
+        if response.status_code == 200:
+            return response.json()["data"]
+        print(f"✗ Failed to insert {len(items)} items into {collection}: {response.text[:500]}")
+        return None
+
+    def update_items(self, collection: str, items: List[Dict]) -> bool:
+        """Update several items in one request; every item carries its ``id``."""
+        response = self._request(
+            "PATCH", f"/items/{collection}",
+            params={"fields": "id"},
+            data=self.serializer.dumps(items)
+        )
+        if response.status_code in [200, 204]:
+            return True
+        print(f"✗ Failed to update {len(items)} items in {collection}: {response.text[:500]}")
+        return False
+
+    def insert_records(self, collection: str, columns: Sequence[str],
+                       records: List[Sequence]) -> bool:
+        """Insert compact tuple records (in ``columns`` order) into a collection."""
+        body = self.serializer.dumps_records(columns, records)
+        return self.insert_encoded(collection, body, len(records))
+    
+    def _post_body(self, path: str, body: bytes) -> requests.Response:
+        """POST an encoded JSON body, gzipped when enabled and worthwhile.
+        If the server rejects compressed bodies, compression is switched off
+        for this client and the request is retried uncompressed.
+        """
+        compressed = compress_body(body) if self.compression else None
+        if compressed is not None:
+            response = self._request("POST", path, headers={"Content-Encoding": "gzip"},
+                                     data=compressed)
+            if response.status_code != 415:
+                return response
+            print(f"  ℹ️ Server rejected gzip request body (HTTP {response.status_code}), sending uncompressed")
+            self.compression = False
+        return self._request("POST", path, data=body)
+    
+    def insert_encoded(self, collection: str, body: bytes, count: int) -> bool:
+        """Insert a batch that has already been encoded as a JSON array."""
+        response = self._post_body(f"/items/{collection}", body)
+        if response.status_code in [200, 204]:
+            return True
+        else:
+            print(f"✗ Failed to insert {count} items: {response.text[:500]}")
+            return False
+    
+    def import_available(self, collection: str) -> bool:
+        """Check whether the collection import utility accepts uploads.
+        Probes it with an empty JSON file, which imports nothing.
+        """
+        response = self._request(
+            "POST", f"/utils/import/{collection}",
+            headers={"Content-Type": None},
+            files={"file": ("probe.json", b"[]", "application/json")}
+        )
+        return response.status_code in [200, 204]
+    
+    def import_stream(self, collection: str, chunks: Iterable[bytes],
+                      filename: str = "import.json",
+                      content_type: str = "application/json") -> bool:
+        """Upload a file to the collection import utility in one chunked request.
+        
+        ``chunks`` is consumed lazily while the request is being sent, so the
+        file never has to exist on disk or in memory as a whole. The multipart
+        envelope is written by hand because ``requests`` buffers ``files=``.
+        """
+        boundary = f"atis-{uuid.uuid4().hex}"
+        
+        def body() -> Iterator[bytes]:
+            yield (f"--{boundary}\r\n"
+                   f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                   f"Content-Type: {content_type}\r\n\r\n").encode("utf-8")
+            for chunk in chunks:
+                if chunk:
+                    yield chunk
+            yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+        
+        def counted(parts: Iterator[bytes]) -> Iterator[bytes]:
+            for part in parts:
+                sent[0] += len(part)
+                yield part
+        
+        sent = [0]
+        
+        # A generator body cannot be replayed, so this request is never retried;
+        # start it with a fresh token so it cannot expire before the upload begins
+        if self.refresh_token:
+            self.refresh_auth()
+        response = self._request(
+            "POST", f"/utils/import/{collection}",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            data=counted(body()),
+            retries=0
+        )
+        # Streamed bodies have no length up front; account for them afterwards
+        self.metrics.record_request_bytes("POST", f"/utils/import/{collection}", sent[0])
+        if response.status_code in [200, 204]:
+            return True
+        print(f"✗ Import into {collection} failed: HTTP {response.status_code} {response.text[:500]}")
+        return False
+    
+    def existing_keys(self, collection: str, keys: Sequence[str], key_field: str = "entry_key",
+                      chunk_size: int = 1000) -> Set[str]:
+        """Return which of ``keys`` already exist, checking ``chunk_size`` keys per request.
+        Uses the SEARCH method so large key lists travel in the body, not the URL.
+        """
+        found: Set[str] = set()
+        for i in range(0, len(keys), chunk_size):
+            chunk = list(keys[i:i + chunk_size])
+            response = self._request(
+                "SEARCH", f"/items/{collection}",
+                json={"query": {
+                    "filter": {key_field: {"_in": chunk}},
+                    "fields": [key_field],
+                    "limit": -1
+                }}
+            )
+            if response.status_code != 200:
+                raise DirectusError(f"Key lookup on {collection} failed: HTTP {response.status_code}")
+            found.update(row[key_field] for row in response.json()["data"])
+        return found
+    
+    def upsert_items(self, collection: str, items: List[Dict], key_field: str = "entry_key",
+                     chunk_size: int = 1000) -> int:
+        """Insert only the items whose key is not present yet.
+        Returns the number of items inserted.
+        """
+        inserted = 0
+        for i in range(0, len(items), chunk_size):
+            chunk = items[i:i + chunk_size]
+            existing = self.existing_keys(collection, [item[key_field] for item in chunk], key_field)
+            new_items = [item for item in chunk if item[key_field] not in existing]
+            if new_items and self.insert_items(collection, new_items):
+                inserted += len(new_items)
+        return inserted
+    
     def get_items(self, collection: str, limit: int = -1) -> List[Dict]:
         """Get items from a collection."""
-        params = {"limit": limit} if limit > 0 else {}
-        response = requests.get(
-            f"{self.base_url}/items/{collection}",
-            headers=self._headers(),
-            params=params
+        if limit <= 0:
+            return list(self.iter_items(collection))
+        response = self._request(
+            "GET", f"/items/{collection}",
+            params={"limit": limit}
         )
         if response.status_code == 200:
             return response.json()["data"]
         return []
     
+    def iter_items(self, collection: str, fields: Optional[Sequence[str]] = None,
+                   filter: Optional[Dict] = None, page_size: int = 1000) -> Iterator[Dict]:
+        """Lazily yield items from a collection, one page at a time.
+        
+        Pages are fetched with keyset pagination on ``id`` (``id > last_id``,
+        sorted by ``id``), so deep pages cost the same as the first one and
+        memory stays bounded by ``page_size``. ``fields`` projects columns
+        server-side and ``filter`` is a Directus filter object. Page bodies
+        are decoded incrementally when ``ijson`` is installed.
+        
+        A page that still fails after the retries raises DirectusError, so a
+        partial result is never mistaken for the complete one; ``get_page``
+        leaves failures to the caller instead.
+        """
+        params = {"sort": "id", "limit": page_size}
+        if fields:
+            params["fields"] = ",".join(dict.fromkeys(["id", *fields]))
+        
+        last_id = None
+        while True:
+            clauses = [filter] if filter else []
+            if last_id is not None:
+                clauses.append({"id": {"_gt": last_id}})
+            if clauses:
+                page_filter = clauses[0] if len(clauses) == 1 else {"_and": clauses}
+                params["filter"] = json.dumps(page_filter, separators=(",", ":"))
+            
+            response = self._request(
+                "GET", f"/items/{collection}",
+                params=params,
+                stream=True
+            )
+            if response.status_code != 200:
+                response.close()
+                raise DirectusError(f"Failed to fetch {collection} page after id {last_id}: "
+                                    f"HTTP {response.status_code}")
+            
+            count = 0
+            with response:
+                if ijson is not None:
+                    response.raw.decode_content = True
+                    rows = ijson.items(response.raw, "data.item", use_float=True)
+                else:
+                    rows = response.json()["data"]
+                for row in rows:
+                    count += 1
+                    last_id = row["id"]
+                    yield row
+            
+            if count < page_size:
+                return
+    
+    def get_page(self, collection: str, fields: Optional[Sequence[str]] = None,
+                 filter: Optional[Dict] = None, limit: int = 1000) -> Optional[List[Dict]]:
+        """Fetch one page of items sorted by id, or None if the request failed.
+        Unlike ``iter_items`` a failure is reported to the caller, which can
+        retry the page from the same position.
+        """
+        params = {"sort": "id", "limit": limit}
+        if fields:
+            params["fields"] = ",".join(dict.fromkeys(["id", *fields]))
+        if filter:
+            params["filter"] = json.dumps(filter, separators=(",", ":"))
+        response = self._request("GET", f"/items/{collection}", params=params)
+        if response.status_code != 200:
+            return None
+        return self.serializer.loads(response.content)["data"]
+
+    def get_singleton(self, collection: str) -> Optional[Dict]:
+        """Get the item of a singleton collection, or None if unavailable."""
+        response = self._request(
+            "GET", f"/items/{collection}"
+        )
+        if response.status_code == 200:
+            return response.json().get("data") or {}
+        return None
+    
+    def update_singleton(self, collection: str, data: Dict) -> bool:
+        """Create or update the item of a singleton collection."""
+        response = self._request(
+            "PATCH", f"/items/{collection}",
+            json=data
+        )
+        return response.status_code in [200, 204]
+    
     def delete_items(self, collection: str, ids: List[int]) -> bool:
         """Delete items from a collection by IDs."""
-        response = requests.delete(
-            f"{self.base_url}/items/{collection}",
-            headers=self._headers(),
+        response = self._request(
+            "DELETE", f"/items/{collection}",
             json=ids
         )
         return response.status_code in [200, 204]
     
-    def clear_collection(self, collection: str) -> bool:
-        """Remove all items from a collection."""
-        items = self.get_items(collection, limit=-1)
-        if not items:
+    def aggregate(self, collection: str, aggregates: Dict[str, str],
+                  filter: Optional[Dict] = None) -> Optional[Dict]:
+        """Run server-side aggregates, e.g. {"min": "id", "count": "*"}."""
+        params = {f"aggregate[{func}]": field for func, field in aggregates.items()}
+        if filter:
+            params["filter"] = json.dumps(filter, separators=(",", ":"))
+        response = self._request(
+            "GET", f"/items/{collection}",
+            params=params
+        )
+        if response.status_code == 200:
+            data = response.json()["data"]
+            return data[0] if data else {}
+        return None
+    
+    def id_range(self, collection: str, filter: Optional[Dict] = None) -> Optional[Tuple[int, int]]:
+        """Get the (min, max) id of the items matching a filter."""
+        result = self.aggregate(collection, {"min": "id", "max": "id"}, filter)
+        if not result or result["min"]["id"] is None:
+            return None
+        return int(result["min"]["id"]), int(result["max"]["id"])
+    
+    def delete_by_query(self, collection: str, filter: Dict) -> bool:
+        """Delete every item matching a filter without fetching it."""
+        response = self._request(
+            "DELETE", f"/items/{collection}",
+            json={"query": {"filter": filter, "limit": -1}}
+        )
+        return response.status_code in [200, 204]
+    
+    def delete_where(self, collection: str, filter: Optional[Dict] = None,
+                     chunk_size: int = 5000, concurrency: int = 4) -> bool:
+        """Delete items matching a filter in bounded, concurrent chunks.
+        
+        The matching ids are paged in keyset order (``id > last``, ``chunk_size``
+        ids per page, no other columns) and every page is deleted by id while
+        the next one is fetched, with at most ``concurrency`` deletes in flight.
+        Sparse id ranges cost no empty requests; progress is counted in rows.
+        """
+        counted = self.aggregate(collection, {"count": "*"}, filter)
+        total = int(counted.get("count") or 0) if counted else None
+        if total == 0:
             return True
-        ids = [item["id"] for item in items]
-        return self.delete_items(collection, ids)
+        print(f"🗑️ Deleting {total if total is not None else 'matching'} items from {collection}...")
+        
+        deleted = failed = reported = 0
+        report_every = max(chunk_size, (total or 0) // 10)
+        pending: Dict = {}
+        
+        def collect(futures) -> None:
+            nonlocal deleted, failed, reported
+            for future in futures:
+                count = pending.pop(future)
+                if future.result():
+                    deleted += count
+                else:
+                    failed += count
+            if deleted - reported >= report_every:
+                print(f"  Deleted {deleted} items...")
+                reported = deleted
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            ids: List[int] = []
+            for item in self.iter_items(collection, fields=["id"], filter=filter, page_size=chunk_size):
+                ids.append(item["id"])
+                if len(ids) < chunk_size:
+                    continue
+                if len(pending) >= concurrency:
+                    collect(wait(pending, return_when=FIRST_COMPLETED).done)
+                else:
+                    collect([future for future in pending if future.done()])
+                pending[pool.submit(self.delete_items, collection, ids)] = len(ids)
+                ids = []
+            if ids:
+                pending[pool.submit(self.delete_items, collection, ids)] = len(ids)
+            collect(wait(pending).done)
+        
+        if deleted != reported:
+            print(f"  Deleted {deleted} items")
+        if failed:
+            print(f"  ✗ {failed} items failed to delete")
+        return failed == 0
+    
+    def clear_collection(self, collection: str, filter: Optional[Dict] = None,
+                         chunk_size: int = 5000, concurrency: int = 4) -> bool:
+        """Remove all items (or those matching a filter) from a collection."""
+        return self.delete_where(collection, filter, chunk_size, concurrency)
 
 
-def setup_airport_fields(client: DirectusClient) -> None:
-    """Add missing fields to the airport collection."""
-    print("\n📦 Setting up airport collection fields...")
+def build_entry_filter(difficulty: Optional[str] = None,
+                       airport: Optional[Union[int, str]] = None,
+                       created_after: Optional[datetime] = None,
+                       created_before: Optional[datetime] = None) -> Optional[Dict]:
+    """Build a Directus filter for atis_entries.
+    ``airport`` may be a Directus id or an ICAO code.
+    """
+    clauses = []
+    if difficulty:
+        clauses.append({"difficulty": {"_eq": difficulty}})
+    if isinstance(airport, str):
+        clauses.append({"airport": {"icao": {"_eq": airport}}})
+    elif airport is not None:
+        clauses.append({"airport": {"_eq": airport}})
+    if created_after:
+        clauses.append({"date_created": {"_gte": created_after.isoformat()}})
+    if created_before:
+        clauses.append({"date_created": {"_lt": created_before.isoformat()}})
     
-    fields_to_add = [
-        {
-            "field": "city",
-            "type": "string",
-            "meta": {
-                "interface": "input",
-                "special": None,
-                "required": False
-            },
-            "schema": {
-                "is_nullable": True
-            }
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"_and": clauses}
+
+
+# Desired schema definitions. setup_schema() fingerprints these to decide
+# whether the remote schema needs migrating.
+AIRPORT_FIELDS = [
+    {
+        "field": "city",
+        "type": "string",
+        "meta": {
+            "interface": "input",
+            "special": None,
+            "required": False
         },
-        {
-            "field": "country",
-            "type": "string",
-            "meta": {
-                "interface": "select-dropdown",
-                "options": {
-                    "choices": [
-                        {"text": "Germany", "value": "DE"},
-                        {"text": "Austria", "value": "AT"},
-                        {"text": "Switzerland", "value": "CH"}
-                    ]
-                },
-                "special": None,
-                "required": False
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "country",
+        "type": "string",
+        "meta": {
+            "interface": "select-dropdown",
+            "options": {
+                "choices": [
+                    {"text": "Germany", "value": "DE"},
+                    {"text": "Austria", "value": "AT"},
+                    {"text": "Switzerland", "value": "CH"}
+                ]
             },
-            "schema": {
-                "is_nullable": True
-            }
+            "special": None,
+            "required": False
         },
-        {
-            "field": "elevation_ft",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "special": None,
-                "required": False,
-                "note": "Airport elevation in feet"
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "elevation_ft",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "special": None,
+            "required": False,
+            "note": "Airport elevation in feet"
+        },
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "transition_altitude",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "special": None,
+            "required": False,
+            "note": "Transition altitude in feet (typically 5000 for DACH)"
+        },
+        "schema": {
+            "is_nullable": True,
+            "default_value": 5000
+        }
+    },
+    {
+        "field": "runways",
+        "type": "json",
+        "meta": {
+            "interface": "input-code",
+            "options": {
+                "language": "json"
             },
-            "schema": {
-                "is_nullable": True
-            }
+            "special": ["cast-json"],
+            "required": False,
+            "note": "JSON array of runway configurations"
         },
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "sync_hash",
+        "type": "string",
+        "meta": {
+            "interface": "input",
+            "hidden": True,
+            "readonly": True,
+            "note": "Hash of the synced airport record (see airport_sync.py)"
+        },
+        "schema": {
+            "is_nullable": True
+        }
+    }
+]
+
+ATIS_ENTRIES_COLLECTION = {
+    "collection": "atis_entries",
+    "meta": {
+        "collection": "atis_entries",
+        "icon": "radio",
+        "note": "Generated ATIS practice entries",
+        "hidden": False,
+        "singleton": False,
+        "sort": 4,
+        "group": "Generation_Components"
+    },
+    "schema": {},
+    "fields": [
         {
-            "field": "transition_altitude",
+            "field": "id",
             "type": "integer",
             "meta": {
+                "hidden": True,
                 "interface": "input",
-                "special": None,
-                "required": False,
-                "note": "Transition altitude in feet (typically 5000 for DACH)"
+                "readonly": True
             },
             "schema": {
-                "is_nullable": True,
-                "default_value": 5000
-            }
-        },
-        {
-            "field": "runways",
-            "type": "json",
-            "meta": {
-                "interface": "input-code",
-                "options": {
-                    "language": "json"
-                },
-                "special": ["cast-json"],
-                "required": False,
-                "note": "JSON array of runway configurations"
-            },
-            "schema": {
-                "is_nullable": True
+                "is_primary_key": True,
+                "has_auto_increment": True
             }
         }
     ]
-    
-    for field in fields_to_add:
-        if not client.field_exists("airport", field["field"]):
-            client.create_field("airport", field)
-        else:
-            print(f"  - Field already exists: airport.{field['field']}")
+}
 
-
-def setup_atis_entries_collection(client: DirectusClient) -> None:
-    """Create the atis_entries collection with all fields."""
-    print("\n📦 Setting up atis_entries collection...")
-    
-    if not client.collection_exists("atis_entries"):
-        collection_config = {
-            "collection": "atis_entries",
-            "meta": {
-                "collection": "atis_entries",
-                "icon": "radio",
-                "note": "Generated ATIS practice entries",
-                "hidden": False,
-                "singleton": False,
-                "sort": 4,
-                "group": "Generation_Components"
-            },
-            "schema": {},
-            "fields": [
-                {
-                    "field": "id",
-                    "type": "integer",
-                    "meta": {
-                        "hidden": True,
-                        "interface": "input",
-                        "readonly": True
-                    },
-                    "schema": {
-                        "is_primary_key": True,
-                        "has_auto_increment": True
-                    }
-                }
-            ]
-        }
-        client.create_collection(collection_config)
-    
-    # Define all fields for atis_entries
-    fields = [
-        {
-            "field": "airport",
-            "type": "integer",
-            "meta": {
-                "interface": "select-dropdown-m2o",
-                "special": ["m2o"],
-                "required": True,
-                "display": "related-values",
-                "display_options": {"template": "{{icao}} - {{name}}"}
-            },
-            "schema": {
-                "is_nullable": False
-            }
+ATIS_ENTRIES_FIELDS = [
+    {
+        "field": "airport",
+        "type": "integer",
+        "meta": {
+            "interface": "select-dropdown-m2o",
+            "special": ["m2o"],
+            "required": True,
+            "display": "related-values",
+            "display_options": {"template": "{{icao}} - {{name}}"}
         },
-        {
-            "field": "information_letter",
-            "type": "string",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "NATO phonetic (Alpha, Bravo, etc.)"
-            },
-            "schema": {
-                "max_length": 20,
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "information_letter",
+        "type": "string",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "NATO phonetic (Alpha, Bravo, etc.)"
         },
-        {
-            "field": "observation_time",
-            "type": "dateTime",
-            "meta": {
-                "interface": "datetime",
-                "special": ["cast-datetime"],
-                "required": True,
-                "note": "Observation time (Zulu)"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "max_length": 20,
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "observation_time",
+        "type": "dateTime",
+        "meta": {
+            "interface": "datetime",
+            "special": ["cast-datetime"],
+            "required": True,
+            "note": "Observation time (Zulu)"
         },
-        {
-            "field": "wind_direction",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Wind direction in degrees (0-360, or 0 for variable/calm)"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "wind_direction",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Wind direction in degrees (0-360, or 0 for variable/calm)"
         },
-        {
-            "field": "wind_speed",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Wind speed in knots"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "wind_speed",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Wind speed in knots"
         },
-        {
-            "field": "wind_gust",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": False,
-                "note": "Gust speed in knots (if applicable)"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "wind_gust",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": False,
+            "note": "Gust speed in knots (if applicable)"
         },
-        {
-            "field": "wind_variable_from",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": False,
-                "note": "Variable wind from direction"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "wind_variable_from",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": False,
+            "note": "Variable wind from direction"
         },
-        {
-            "field": "wind_variable_to",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": False,
-                "note": "Variable wind to direction"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "wind_variable_to",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": False,
+            "note": "Variable wind to direction"
         },
-        {
-            "field": "visibility_meters",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Visibility in meters (9999 = 10km+)"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "visibility_meters",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Visibility in meters (9999 = 10km+)"
         },
-        {
-            "field": "rvr",
-            "type": "json",
-            "meta": {
-                "interface": "input-code",
-                "options": {"language": "json"},
-                "special": ["cast-json"],
-                "required": False,
-                "note": "Runway Visual Range per runway"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "rvr",
+        "type": "json",
+        "meta": {
+            "interface": "input-code",
+            "options": {"language": "json"},
+            "special": ["cast-json"],
+            "required": False,
+            "note": "Runway Visual Range per runway"
         },
-        {
-            "field": "weather_phenomena",
-            "type": "json",
-            "meta": {
-                "interface": "input-code",
-                "options": {"language": "json"},
-                "special": ["cast-json"],
-                "required": False,
-                "note": "Array of weather codes (RA, SN, BR, etc.)"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "weather_phenomena",
+        "type": "json",
+        "meta": {
+            "interface": "input-code",
+            "options": {"language": "json"},
+            "special": ["cast-json"],
+            "required": False,
+            "note": "Array of weather codes (RA, SN, BR, etc.)"
         },
-        {
-            "field": "clouds",
-            "type": "json",
-            "meta": {
-                "interface": "input-code",
-                "options": {"language": "json"},
-                "special": ["cast-json"],
-                "required": False,
-                "note": "Array of cloud layers {type, height_ft, cb}"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "clouds",
+        "type": "json",
+        "meta": {
+            "interface": "input-code",
+            "options": {"language": "json"},
+            "special": ["cast-json"],
+            "required": False,
+            "note": "Array of cloud layers {type, height_ft, cb}"
         },
-        {
-            "field": "cavok",
-            "type": "boolean",
-            "meta": {
-                "interface": "boolean",
-                "required": False,
-                "note": "Ceiling And Visibility OK"
-            },
-            "schema": {
-                "is_nullable": True,
-                "default_value": False
-            }
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "cavok",
+        "type": "boolean",
+        "meta": {
+            "interface": "boolean",
+            "required": False,
+            "note": "Ceiling And Visibility OK"
         },
-        {
-            "field": "temperature",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Temperature in Celsius"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": True,
+            "default_value": False
+        }
+    },
+    {
+        "field": "temperature",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Temperature in Celsius"
         },
-        {
-            "field": "dewpoint",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Dewpoint in Celsius"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "dewpoint",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Dewpoint in Celsius"
         },
-        {
-            "field": "qnh",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "QNH in hPa"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "qnh",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "QNH in hPa"
         },
-        {
-            "field": "active_runways",
-            "type": "json",
-            "meta": {
-                "interface": "input-code",
-                "options": {"language": "json"},
-                "special": ["cast-json"],
-                "required": True,
-                "note": "{arrival: [], departure: []}"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "active_runways",
+        "type": "json",
+        "meta": {
+            "interface": "input-code",
+            "options": {"language": "json"},
+            "special": ["cast-json"],
+            "required": True,
+            "note": "{arrival: [], departure: []}"
         },
-        {
-            "field": "approach_type",
-            "type": "string",
-            "meta": {
-                "interface": "select-dropdown",
-                "options": {
-                    "choices": [
-                        {"text": "ILS", "value": "ILS"},
-                        {"text": "ILS CAT II", "value": "ILS CAT II"},
-                        {"text": "ILS CAT III", "value": "ILS CAT III"},
-                        {"text": "VOR", "value": "VOR"},
-                        {"text": "RNAV", "value": "RNAV"},
-                        {"text": "RNAV (GPS)", "value": "RNAV (GPS)"},
-                        {"text": "NDB", "value": "NDB"},
-                        {"text": "Visual", "value": "Visual"}
-                    ]
-                },
-                "required": True
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "approach_type",
+        "type": "string",
+        "meta": {
+            "interface": "select-dropdown",
+            "options": {
+                "choices": [
+                    {"text": "ILS", "value": "ILS"},
+                    {"text": "ILS CAT II", "value": "ILS CAT II"},
+                    {"text": "ILS CAT III", "value": "ILS CAT III"},
+                    {"text": "VOR", "value": "VOR"},
+                    {"text": "RNAV", "value": "RNAV"},
+                    {"text": "RNAV (GPS)", "value": "RNAV (GPS)"},
+                    {"text": "NDB", "value": "NDB"},
+                    {"text": "Visual", "value": "Visual"}
+                ]
             },
-            "schema": {
-                "is_nullable": False
-            }
+            "required": True
         },
-        {
-            "field": "transition_level",
-            "type": "integer",
-            "meta": {
-                "interface": "input",
-                "required": True,
-                "note": "Transition Level (e.g., 70, 80)"
-            },
-            "schema": {
-                "is_nullable": False
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "transition_level",
+        "type": "integer",
+        "meta": {
+            "interface": "input",
+            "required": True,
+            "note": "Transition Level (e.g., 70, 80)"
         },
-        {
-            "field": "remarks",
-            "type": "text",
-            "meta": {
-                "interface": "input-multiline",
-                "required": False,
-                "note": "NOTAMs, special information"
-            },
-            "schema": {
-                "is_nullable": True
-            }
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "remarks",
+        "type": "text",
+        "meta": {
+            "interface": "input-multiline",
+            "required": False,
+            "note": "NOTAMs, special information"
         },
-        {
-            "field": "full_text",
-            "type": "text",
-            "meta": {
-                "interface": "input-multiline",
-                "required": True,
-                "note": "Complete ATIS readout text"
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "full_text",
+        "type": "text",
+        "meta": {
+            "interface": "input-multiline",
+            "required": True,
+            "note": "Complete ATIS readout text"
+        },
+        "schema": {
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "difficulty",
+        "type": "string",
+        "meta": {
+            "interface": "select-dropdown",
+            "options": {
+                "choices": [
+                    {"text": "Super Easy", "value": "super_easy"},
+                    {"text": "Easy", "value": "easy"},
+                    {"text": "Medium", "value": "medium"},
+                    {"text": "Hard", "value": "hard"}
+                ]
             },
-            "schema": {
-                "is_nullable": False
-            }
+            "required": True,
+            "note": "Difficulty level for practice progression"
         },
+        "schema": {
+            "default_value": "medium",
+            "is_nullable": False
+        }
+    },
+    {
+        "field": "entry_key",
+        "type": "string",
+        "meta": {
+            "interface": "input",
+            "readonly": True,
+            "required": False,
+            "note": "Deterministic key (plan seed, batch, position) used for idempotent upserts"
+        },
+        "schema": {
+            "max_length": 64,
+            "is_nullable": True,
+            "is_unique": True,
+            "is_indexed": True
+        }
+    },
+    {
+        "field": "date_created",
+        "type": "timestamp",
+        "meta": {
+            "interface": "datetime",
+            "special": ["date-created", "cast-timestamp"],
+            "readonly": True,
+            "hidden": True
+        },
+        "schema": {
+            "is_nullable": True
+        }
+    },
+    {
+        "field": "user_created",
+        "type": "uuid",
+        "meta": {
+            "interface": "select-dropdown-m2o",
+            "special": ["user-created"],
+            "readonly": True,
+            "hidden": True
+        },
+        "schema": {
+            "is_nullable": True
+        }
+    }
+]
+
+ATIS_ENTRIES_RELATIONS = [
+    {
+        "collection": "atis_entries",
+        "field": "airport",
+        "related_collection": "airport"
+    }
+]
+
+# Singleton holding the fingerprint of the last successfully applied schema
+SCHEMA_STATE_COLLECTION = "atis_schema_state"
+
+SCHEMA_STATE_COLLECTION_CONFIG = {
+    "collection": SCHEMA_STATE_COLLECTION,
+    "meta": {
+        "collection": SCHEMA_STATE_COLLECTION,
+        "icon": "fingerprint",
+        "note": "Fingerprint of the schema applied by the ATIS generator",
+        "hidden": True,
+        "singleton": True
+    },
+    "schema": {},
+    "fields": [
         {
-            "field": "difficulty",
-            "type": "string",
-            "meta": {
-                "interface": "select-dropdown",
-                "options": {
-                    "choices": [
-                        {"text": "Super Easy", "value": "super_easy"},
-                        {"text": "Easy", "value": "easy"},
-                        {"text": "Medium", "value": "medium"},
-                        {"text": "Hard", "value": "hard"}
-                    ]
-                },
-                "required": True,
-                "note": "Difficulty level for practice progression"
-            },
-            "schema": {
-                "default_value": "medium",
-                "is_nullable": False
-            }
+            "field": "id",
+            "type": "integer",
+            "meta": {"hidden": True, "readonly": True},
+            "schema": {"is_primary_key": True, "has_auto_increment": True}
         },
         {
-            "field": "date_created",
-            "type": "timestamp",
-            "meta": {
-                "interface": "datetime",
-                "special": ["date-created", "cast-timestamp"],
-                "readonly": True,
-                "hidden": True
-            },
-            "schema": {
-                "is_nullable": True
-            }
+            "field": "fingerprint",
+            "type": "string",
+            "meta": {"interface": "input", "readonly": True},
+            "schema": {"is_nullable": True}
         },
         {
-            "field": "user_created",
-            "type": "uuid",
-            "meta": {
-                "interface": "select-dropdown-m2o",
-                "special": ["user-created"],
-                "readonly": True,
-                "hidden": True
-            },
-            "schema": {
-                "is_nullable": True
-            }
+            "field": "components",
+            "type": "json",
+            "meta": {"interface": "input-code", "special": ["cast-json"], "readonly": True},
+            "schema": {"is_nullable": True}
         }
     ]
+}
+
+
+def _definition_hash(definition: Any) -> str:
+    """Stable short hash of a JSON-serialisable schema definition."""
+    payload = json.dumps(definition, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def desired_schema_components() -> Dict[str, str]:
+    """Hash every collection, field and relation definition by component key."""
+    components = {
+        f"collection:{ATIS_ENTRIES_COLLECTION['collection']}": _definition_hash(ATIS_ENTRIES_COLLECTION)
+    }
+    for field in AIRPORT_FIELDS:
+        components[f"field:airport.{field['field']}"] = _definition_hash(field)
+    for field in ATIS_ENTRIES_FIELDS:
+        components[f"field:atis_entries.{field['field']}"] = _definition_hash(field)
+    for relation in ATIS_ENTRIES_RELATIONS:
+        components[f"relation:{relation['collection']}.{relation['field']}"] = _definition_hash(relation)
+    return components
+
+
+def schema_fingerprint(components: Dict[str, str]) -> str:
+    """Combine component hashes into a single schema fingerprint."""
+    return _definition_hash(sorted(components.items()))
+
+
+def _sync_fields(client: DirectusClient, collection: str, fields: List[Dict],
+                 desired: Dict[str, str], stored: Dict[str, str]) -> List[str]:
+    """Create missing fields and update changed ones.
+    An existing field without a stored hash counts as changed, so installs
+    set up before the fingerprint get the current definition.
+    Returns the component keys that failed to migrate.
+    """
+    existing = {f["field"] for f in client.get_fields(collection)}
+    failed = []
     
     for field in fields:
-        if not client.field_exists("atis_entries", field["field"]):
-            client.create_field("atis_entries", field)
+        key = f"field:{collection}.{field['field']}"
+        if field["field"] not in existing:
+            ok = client.create_field(collection, field)
+        elif stored.get(key) != desired.get(key):
+            ok = client.update_field(collection, field)
         else:
-            print(f"  - Field already exists: atis_entries.{field['field']}")
+            print(f"  - Field already exists: {collection}.{field['field']}")
+            ok = True
+        if not ok:
+            failed.append(key)
+    
+    return failed
+
+
+def setup_airport_fields(client: DirectusClient, desired: Optional[Dict[str, str]] = None,
+                         stored: Optional[Dict[str, str]] = None) -> List[str]:
+    """Add missing fields to the airport collection."""
+    print("\n📦 Setting up airport collection fields...")
+    return _sync_fields(client, "airport", AIRPORT_FIELDS, desired or {}, stored or {})
+
+
+def setup_atis_entries_collection(client: DirectusClient, desired: Optional[Dict[str, str]] = None,
+                                  stored: Optional[Dict[str, str]] = None,
+                                  include_relations: bool = True) -> List[str]:
+    """Create the atis_entries collection with all fields, or update it where it changed."""
+    print("\n📦 Setting up atis_entries collection...")
+    failed = []
+    
+    key = "collection:atis_entries"
+    if not client.collection_exists("atis_entries"):
+        if not client.create_collection(ATIS_ENTRIES_COLLECTION):
+            failed.append(key)
+    elif (stored or {}).get(key) != (desired or {}).get(key):
+        if not client.update_collection(ATIS_ENTRIES_COLLECTION):
+            failed.append(key)
+    
+    failed += _sync_fields(client, "atis_entries", ATIS_ENTRIES_FIELDS, desired or {}, stored or {})
     
     # Create relation from atis_entries.airport to airport
-    client.create_relation({
-        "collection": "atis_entries",
-        "field": "airport",
-        "related_collection": "airport"
-    })
+    if include_relations:
+        for relation in ATIS_ENTRIES_RELATIONS:
+            # Installs set up before the fingerprint already have the relation
+            if client.relation_exists(relation["collection"], relation["field"]):
+                print(f"  - Relation already exists: {relation['collection']}.{relation['field']}")
+            elif not client.create_relation(relation):
+                failed.append(f"relation:{relation['collection']}.{relation['field']}")
+    
+    return failed
 
 
-def setup_schema(client: DirectusClient) -> None:
-    """Set up the complete schema for ATIS generation."""
-    setup_airport_fields(client)
-    setup_atis_entries_collection(client)
-    print("\n✅ Schema setup complete!")
+def setup_schema(client: DirectusClient, force: bool = False) -> None:
+    """Set up the complete schema for ATIS generation.
+    
+    The desired schema is fingerprinted and compared against the fingerprint
+    stored in the schema state singleton. A match returns after that single
+    lookup; otherwise only the components whose hashes changed are migrated.
+    """
+    desired = desired_schema_components()
+    fingerprint = schema_fingerprint(desired)
+    
+    state = client.get_singleton(SCHEMA_STATE_COLLECTION)
+    if state and state.get("fingerprint") == fingerprint and not force:
+        print(f"\n✅ Schema up to date (fingerprint {fingerprint})")
+        return
+    
+    if state is None and not client.collection_exists(SCHEMA_STATE_COLLECTION):
+        client.create_collection(SCHEMA_STATE_COLLECTION_CONFIG)
+    
+    stored = {} if force else ((state or {}).get("components") or {})
+    changed = {key for key, value in desired.items() if stored.get(key) != value}
+    print(f"\n🔄 Migrating {len(changed)} of {len(desired)} schema components...")
+    
+    failed = []
+    if any(key.startswith("field:airport.") for key in changed):
+        failed += setup_airport_fields(client, desired, stored)
+    if any(":atis_entries" in key for key in changed):
+        failed += setup_atis_entries_collection(
+            client, desired, stored,
+            include_relations=any(key.startswith("relation:") for key in changed)
+        )
+    
+    # Failed components keep their previous hash so the next run retries them
+    components = dict(desired)
+    for key in failed:
+        if key in stored:
+            components[key] = stored[key]
+        else:
+            components.pop(key, None)
+    client.update_singleton(SCHEMA_STATE_COLLECTION, {
+        "fingerprint": schema_fingerprint(components),
+        "components": components
+    })
+    
+    if failed:
+        print(f"\n⚠️ Schema setup finished with {len(failed)} failed components")
+    else:
+        print("\n✅ Schema setup complete!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""
+Parallel export of atis_entries from Directus into local sinks
+
+The id range of the collection is split into partitions of
+``partition_size`` ids. Partitions are fetched concurrently over the
+client's pooled connections, page by page with keyset pagination and only
+the DIRECTUS_COLUMNS projected, and every page is streamed into the sinks
+(JSON Lines, CSV, SQLite, corpus, record log) as soon as it arrives.
+
+A failed page is retried from the same position with backoff. Finished
+partitions are recorded in a state file once every sink has written their
+rows, so an interrupted export continues with the remaining partitions
+(``resume=True``). Rows of a partition that was cut short may then be
+written twice to JSON Lines and CSV; SQLite ignores them by entry_key.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from config import EXPORT_CONCURRENCY, EXPORT_PAGE_SIZE, EXPORT_PARTITION_SIZE, MAX_RETRIES
+from directus_client import DirectusClient
+from generator import DIRECTUS_COLUMNS
+from sinks import Sink, SinkWriters
+
+Partition = Tuple[int, int]  # [first id, end id)
+
+_AIRPORT_INDEX = DIRECTUS_COLUMNS.index("airport")
+
+
+def plan_partitions(low: int, high: int, partition_size: int) -> List[Partition]:
+    """Split the ids ``low``..``high`` into half-open partitions."""
+    return [(start, min(start + partition_size, high + 1))
+            for start in range(low, high + 1, partition_size)]
+
+
+class DirectusExporter:
+    """Range-partitioned, concurrent export of a collection into local sinks."""
+
+    def __init__(self, client: DirectusClient, sinks: List[Sink],
+                 collection: str = "atis_entries",
+                 partition_size: int = EXPORT_PARTITION_SIZE,
+                 concurrency: int = EXPORT_CONCURRENCY, page_size: int = EXPORT_PAGE_SIZE,
+                 retries: int = MAX_RETRIES, queue_size: int = 8,
+                 state_path: Optional[str] = None):
+        self.client = client
+        self.sinks = sinks
+        self.collection = collection
+        self.partition_size = partition_size
+        self.concurrency = max(1, concurrency)
+        self.page_size = page_size
+        self.retries = retries
+        self.queue_size = queue_size
+        # Progress of the export, next to the first sink by default
+        self.state_path = state_path or f"{sinks[0].path}.export-state.json"
+        self._lock = threading.Lock()
+        self._airports: Dict[int, str] = {}
+        self.stats = {"rows": 0, "partitions": 0, "skipped_partitions": 0,
+                      "retries": 0, "failed_partitions": [], "sinks": {}, "errors": []}
+
+    # State file
+
+    def _load_state(self) -> Optional[Dict]:
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        return state if state.get("collection") == self.collection else None
+
+    def _save_state(self, state: Dict) -> None:
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _plan(self, resume: bool) -> Dict:
+        """Partitions of the current id range, continuing a saved export on resume."""
+        bounds = self.client.id_range(self.collection)
+        state = self._load_state() if resume else None
+        if state is None:
+            state = {"collection": self.collection, "partitions": [], "done": []}
+        if bounds is not None:
+            low, high = bounds
+            covered = state["partitions"][-1][1] if state["partitions"] else low
+            # Ids added since the saved export get partitions of their own
+            state["partitions"] += [list(p) for p in
+                                    plan_partitions(max(low, covered), high, self.partition_size)]
+        return state
+
+    # Fetching
+
+    def _record(self, row: Dict) -> Tuple:
+        record = [row.get(name) for name in DIRECTUS_COLUMNS]
+        airport = record[_AIRPORT_INDEX]
+        # Local sinks hold the airport as ICAO code, as generated exports do
+        record[_AIRPORT_INDEX] = self._airports.get(airport, airport)
+        return tuple(record)
+
+    def _fetch_partition(self, writers: SinkWriters, index: int, partition: Partition,
+                         on_done) -> bool:
+        """Stream one partition into the sinks; returns False if a page kept failing."""
+        first, end = partition
+        last_id = first - 1
+        pending = [1]  # pages in flight to the sinks, plus one until fetching is over
+
+        def page_written() -> None:
+            with self._lock:
+                pending[0] -= 1
+                complete = pending[0] == 0
+            if complete:
+                on_done(index)
+
+        while True:
+            page_filter = {"_and": [{"id": {"_gt": last_id}}, {"id": {"_lt": end}}]}
+            for attempt in range(self.retries + 1):
+                rows = self.client.get_page(self.collection, DIRECTUS_COLUMNS, page_filter,
+                                            self.page_size)
+                if rows is not None:
+                    break
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(min(0.5 * 2 ** attempt, 8.0))
+            else:
+                return False
+
+            if rows:
+                last_id = rows[-1]["id"]
+                with self._lock:
+                    pending[0] += 1
+                    self.stats["rows"] += len(rows)
+                writers.put([self._record(row) for row in rows], page_written)
+            if len(rows) < self.page_size:
+                break
+        page_written()  # fetching is over
+        return True
+
+    def run(self, resume: bool = False) -> Dict:
+        """Export the collection into the sinks and return the run statistics."""
+        if resume and not all(sink.appendable for sink in self.sinks):
+            raise ValueError("Only appendable sinks can resume an export "
+                             "(a corpus file is written in one piece)")
+        started = time.perf_counter()
+        self._airports = {row["id"]: row["icao"]
+                          for row in self.client.iter_items("airport", fields=["icao"])}
+        state = self._plan(resume)
+        done = set(state["done"])
+        todo = [(i, tuple(p)) for i, p in enumerate(state["partitions"]) if i not in done]
+        self.stats["skipped_partitions"] = len(done)
+        self._save_state(state)
+        if done:
+            print(f"  Resuming: {len(done)} of {len(state['partitions'])} partitions already exported")
+
+        report_every = max(1, len(todo) // 20)
+
+        def partition_done(index: int) -> None:
+            with self._lock:
+                state["done"].append(index)
+                self.stats["partitions"] += 1
+                self._save_state(state)
+                finished, rows = self.stats["partitions"], self.stats["rows"]
+            if finished % report_every and finished != len(todo):
+                return
+            elapsed = time.perf_counter() - started
+            print(f"  Exported {finished}/{len(todo)} partitions, {rows} rows "
+                  f"({rows / elapsed:.0f} rows/s)")
+
+        writers = SinkWriters(self.sinks, self.queue_size)
+        writers.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+                futures = {pool.submit(self._fetch_partition, writers, index, partition,
+                                       partition_done): partition
+                           for index, partition in todo}
+                for future in as_completed(futures):
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        ok = False
+                        self.stats["errors"].append(f"partition {futures[future]}: {e}")
+                    if not ok:
+                        self.stats["failed_partitions"].append(list(futures[future]))
+        finally:
+            writers.close()
+
+        self.stats["sinks"] = writers.stats
+        self.stats["errors"] += writers.errors
+        self.stats["elapsed_s"] = time.perf_counter() - started
+        if not self.stats["failed_partitions"] and not writers.errors:
+            os.unlink(self.state_path)
+        return self.stats
@@ -2,20 +2,133 @@
 ATIS Generator - Creates realistic ATIS entries for practice
 """
 import random
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Hashable, List, Optional, Tuple
+import data
 from data import (
-    DACH_AIRPORTS, NATO_ALPHABET, WEATHER_PHENOMENA, CLOUD_TYPES,
+    NATO_ALPHABET, WEATHER_PHENOMENA, CLOUD_TYPES,
     CLOUD_HEIGHTS, APPROACH_TYPES, VISIBILITY_VALUES, RVR_VALUES,
     DIFFICULTY_SETTINGS, REMARKS_BY_DIFFICULTY, APPROACH_TYPES_BY_DIFFICULTY
 )
 
 
+# Column order of the compact records produced by ATISGenerator.to_directus_record
+DIRECTUS_COLUMNS = (
+    "airport", "information_letter", "observation_time", "wind_direction",
+    "wind_speed", "wind_gust", "wind_variable_from", "wind_variable_to",
+    "visibility_meters", "rvr", "weather_phenomena", "clouds", "cavok",
+    "temperature", "dewpoint", "qnh", "active_runways", "approach_type",
+    "transition_level", "remarks", "full_text", "difficulty", "entry_key"
+)
+
+# Rendered texts kept per generator (0 disables the cache)
+RENDER_CACHE_SIZE = 4096
+
+
+class RenderCache:
+    """Bounded, thread-safe LRU of rendered full texts keyed on structured content."""
+    
+    def __init__(self, maxsize: int = RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._texts: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[str]:
+        with self._lock:
+            text = self._texts.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._texts.move_to_end(key)
+            self.hits += 1
+            return text
+    
+    def put(self, key: Hashable, text: str) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._texts[key] = text
+            if len(self._texts) > self.maxsize:
+                self._texts.popitem(last=False)
+
+
+def render_key(data: Dict) -> Tuple:
+    """Everything generate_full_text reads, as a hashable key."""
+    wind = data["wind"]
+    rvr = data["rvr"]
+    clouds = data["clouds"]
+    runways = data["active_runways"]
+    observed = data["observation_time"]
+    return (
+        data["airport"]["name"], data["information_letter"], observed.hour, observed.minute,
+        tuple(runways["arrival"]), tuple(runways["departure"]), data["approach_type"],
+        data["transition_level"],
+        (wind["is_calm"], wind["direction"], wind["speed"], wind["gust"],
+         wind["variable_from"], wind["variable_to"]),
+        data["visibility"],
+        tuple((r["runway"], r["value"], r["trend"]) for r in rvr) if rvr else None,
+        tuple(data["weather"]) if data.get("weather") else None,
+        tuple((c["type"], c["height_ft"], c.get("cb")) for c in clouds) if clouds else None,
+        data["cavok"], data["temperature"], data["dewpoint"], data["qnh"], data.get("remarks")
+    )
+
+
+class ATISEntry(dict):
+    """Generated ATIS data whose full_text is rendered on demand by render().
+    The "full_text" key is only present once rendered, so read the text through
+    render() (or rendered_text); structured-only consumers never pay for it.
+    Pickling renders the text and produces a plain dict.
+    """
+    
+    __slots__ = ("_render",)
+    
+    def render(self) -> str:
+        """Render full_text if not done yet, store it under "full_text" and return it."""
+        text = dict.get(self, "full_text")
+        if text is None:
+            text = self["full_text"] = self._render(self)
+        return text
+    
+    def __reduce__(self):
+        return dict, (dict(self, full_text=self.render()),)
+
+
+def rendered_text(atis_data: Dict) -> str:
+    """full_text of generated data, rendering an ATISEntry that has none yet."""
+    if "full_text" in atis_data:
+        return atis_data["full_text"]
+    return atis_data.render()
+
+
 class ATISGenerator:
     """Generates realistic ATIS entries for aviation practice."""
     
-    def __init__(self):
-        self.airports = DACH_AIRPORTS
+    def __init__(self, rng: Optional[random.Random] = None, profiler=None,
+                 render_cache: Optional[RenderCache] = None):
+        # Airports to pick from when none is given; the DACH airports on first use
+        self._airports: Optional[List[Dict]] = None
+        # Source of randomness; pass a seeded random.Random for reproducible output
+        self.rng = rng if rng is not None else random
+        # full_text is rendered lazily; identical entries share one rendering
+        self.render_cache = render_cache if render_cache is not None else RenderCache()
+        # Optional profiling.StageProfiler; wraps this instance's stage methods
+        # with timers, so unprofiled generators keep the plain methods
+        if profiler is not None:
+            profiler.instrument(self)
+    
+    @property
+    def airports(self) -> List[Dict]:
+        if self._airports is None:
+            self._airports = data.DACH_AIRPORTS
+        return self._airports
+    
+    @airports.setter
+    def airports(self, airports: List[Dict]) -> None:
+        self._airports = airports
     
     def _round_to_nearest(self, value: int, nearest: int) -> int:
         """Round value to nearest increment (for super_easy/easy modes)."""
@@ -26,7 +139,7 @@ class ATISGenerator:
         settings = DIFFICULTY_SETTINGS[difficulty]
         
         # Calm wind
-        if random.random() < settings.get("calm_wind_probability", 0.05):
+        if self.rng.random() < settings.get("calm_wind_probability", 0.05):
             return {
                 "direction": 0,
                 "speed": 0,
@@ -37,12 +150,12 @@ class ATISGenerator:
             }
         
         # Generate direction
-        direction = random.randint(1, 36) * 10  # 010 to 360 in 10° increments
+        direction = self.rng.randint(1, 36) * 10  # 010 to 360 in 10° increments
         
         # Generate speed
         min_speed = settings.get("min_wind_speed", 3)
         max_speed = settings.get("max_wind_speed", 15)
-        speed = random.randint(min_speed, max_speed)
+        speed = self.rng.randint(min_speed, max_speed)
         
         # Round numbers for easier difficulties
         if settings.get("use_round_numbers", False):
@@ -52,8 +165,8 @@ class ATISGenerator:
         
         # Gusts
         gust = None
-        if random.random() < settings.get("gust_probability", 0.1) and speed >= 10:
-            gust_addition = random.randint(8, 20)
+        if self.rng.random() < settings.get("gust_probability", 0.1) and speed >= 10:
+            gust_addition = self.rng.randint(8, 20)
             gust = speed + gust_addition
             if settings.get("use_round_numbers", False):
                 gust = self._round_to_nearest(gust, 5)
@@ -61,8 +174,8 @@ class ATISGenerator:
         # Variable wind (only for light winds)
         variable_from = None
         variable_to = None
-        if random.random() < settings.get("variable_wind_probability", 0.2) and speed <= 6:
-            var_range = random.randint(30, 60)
+        if self.rng.random() < settings.get("variable_wind_probability", 0.2) and speed <= 6:
+            var_range = self.rng.randint(30, 60)
             variable_from = (direction - var_range) % 360
             variable_to = (direction + var_range) % 360
             if variable_from == 0:
@@ -95,7 +208,7 @@ class ATISGenerator:
         if difficulty == "super_easy":
             return 9999
         
-        visibility = random.choice(valid_values)
+        visibility = self.rng.choice(valid_values)
         
         # Round for easier difficulties
         if settings.get("use_round_numbers", False) and visibility < 9999:
@@ -114,17 +227,17 @@ class ATISGenerator:
         if visibility > 1500 or not runways:
             return None
         
-        if random.random() > settings.get("rvr_probability", 0.2):
+        if self.rng.random() > settings.get("rvr_probability", 0.2):
             return None
         
         rvr_data = []
-        num_runways = min(len(runways), random.randint(1, 2 if difficulty == "medium" else 3))
-        selected_runways = random.sample(runways, num_runways)
+        num_runways = min(len(runways), self.rng.randint(1, 2 if difficulty == "medium" else 3))
+        selected_runways = self.rng.sample(runways, num_runways)
         
         for runway in selected_runways:
             # RVR is typically better than or similar to visibility
-            rvr_value = random.choice([v for v in RVR_VALUES if v <= visibility + 300 and v >= visibility - 200])
-            trend = random.choice(["U", "D", "N", ""])  # Up, Down, No change, not reported
+            rvr_value = self.rng.choice([v for v in RVR_VALUES if v <= visibility + 300 and v >= visibility - 200])
+            trend = self.rng.choice(["U", "D", "N", ""])  # Up, Down, No change, not reported
             rvr_data.append({
                 "runway": runway["designator"],
                 "value": rvr_value,
@@ -137,7 +250,7 @@ class ATISGenerator:
         """Generate weather phenomena based on difficulty."""
         settings = DIFFICULTY_SETTINGS[difficulty]
         
-        if random.random() > settings.get("weather_probability", 0.2):
+        if self.rng.random() > settings.get("weather_probability", 0.2):
             return None
         
         allowed_weather = settings.get("allowed_weather", None)
@@ -145,28 +258,28 @@ class ATISGenerator:
         phenomena = []
         num_phenomena = 1
         if difficulty == "hard":
-            num_phenomena = random.randint(1, 2)
+            num_phenomena = self.rng.randint(1, 2)
         
         for _ in range(num_phenomena):
             if allowed_weather:
                 # Use only allowed weather for this difficulty
-                phenomena.append(random.choice(allowed_weather))
+                phenomena.append(self.rng.choice(allowed_weather))
             else:
                 # Full weather generation for hard mode
-                weather_type = random.choice(["precipitation", "obscuration"])
+                weather_type = self.rng.choice(["precipitation", "obscuration"])
                 
                 if weather_type == "precipitation":
-                    intensity = random.choice(WEATHER_PHENOMENA["intensity"])
-                    precip = random.choice(WEATHER_PHENOMENA["precipitation"])
+                    intensity = self.rng.choice(WEATHER_PHENOMENA["intensity"])
+                    precip = self.rng.choice(WEATHER_PHENOMENA["precipitation"])
                     
                     # Add descriptor sometimes
-                    if random.random() < 0.3:
-                        descriptor = random.choice(["SH", "TS", "FZ"])
+                    if self.rng.random() < 0.3:
+                        descriptor = self.rng.choice(["SH", "TS", "FZ"])
                         phenomena.append(f"{intensity}{descriptor}{precip}")
                     else:
                         phenomena.append(f"{intensity}{precip}")
                 else:
-                    phenomena.append(random.choice(WEATHER_PHENOMENA["obscuration"]))
+                    phenomena.append(self.rng.choice(WEATHER_PHENOMENA["obscuration"]))
         
         return phenomena if phenomena else None
     
@@ -176,15 +289,15 @@ class ATISGenerator:
         
         # CAVOK conditions - higher probability for easier difficulties
         cavok_prob = settings.get("cavok_probability", 0.1)
-        if visibility >= 9999 and random.random() < cavok_prob:
+        if visibility >= 9999 and self.rng.random() < cavok_prob:
             return [], True  # CAVOK
         
         # For super_easy without CAVOK, just high scattered clouds
         if difficulty == "super_easy":
-            return [{"type": "FEW", "height_ft": random.choice([8000, 10000, 12000]), "cb": False}], False
+            return [{"type": "FEW", "height_ft": self.rng.choice([8000, 10000, 12000]), "cb": False}], False
         
         # Generate cloud layers
-        num_layers = random.randint(1, settings.get("max_cloud_layers", 3))
+        num_layers = self.rng.randint(1, settings.get("max_cloud_layers", 3))
         layers = []
         
         min_height = settings.get("min_ceiling", 1000)
@@ -199,20 +312,20 @@ class ATISGenerator:
             if not valid_heights:
                 break
             
-            height = random.choice(valid_heights)
+            height = self.rng.choice(valid_heights)
             used_heights.append(height)
             
             # Cloud type based on layer position and difficulty
             if i == 0 and difficulty == "hard" and min_height < 500:
-                cloud_type = random.choice(["BKN", "OVC"])  # Low ceiling for hard
+                cloud_type = self.rng.choice(["BKN", "OVC"])  # Low ceiling for hard
             elif i == 0 and difficulty == "medium":
-                cloud_type = random.choice(["SCT", "BKN", "OVC", "FEW"])
+                cloud_type = self.rng.choice(["SCT", "BKN", "OVC", "FEW"])
             else:
-                cloud_type = random.choice(CLOUD_TYPES)
+                cloud_type = self.rng.choice(CLOUD_TYPES)
             
             # CB clouds only in hard mode
             cb = False
-            if difficulty == "hard" and random.random() < settings.get("cb_probability", 0.1):
+            if difficulty == "hard" and self.rng.random() < settings.get("cb_probability", 0.1):
                 cb = True
             
             layers.append({
@@ -230,7 +343,7 @@ class ATISGenerator:
         settings = DIFFICULTY_SETTINGS[difficulty]
         temp_range = settings.get("temp_range", (-5, 30))
         
-        temperature = random.randint(temp_range[0], temp_range[1])
+        temperature = self.rng.randint(temp_range[0], temp_range[1])
         
         # Round for easier difficulties
         if settings.get("use_round_numbers", False):
@@ -238,9 +351,9 @@ class ATISGenerator:
         
         # Dewpoint spread
         if difficulty in ["super_easy", "easy"]:
-            spread = random.randint(3, 8)  # Comfortable spread
+            spread = self.rng.randint(3, 8)  # Comfortable spread
         else:
-            spread = random.randint(1, 15)  # Can be close (fog) or far
+            spread = self.rng.randint(1, 15)  # Can be close (fog) or far
         
         dewpoint = temperature - spread
         
@@ -254,7 +367,7 @@ class ATISGenerator:
         settings = DIFFICULTY_SETTINGS[difficulty]
         qnh_range = settings.get("qnh_range", (1000, 1030))
         
-        qnh = random.randint(qnh_range[0], qnh_range[1])
+        qnh = self.rng.randint(qnh_range[0], qnh_range[1])
         
         # Round for easier difficulties
         if settings.get("use_round_numbers", False):
@@ -301,7 +414,7 @@ class ATISGenerator:
         if settings.get("single_runway_only", True):
             active = [best_runways[0][0]["designator"]]
         else:
-            num_active = 1 if len(runways) < 4 else random.randint(1, 2)
+            num_active = 1 if len(runways) < 4 else self.rng.randint(1, 2)
             active = [r[0]["designator"] for r in best_runways[:num_active]]
         
         return {
@@ -320,7 +433,7 @@ class ATISGenerator:
         
         # Simple approach for easy difficulties
         if settings.get("simple_approach_only", False):
-            return random.choice(["ILS", "Visual"] if has_ils else ["Visual", "RNAV"])
+            return self.rng.choice(["ILS", "Visual"] if has_ils else ["Visual", "RNAV"])
         
         # Get ceiling
         ceiling = None
@@ -340,23 +453,23 @@ class ATISGenerator:
             elif "RNAV" in available_approaches:
                 return "RNAV"
         elif visibility >= 5000 and (not ceiling or ceiling > 1500):
-            if random.random() < 0.2 and "Visual" in available_approaches:
+            if self.rng.random() < 0.2 and "Visual" in available_approaches:
                 return "Visual"
         
         # Default selection from available
         if has_ils:
             ils_options = [a for a in available_approaches if "ILS" in a and "CAT" not in a]
             if ils_options:
-                return random.choice(ils_options)
+                return self.rng.choice(ils_options)
         
         non_visual = [a for a in available_approaches if a != "Visual"]
-        return random.choice(non_visual) if non_visual else "ILS"
+        return self.rng.choice(non_visual) if non_visual else "ILS"
     
     def generate_remarks(self, difficulty: str, weather: Optional[List[str]]) -> Optional[str]:
         """Generate optional remarks/NOTAMs based on difficulty."""
         settings = DIFFICULTY_SETTINGS[difficulty]
         
-        if random.random() > settings.get("remarks_probability", 0.3):
+        if self.rng.random() > settings.get("remarks_probability", 0.3):
             return None
         
         max_remarks = settings.get("max_remarks", 1)
@@ -377,11 +490,11 @@ class ATISGenerator:
         if not available_remarks:
             return None
         
-        num_remarks = random.randint(1, max_remarks)
-        selected = random.sample(available_remarks, min(num_remarks, len(available_remarks)))
+        num_remarks = self.rng.randint(1, max_remarks)
+        selected = self.rng.sample(available_remarks, min(num_remarks, len(available_remarks)))
         
         # Add wind shear warning in hard mode
-        if difficulty == "hard" and random.random() < settings.get("windshear_probability", 0.1):
+        if difficulty == "hard" and self.rng.random() < settings.get("windshear_probability", 0.1):
             selected.append("LOW LEVEL WIND SHEAR ALERT")
         
         return ". ".join(selected)
@@ -559,11 +672,20 @@ class ATISGenerator:
         
         return " ".join(lines)
     
+    def render_text(self, data: Dict) -> str:
+        """full_text of generated data, through the render cache."""
+        key = render_key(data)
+        text = self.render_cache.get(key)
+        if text is None:
+            text = self.generate_full_text(data["airport"], data)
+            self.render_cache.put(key, text)
+        return text
+    
     def generate_atis(self, airport: Optional[Dict] = None, 
                       difficulty: str = "medium") -> Dict:
-        """Generate a complete ATIS entry."""
+        """Generate a complete ATIS entry; full_text is rendered by its render()."""
         if airport is None:
-            airport = random.choice(self.airports)
+            airport = self.rng.choice(self.airports)
         
         # Validate difficulty
         if difficulty not in DIFFICULTY_SETTINGS:
@@ -590,11 +712,11 @@ class ATISGenerator:
         
         approach_type = self.select_approach_type(runway_dict, visibility, clouds, difficulty)
         remarks = self.generate_remarks(difficulty, weather)
-        information_letter = random.choice(NATO_ALPHABET)
-        observation_time = datetime.utcnow() - timedelta(minutes=random.randint(0, 30))
+        information_letter = self.rng.choice(NATO_ALPHABET)
+        observation_time = datetime.utcnow() - timedelta(minutes=self.rng.randint(0, 30))
         
         # Compile data
-        data = {
+        data = ATISEntry({
             "airport": airport,
             "information_letter": information_letter,
             "observation_time": observation_time,
@@ -612,10 +734,8 @@ class ATISGenerator:
             "approach_type": approach_type,
             "remarks": remarks,
             "difficulty": difficulty
-        }
-        
-        # Generate full text
-        data["full_text"] = self.generate_full_text(airport, data)
+        })
+        data._render = self.render_text
         
         return data
     
@@ -644,10 +764,42 @@ class ATISGenerator:
             "approach_type": atis_data["approach_type"],
             "transition_level": atis_data["transition_level"],
             "remarks": atis_data["remarks"],
-            "full_text": atis_data["full_text"],
-            "difficulty": atis_data["difficulty"]
+            "full_text": rendered_text(atis_data),
+            "difficulty": atis_data["difficulty"],
+            "entry_key": atis_data.get("entry_key")
         }
-
+    
+    def to_directus_record(self, atis_data: Dict, airport_id: int) -> Tuple:
+        """Convert generated ATIS data to a compact record in DIRECTUS_COLUMNS order.
+        The observation time stays a datetime; the serializer encodes it.
+        """
+        wind = atis_data["wind"]
+        
+        return (
+            airport_id,
+            atis_data["information_letter"],
+            atis_data["observation_time"],
+            wind["direction"],
+            wind["speed"],
+            wind["gust"],
+            wind["variable_from"],
+            wind["variable_to"],
+            atis_data["visibility"],
+            atis_data["rvr"],
+            atis_data["weather"],
+            atis_data["clouds"],
+            atis_data["cavok"],
+            atis_data["temperature"],
+            atis_data["dewpoint"],
+            atis_data["qnh"],
+            atis_data["active_runways"],
+            atis_data["approach_type"],
+            atis_data["transition_level"],
+            atis_data["remarks"],
+            rendered_text(atis_data),
+            atis_data["difficulty"],
+            atis_data.get("entry_key")
+        )
 
 if __name__ == "__main__":
     # Test the generator with all difficulty levels
@@ -660,7 +812,7 @@ if __name__ == "__main__":
         print('='*70)
         
         atis = generator.generate_atis(difficulty=difficulty)
-        print(f"\n{atis['full_text']}")
+        print(f"\n{atis.render()}")
         print(f"\n--- Details ---")
         print(f"Airport: {atis['airport']['icao']} - {atis['airport']['name']}")
         print(f"Wind: {atis['wind']}")
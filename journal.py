@@ -0,0 +1,134 @@
+"""
+Crash-safe upload journal
+
+Records the generation plan of each upload run (entry count, batch size,
+seed) and the status of every batch in a local SQLite database, so an
+interrupted run can be resumed by re-sending only unacknowledged batches.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# (batch_index, seed, size)
+BatchPlan = Tuple[int, str, int]
+
+
+def plan_batches(count: int, batch_size: int, run_seed: int) -> List[BatchPlan]:
+    """Split a run into batches with deterministic per-batch seeds."""
+    return [
+        (index, f"{run_seed}-{index}", min(batch_size, count - start))
+        for index, start in enumerate(range(0, count, batch_size))
+    ]
+
+
+def entry_key(batch_seed: str, position: int) -> str:
+    """Deterministic atis_entries.entry_key of an entry within a batch."""
+    return f"{batch_seed}-{position}"
+
+
+def plan_key_prefixes(batches: List[BatchPlan]) -> List[str]:
+    """Entry key prefixes shared by all entries of the runs in a plan."""
+    return sorted({seed.rsplit("-", 1)[0] + "-" for _, seed, _ in batches})
+
+
+class UploadJournal:
+    """SQLite-backed journal of upload runs and their batches.
+
+    Uses WAL mode with synchronous=NORMAL: acknowledging a batch is a single
+    small UPDATE that never waits for an fsync, so journaling does not
+    throttle upload throughput. A crash can lose at most the last few acks,
+    which only causes those batches to be re-sent on resume.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                batch_size INTEGER NOT NULL,
+                seed INTEGER NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS batches (
+                run_id INTEGER NOT NULL REFERENCES runs(id),
+                batch_index INTEGER NOT NULL,
+                seed TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                acked INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, batch_index)
+            );
+        """)
+
+    def start_run(self, count: int, batch_size: int, seed: int) -> Tuple[int, List[BatchPlan]]:
+        """Record a new run and its full batch plan."""
+        batches = plan_batches(count, batch_size, seed)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            cursor = self._conn.execute(
+                "INSERT INTO runs (created_at, count, batch_size, seed) VALUES (?, ?, ?, ?)",
+                (datetime.utcnow().isoformat(), count, batch_size, seed)
+            )
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO batches (run_id, batch_index, seed, size) VALUES (?, ?, ?, ?)",
+                [(run_id, index, batch_seed, size) for index, batch_seed, size in batches]
+            )
+            self._conn.execute("COMMIT")
+        return run_id, batches
+
+    def latest_incomplete_run(self) -> Optional[Dict]:
+        """Get the most recent run that still has unacknowledged batches."""
+        row = self._conn.execute(
+            "SELECT id, created_at, count, batch_size, seed FROM runs "
+            "WHERE completed = 0 ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(["id", "created_at", "count", "batch_size", "seed"], row))
+
+    def pending_batches(self, run_id: int) -> List[BatchPlan]:
+        """Get the batches of a run that have not been acknowledged."""
+        return self._conn.execute(
+            "SELECT batch_index, seed, size FROM batches "
+            "WHERE run_id = ? AND acked = 0 ORDER BY batch_index",
+            (run_id,)
+        ).fetchall()
+
+    def mark_acked(self, run_id: int, batch_index: int) -> None:
+        """Record that Directus accepted a batch."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batches SET acked = 1, attempts = attempts + 1 "
+                "WHERE run_id = ? AND batch_index = ?",
+                (run_id, batch_index)
+            )
+
+    def mark_failed(self, run_id: int, batch_index: int) -> None:
+        """Record a failed upload attempt for a batch."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE batches SET attempts = attempts + 1 "
+                "WHERE run_id = ? AND batch_index = ?",
+                (run_id, batch_index)
+            )
+
+    def finish_run(self, run_id: int) -> bool:
+        """Mark a run complete if every batch was acknowledged."""
+        with self._lock:
+            pending = self._conn.execute(
+                "SELECT COUNT(*) FROM batches WHERE run_id = ? AND acked = 0", (run_id,)
+            ).fetchone()[0]
+            if pending == 0:
+                self._conn.execute("UPDATE runs SET completed = 1 WHERE id = ?", (run_id,))
+        return pending == 0
+
+    def close(self) -> None:
+        self._conn.close()
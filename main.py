@@ -1,152 +1,378 @@
 """
 Main script to set up Directus schema and generate ATIS entries
 """
-import time
-from typing import Dict, List
-from directus_client import DirectusClient, setup_schema
-from generator import ATISGenerator
-from data import DACH_AIRPORTS
-from config import NUM_ATIS_TO_GENERATE
-
-
-def deduplicate_airports(airports: List[Dict]) -> List[Dict]:
-    """Remove duplicate airports based on ICAO code."""
-    seen = set()
-    unique = []
-    for airport in airports:
-        if airport["icao"] not in seen:
-            seen.add(airport["icao"])
-            unique.append(airport)
-    return unique
-
-
-def populate_airports(client: DirectusClient) -> Dict[str, int]:
-    """Populate the airport collection with DACH airports.
+import argparse
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+from airport_db import AirportDatabase, default_database
+from journal import UploadJournal
+from pipeline import UploadPipeline
+from profiling import StageProfiler
+from record_log import RecordLog
+from sinks import ExportPipeline, open_sink
+from textcodec import TextCodec
+import data
+from config import (
+    NUM_ATIS_TO_GENERATE, UPLOAD_BATCH_SIZE, PIPELINE_QUEUE_SIZE,
+    GENERATOR_WORKERS, SERIALIZER_WORKERS, UPLOADER_WORKERS, JOURNAL_PATH,
+    EXPORT_PARTITION_SIZE, EXPORT_CONCURRENCY, AIRPORT_CACHE_PATH, PLAN_SEED
+)
+
+if TYPE_CHECKING:
+    # The Directus client (and requests) is imported only when talking to Directus,
+    # so offline generation and exports start quickly
+    from directus_client import DirectusClient
+
+
+def select_airports(args: argparse.Namespace) -> List[Dict]:
+    """Airports chosen on the command line; the DACH airports by default."""
+    if not (args.airport_packs or args.regions or args.countries or args.near):
+        return data.DACH_AIRPORTS
+    database = AirportDatabase(args.airport_packs) if args.airport_packs else default_database()
+    near = tuple(float(v) for v in args.near.split(",")) if args.near else None
+    try:
+        airports = database.select(regions=args.regions, countries=args.countries,
+                                   near=near, radius_km=args.radius)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return []
+    print(f"✈️ Selected {len(airports)} airports")
+    return airports
+
+
+def populate_airports(client: "DirectusClient", airports: Optional[List[Dict]] = None,
+                      cache_path: Optional[str] = AIRPORT_CACHE_PATH,
+                      refresh: bool = False) -> Dict[str, int]:
+    """Sync the airport collection with the given airports (DACH by default).
+    Only new and changed airports are sent, in concurrent batches; see airport_sync.py.
     Returns a mapping of ICAO code to Directus ID.
     """
+    from airport_sync import AirportSync
+
     print("\n✈️ Populating airports...")
     
-    # Check existing airports
-    existing = client.get_items("airport")
-    existing_icao = {a.get("icao"): a["id"] for a in existing if a.get("icao")}
-    
-    if existing_icao:
-        print(f"  Found {len(existing_icao)} existing airports")
-    
-    # Prepare airports to insert
-    airports_to_insert = []
-    unique_airports = deduplicate_airports(DACH_AIRPORTS)
-    
-    for airport in unique_airports:
-        if airport["icao"] not in existing_icao:
-            airports_to_insert.append({
-                "icao": airport["icao"],
-                "name": airport["name"],
-                "city": airport.get("city"),
-                "country": airport.get("country"),
-                "elevation_ft": airport.get("elevation_ft"),
-                "transition_altitude": airport.get("transition_altitude", 5000),
-                "default_freq": airport.get("default_freq"),
-                "runways": airport.get("runways")
-            })
-    
-    if airports_to_insert:
-        # Insert in batches to avoid timeout
-        batch_size = 10
-        for i in range(0, len(airports_to_insert), batch_size):
-            batch = airports_to_insert[i:i+batch_size]
-            client.insert_items("airport", batch)
-            time.sleep(0.5)  # Small delay between batches
-        
-        # Refresh the mapping
-        existing = client.get_items("airport")
-        existing_icao = {a.get("icao"): a["id"] for a in existing if a.get("icao")}
-    
-    print(f"  ✓ Total airports in database: {len(existing_icao)}")
-    return existing_icao
-
-
-def generate_atis_entries(client: DirectusClient, airport_mapping: Dict[str, int], 
-                          count: int = 500) -> None:
-    """Generate and insert ATIS entries with balanced difficulty distribution."""
-    print(f"\n📻 Generating {count} ATIS entries...")
-    
-    generator = ATISGenerator()
-    
-    # Four difficulty tiers with weighted distribution
-    # 20% super_easy, 30% easy, 35% medium, 15% hard
-    difficulties = ["super_easy", "easy", "medium", "hard"]
-    difficulty_weights = [0.20, 0.30, 0.35, 0.15]
-    
-    entries = []
-    difficulty_counts = {d: 0 for d in difficulties}
-    
-    for i in range(count):
-        # Select difficulty based on weights
-        difficulty = random.choices(difficulties, difficulty_weights)[0]
-        difficulty_counts[difficulty] += 1
-        
-        # Select a random airport that exists in the database
-        valid_airports = [a for a in DACH_AIRPORTS if a["icao"] in airport_mapping]
-        if not valid_airports:
-            print("  ✗ No valid airports found in database!")
-            return
-        
-        airport = random.choice(valid_airports)
-        airport_id = airport_mapping[airport["icao"]]
-        
-        # Generate ATIS
-        atis_data = generator.generate_atis(airport=airport, difficulty=difficulty)
-        entry = generator.to_directus_format(atis_data, airport_id)
-        entries.append(entry)
-        
-        # Progress indicator
-        if (i + 1) % 50 == 0:
-            print(f"  Generated {i + 1}/{count} entries...")
+    sync = AirportSync(client, cache_path=cache_path)
+    mapping = sync.run(data.DACH_AIRPORTS if airports is None else airports, refresh=refresh)
+    
+    print(f"  ✓ Total airports in database: {len(mapping)}")
+    return mapping
+
+
+def generate_atis_entries(client: "DirectusClient", airport_mapping: Dict[str, int], 
+                          count: int = 500, generator_workers: int = GENERATOR_WORKERS,
+                          serializer_workers: int = SERIALIZER_WORKERS,
+                          uploader_workers: int = UPLOADER_WORKERS,
+                          queue_size: int = PIPELINE_QUEUE_SIZE,
+                          seed: Optional[int] = None, resume: bool = False,
+                          journal_path: str = JOURNAL_PATH, bulk_import: bool = False,
+                          profiler: Optional[StageProfiler] = None,
+                          airports: Optional[List[Dict]] = None) -> None:
+    """Generate and insert ATIS entries with balanced difficulty distribution.
+    Generation, serialization and upload run as overlapping pipeline stages.
+    Every batch is recorded in the upload journal; with ``resume`` the latest
+    interrupted run is continued by re-sending only unacknowledged batches.
+    With ``bulk_import`` the entries are streamed to the Directus import
+    utility as one file, falling back to the pipeline if that fails.
+    A ``profiler`` times the generator stages and its hottest stages are printed.
+    Entries are generated for ``airports`` (the DACH airports by default).
+    """
+    if airports is None:
+        airports = data.DACH_AIRPORTS
+    journal = UploadJournal(journal_path)
+    run = journal.latest_incomplete_run() if resume else None
+    
+    if resume and run is None:
+        print("\n  No interrupted run found in the journal, starting a new one")
+    if run is not None:
+        run_id = run["id"]
+        batches = journal.pending_batches(run_id)
+        count = sum(size for _, _, size in batches)
+        print(f"\n📻 Resuming run {run_id} from {run['created_at']}: "
+              f"{len(batches)} batches ({count} entries) left to upload...")
+    else:
+        if seed is None:
+            seed = PLAN_SEED
+        run_id, batches = journal.start_run(count, UPLOAD_BATCH_SIZE, seed)
+        print(f"\n📻 Generating and uploading {count} ATIS entries (run {run_id}, seed {seed})...")
+    
+    pipeline = UploadPipeline(
+        client, airport_mapping, airports,
+        batch_size=UPLOAD_BATCH_SIZE,
+        queue_size=queue_size,
+        generator_workers=generator_workers,
+        serializer_workers=serializer_workers,
+        uploader_workers=uploader_workers,
+        journal=journal,
+        run_id=run_id,
+        profiler=profiler
+    )
+    if bulk_import:
+        from bulk_import import BulkImportLoader
+
+        loader = BulkImportLoader(client, airport_mapping, airports,
+                                  journal=journal, run_id=run_id, fallback=pipeline,
+                                  profiler=profiler)
+        stats = loader.run_plan(batches)
+    else:
+        stats = pipeline.run_plan(batches)
+    complete = journal.finish_run(run_id)
+    journal.close()
     
     # Show distribution
+    # Of the entries sent this run; entries skipped as already present are not counted
+    generated = sum(stats["difficulty_counts"].values())
     print(f"\n  Difficulty distribution:")
-    for diff, cnt in difficulty_counts.items():
-        pct = (cnt / count) * 100
+    for diff, cnt in stats["difficulty_counts"].items():
+        pct = (cnt / generated) * 100 if generated else 0
         print(f"    {diff.replace('_', ' ').title()}: {cnt} ({pct:.1f}%)")
     
-    # Insert in batches
-    print(f"\n📤 Uploading entries to Directus...")
-    batch_size = 25
-    success_count = 0
+    for error in stats["errors"]:
+        print(f"  ✗ {error}")
+    if stats["failed"]:
+        print(f"  ✗ {stats['failed']} entries failed to upload")
+    elapsed = stats.get("elapsed_s", 0)
+    rate = stats["uploaded"] / elapsed if elapsed else 0
+    print(f"  ✓ Successfully inserted {stats['uploaded']} ATIS entries ({rate:.0f} entries/s)")
+    if stats["skipped"]:
+        print(f"  ↷ Skipped {stats['skipped']} entries already present in Directus")
+    if not complete:
+        print(f"  ℹ️ Run {run_id} is incomplete; rerun with --resume to upload the rest")
     
-    for i in range(0, len(entries), batch_size):
-        batch = entries[i:i+batch_size]
-        try:
-            if client.insert_items("atis_entries", batch):
-                success_count += len(batch)
-        except Exception as e:
-            print(f"  ✗ Error inserting batch: {e}")
-        
-        # Progress and rate limiting
-        if (i + batch_size) % 100 == 0:
-            print(f"  Uploaded {min(i + batch_size, len(entries))}/{len(entries)} entries...")
-        time.sleep(0.3)
+    if profiler is not None:
+        print("\n⏱️  Generator stage profile:")
+        for line in profiler.report_lines():
+            print(f"  {line}")
+
+
+def pull_entries(client: "DirectusClient", args: argparse.Namespace) -> None:
+    """Export atis_entries from Directus into local files, partition by partition."""
+    from directus_export import DirectusExporter
+
+    text_codec = TextCodec.default() if args.compress_text else None
+    sinks = [open_sink(path, text_codec=text_codec, append=args.resume) for path in args.pull]
+    print(f"\n📥 Exporting atis_entries to {', '.join(args.pull)}...")
+    
+    exporter = DirectusExporter(client, sinks, partition_size=args.partition_size,
+                                concurrency=args.pull_concurrency, queue_size=args.queue_size)
+    stats = exporter.run(resume=args.resume)
     
-    print(f"  ✓ Successfully inserted {success_count} ATIS entries")
+    for error in stats["errors"]:
+        print(f"  ✗ {error}")
+    if stats["failed_partitions"]:
+        print(f"  ✗ {len(stats['failed_partitions'])} partitions failed; "
+              f"rerun with --resume to export them")
+    elapsed = stats["elapsed_s"]
+    for path, sink_stats in stats["sinks"].items():
+        print(f"  ✓ {path}: {sink_stats['rows']} entries "
+              f"(writer busy {sink_stats['busy_s']:.2f}s of {elapsed:.2f}s)")
+    print(f"  {stats['rows'] / elapsed:.0f} rows/s, {stats['retries']} page retries")
 
 
-import random  # Add this at the top
+def upload_record_log(client: "DirectusClient", airport_mapping: Dict[str, int],
+                      airports: List[Dict], args: argparse.Namespace) -> None:
+    """Upload entries from a record log through the upload pipeline."""
+    log = RecordLog(args.upload_log)
+    if log.recovered:
+        print(f"  ↷ Dropped {log.recovered} incomplete records at the end of {args.upload_log}")
+    print(f"\n📻 Uploading {max(0, len(log) - args.log_start)} entries from {args.upload_log}...")
+    
+    pipeline = UploadPipeline(
+        client, airport_mapping, airports,
+        batch_size=UPLOAD_BATCH_SIZE,
+        queue_size=args.queue_size,
+        serializer_workers=args.serializer_workers,
+        uploader_workers=args.uploader_workers
+    )
+    stats = pipeline.run_log(log, start=args.log_start)
+    log.close()
+    
+    for error in stats["errors"]:
+        print(f"  ✗ {error}")
+    if stats["failed"]:
+        print(f"  ✗ {stats['failed']} entries failed to upload")
+    elapsed = stats.get("elapsed_s", 0)
+    rate = stats["uploaded"] / elapsed if elapsed else 0
+    print(f"  ✓ Successfully inserted {stats['uploaded']} ATIS entries ({rate:.0f} entries/s)")
+    if stats["skipped"]:
+        print(f"  ↷ Skipped {stats['skipped']} entries already present in Directus")
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Generate ATIS entries into Directus")
+    
+    parser.add_argument("--count", type=int, default=NUM_ATIS_TO_GENERATE,
+                        help="number of ATIS entries to generate")
+    
+    parser.add_argument("--seed", type=int,
+                        help=f"seed of the generation plan (default {PLAN_SEED}); entries of a "
+                             f"seed already in Directus are skipped")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the latest interrupted run from the upload journal")
+    
+    parser.add_argument("--bulk-import", action="store_true",
+                        help="stream all entries to the Directus import utility in one upload")
+    
+    parser.add_argument("--export", nargs="+", metavar="PATH",
+                        help="write entries to local files (.jsonl, .csv, .sqlite, .atis, .atislog) instead of Directus")
+    parser.add_argument("--compress-text", action="store_true",
+                        help="dictionary compress full_text and remarks in .sqlite and .atis exports")
+    
+    parser.add_argument("--refresh-airports", action="store_true",
+                        help="ignore the cached airport ids and sync airports with Directus")
+    parser.add_argument("--pull", nargs="+", metavar="PATH",
+                        help="export atis_entries from Directus into local files "
+                             "(with --resume, continue an interrupted export)")
+    parser.add_argument("--partition-size", type=int, default=EXPORT_PARTITION_SIZE,
+                        help="ids per partition of --pull")
+    parser.add_argument("--pull-concurrency", type=int, default=EXPORT_CONCURRENCY,
+                        help="partitions of --pull fetched at once")
+    parser.add_argument("--upload-log", metavar="PATH",
+                        help="upload the entries of a record log (.atislog) instead of generating")
+    parser.add_argument("--log-start", type=int, default=0, metavar="INDEX",
+                        help="first record of --upload-log to upload")
+    
+    selection = parser.add_argument_group("airports")
+    selection.add_argument("--airport-packs", metavar="DIR",
+                           help="region packs to draw airports from (e.g. written by airport_import.py)")
+    selection.add_argument("--regions", nargs="+", metavar="REGION",
+                           help="airports of these region packs")
+    selection.add_argument("--countries", nargs="+", metavar="CODE",
+                           help="airports of these countries")
+    selection.add_argument("--near", metavar="LAT,LON",
+                           help="airports within --radius of this point")
+    selection.add_argument("--radius", type=float, default=250.0, metavar="KM")
+    
+    stages = parser.add_argument_group("pipeline")
+    stages.add_argument("--generator-workers", type=int, default=GENERATOR_WORKERS,
+                        help="generator processes (more than 1 generates in worker processes)")
+    stages.add_argument("--serializer-workers", type=int, default=SERIALIZER_WORKERS)
+    stages.add_argument("--uploader-workers", type=int, default=UPLOADER_WORKERS)
+    stages.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="batches buffered between pipeline stages")
+    
+    parser.add_argument("--profile", action="store_true",
+                        help="time the generator stages and print the hottest ones")
+    
+    observability = parser.add_argument_group("metrics")
+    observability.add_argument("--metrics-file", metavar="PATH",
+                               help="write client request metrics (.json, otherwise Prometheus text)")
+    observability.add_argument("--metrics-port", type=int,
+                               help="serve /metrics and /metrics.json on this local port")
+    
+    prune = parser.add_argument_group("pruning")
+    prune.add_argument("--clear", action="store_true",
+                       help="delete ATIS entries matching the filters below and exit")
+    prune.add_argument("--difficulty", choices=["super_easy", "easy", "medium", "hard"])
+    prune.add_argument("--airport", help="ICAO code of the airport")
+    prune.add_argument("--created-after", type=datetime.fromisoformat, metavar="ISO_DATE")
+    prune.add_argument("--created-before", type=datetime.fromisoformat, metavar="ISO_DATE")
+    prune.add_argument("--delete-chunk-size", type=int, default=5000)
+    prune.add_argument("--delete-concurrency", type=int, default=4)
+    
+    return parser.parse_args()
+
+
+def clear_entries(client: "DirectusClient", args: argparse.Namespace) -> None:
+    """Delete ATIS entries matching the command line filters."""
+    from directus_client import build_entry_filter
+
+    entry_filter = build_entry_filter(
+        difficulty=args.difficulty,
+        airport=args.airport,
+        created_after=args.created_after,
+        created_before=args.created_before
+    )
+    if client.clear_collection("atis_entries", entry_filter,
+                               chunk_size=args.delete_chunk_size,
+                               concurrency=args.delete_concurrency):
+        print("  ✓ Matching ATIS entries deleted")
+
+
+def export_entries(args: argparse.Namespace) -> None:
+    """Generate ATIS entries into local export files in one pass."""
+    airports = select_airports(args)
+    if not airports:
+        print("No airports selected. Cannot generate ATIS entries.")
+        return
+    text_codec = TextCodec.default() if args.compress_text else None
+    sinks = [open_sink(path, text_codec=text_codec) for path in args.export]
+    profiler = StageProfiler() if args.profile else None
+    print(f"\n📻 Exporting {args.count} ATIS entries to {', '.join(args.export)}...")
+    
+    exporter = ExportPipeline(sinks, airports,
+                              queue_size=args.queue_size, profiler=profiler)
+    stats = exporter.run(args.count, seed=args.seed)
+    
+    for error in stats["errors"]:
+        print(f"  ✗ {error}")
+    elapsed = stats["elapsed_s"]
+    for path, sink_stats in stats["sinks"].items():
+        print(f"  ✓ {path}: {sink_stats['rows']} entries "
+              f"(writer busy {sink_stats['busy_s']:.2f}s of {elapsed:.2f}s)")
+    print(f"  Seed {stats['seed']}, {stats['generated'] / elapsed:.0f} entries/s")
+    
+    if profiler is not None:
+        print("\n⏱️  Generator stage profile:")
+        for line in profiler.report_lines():
+            print(f"  {line}")
 
 
 def main():
     """Main entry point."""
+    args = parse_args()
+    
     print("=" * 60)
     print("ATIS Generator for Directus")
     print("=" * 60)
     
+    if args.export:
+        # Offline export needs no Directus connection
+        export_entries(args)
+        return
+    
     # Initialize client
+    from directus_client import DirectusClient, DirectusError
+
     client = DirectusClient()
+    if args.metrics_port:
+        client.metrics.serve(args.metrics_port)
+        print(f"📈 Serving client metrics on http://127.0.0.1:{args.metrics_port}/metrics")
     
+    try:
+        run(client, args)
+    except DirectusError as e:
+        print(f"✗ {e}")
+    finally:
+        report_metrics(client, args.metrics_file)
+
+
+def report_metrics(client: "DirectusClient", path: Optional[str] = None) -> None:
+    """Print the per-endpoint request summary and optionally export it."""
+    print("\n📈 Directus requests:")
+    for line in client.metrics.summary_lines():
+        print(f"  {line}")
+    if path:
+        client.metrics.write(path)
+        print(f"  Metrics written to {path}")
+
+
+def run(client: "DirectusClient", args: argparse.Namespace) -> None:
+    """Authenticate and run schema setup, airport population and generation."""
+    from directus_client import setup_schema
+
     if not client.login():
         print("Failed to authenticate. Please check your credentials.")
         return
     
+    if args.clear:
+        clear_entries(client, args)
+        return
+    
+    if args.pull:
+        pull_entries(client, args)
+        return
+    
     # Step 1: Set up schema
     print("\n📋 Step 1: Setting up database schema...")
     setup_schema(client)
@@ -156,25 +382,45 @@ def main():
     
     # Step 2: Populate airports
     print("\n📋 Step 2: Populating airports...")
-    airport_mapping = populate_airports(client)
+    airports = select_airports(args)
+    if not airports:
+        print("No airports selected. Cannot generate ATIS entries.")
+        return
+    airport_mapping = populate_airports(client, airports, refresh=args.refresh_airports)
     
-    if not airport_mapping:
+    if not airports or not airport_mapping:
         print("No airports found. Cannot generate ATIS entries.")
         return
     
     # Refresh auth token
     client.refresh_auth()
     
+    if args.upload_log:
+        print(f"\n📋 Step 3: Uploading ATIS entries from {args.upload_log}...")
+        upload_record_log(client, airport_mapping, airports, args)
+        return
+    
     # Step 3: Generate ATIS entries
-    print(f"\n📋 Step 3: Generating {NUM_ATIS_TO_GENERATE} ATIS entries...")
-    generate_atis_entries(client, airport_mapping, NUM_ATIS_TO_GENERATE)
+    print(f"\n📋 Step 3: Generating {args.count} ATIS entries...")
+    generate_atis_entries(
+        client, airport_mapping, args.count,
+        generator_workers=args.generator_workers,
+        serializer_workers=args.serializer_workers,
+        uploader_workers=args.uploader_workers,
+        queue_size=args.queue_size,
+        seed=args.seed,
+        resume=args.resume,
+        bulk_import=args.bulk_import,
+        profiler=StageProfiler() if args.profile else None,
+        airports=airports
+    )
     
     print("\n" + "=" * 60)
     print("✅ ATIS generation complete!")
     print("=" * 60)
     print(f"\nYou can now view your data at: {client.base_url}")
     print("Collections created/updated:")
-    print("  - airport (DACH airports with runway data)")
+    print("  - airport (airports with runway data)")
     print("  - atis_entries (generated ATIS practice entries)")
 
 
@@ -0,0 +1,222 @@
+"""
+Request metrics for DirectusClient
+
+Counters and fixed-bucket latency histograms per (method, endpoint,
+collection), with request/response byte counts, retries and status codes.
+Snapshots export as JSON or Prometheus text, to a file or a local endpoint.
+"""
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Upper bounds of the latency buckets in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (method, endpoint, collection)
+SeriesKey = Tuple[str, str, str]
+
+
+def request_labels(method: str, path: str) -> SeriesKey:
+    """Map a request path like /items/atis_entries to its metric labels."""
+    parts = [p for p in path.split("?", 1)[0].split("/") if p]
+    endpoint = parts[0] if parts else ""
+    if endpoint == "utils" and len(parts) > 1:
+        endpoint = f"utils/{parts[1]}"
+        collection = parts[2] if len(parts) > 2 else ""
+    elif endpoint == "auth":
+        endpoint = "/".join(parts[:2])
+        collection = ""
+    else:
+        collection = parts[1] if len(parts) > 1 else ""
+    return method, endpoint, collection
+
+
+class _Series:
+    """Metrics of one (method, endpoint, collection) combination."""
+
+    __slots__ = ("requests", "retries", "request_bytes", "response_bytes",
+                 "latency_sum", "buckets", "statuses")
+
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.statuses: Dict[int, int] = {}
+
+
+class RequestMetrics:
+    """Thread-safe request metrics; recording is a dict lookup and a bisect."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series: Dict[SeriesKey, _Series] = {}
+        self.started = time.time()
+
+    def _get(self, key: SeriesKey) -> _Series:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, _Series())
+        return series
+
+    def record(self, method: str, path: str, status: int, latency_s: float,
+               request_bytes: int = 0, response_bytes: int = 0) -> None:
+        """Record one completed HTTP request (one attempt)."""
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, latency_s)
+        key = request_labels(method, path)
+        with self._lock:
+            series = self._get(key)
+            series.requests += 1
+            series.latency_sum += latency_s
+            series.buckets[bucket] += 1
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def record_request_bytes(self, method: str, path: str, count: int) -> None:
+        """Add request bytes that were not known when the request was recorded."""
+        key = request_labels(method, path)
+        with self._lock:
+            self._get(key).request_bytes += count
+
+    def record_retry(self, method: str, path: str) -> None:
+        """Record that a request is being retried."""
+        key = request_labels(method, path)
+        with self._lock:
+            self._get(key).retries += 1
+
+    def snapshot(self) -> Dict:
+        """Current metrics as a JSON-serialisable dict."""
+        with self._lock:
+            series = [
+                {
+                    "method": method,
+                    "endpoint": endpoint,
+                    "collection": collection,
+                    "requests": s.requests,
+                    "retries": s.retries,
+                    "request_bytes": s.request_bytes,
+                    "response_bytes": s.response_bytes,
+                    "latency_sum_s": s.latency_sum,
+                    "latency_buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], s.buckets)),
+                    "status_codes": {str(code): count for code, count in sorted(s.statuses.items())}
+                }
+                for (method, endpoint, collection), s in sorted(self._series.items())
+            ]
+        for entry in series:
+            entry["p50_s"] = _bucket_percentile(entry["latency_buckets"], 0.50)
+            entry["p99_s"] = _bucket_percentile(entry["latency_buckets"], 0.99)
+        return {"uptime_s": time.time() - self.started, "series": series}
+
+    def to_prometheus(self) -> str:
+        """Current metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP directus_client_requests_total HTTP requests sent by DirectusClient.",
+            "# TYPE directus_client_requests_total counter",
+        ]
+        snapshot = self.snapshot()["series"]
+
+        def labels(entry: Dict, **extra) -> str:
+            pairs = {"method": entry["method"], "endpoint": entry["endpoint"],
+                     "collection": entry["collection"], **extra}
+            return ",".join(f'{k}="{v}"' for k, v in pairs.items())
+
+        for entry in snapshot:
+            for code, count in entry["status_codes"].items():
+                lines.append(f"directus_client_requests_total{{{labels(entry, status=code)}}} {count}")
+
+        for name, field, help_text in (
+            ("directus_client_retries_total", "retries", "Request attempts that were retried."),
+            ("directus_client_request_bytes_total", "request_bytes", "Request body bytes sent."),
+            ("directus_client_response_bytes_total", "response_bytes", "Response body bytes received."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for entry in snapshot:
+                lines.append(f"{name}{{{labels(entry)}}} {entry[field]}")
+
+        lines.append("# HELP directus_client_request_duration_seconds Request latency.")
+        lines.append("# TYPE directus_client_request_duration_seconds histogram")
+        for entry in snapshot:
+            cumulative = 0
+            for bound, count in entry["latency_buckets"].items():
+                cumulative += count
+                lines.append("directus_client_request_duration_seconds_bucket"
+                             f"{{{labels(entry, le=bound)}}} {cumulative}")
+            lines.append(f"directus_client_request_duration_seconds_sum{{{labels(entry)}}} "
+                         f"{entry['latency_sum_s']:.6f}")
+            lines.append(f"directus_client_request_duration_seconds_count{{{labels(entry)}}} "
+                         f"{entry['requests']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Write a snapshot; ``.json`` files get JSON, anything else Prometheus text."""
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.snapshot(), f, indent=2)
+            else:
+                f.write(self.to_prometheus())
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Expose /metrics (Prometheus) and /metrics.json on a background thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+                elif self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def summary_lines(self) -> List[str]:
+        """Human readable one-line-per-series summary."""
+        lines = []
+        for entry in self.snapshot()["series"]:
+            name = f"{entry['method']} {entry['endpoint']}"
+            if entry["collection"]:
+                name += f" {entry['collection']}"
+            lines.append(
+                f"{name}: {entry['requests']} req, {entry['retries']} retries, "
+                f"p50 ≤{_format_bound(entry['p50_s'])}, p99 ≤{_format_bound(entry['p99_s'])}, "
+                f"{entry['request_bytes'] / 1024:.0f} KiB out, {entry['response_bytes'] / 1024:.0f} KiB in"
+            )
+        return lines
+
+
+def _bucket_percentile(buckets: Dict[str, int], q: float) -> Optional[float]:
+    """Upper bound of the bucket holding the q-quantile (None for +Inf or no data)."""
+    total = sum(buckets.values())
+    if total == 0:
+        return None
+    threshold = q * total
+    cumulative = 0
+    for bound, count in buckets.items():
+        cumulative += count
+        if cumulative >= threshold:
+            return None if bound == "+Inf" else float(bound)
+    return None
+
+
+def _format_bound(value: Optional[float]) -> str:
+    return "inf" if value is None else f"{value * 1000:.0f}ms"
@@ -0,0 +1,591 @@
+"""
+Local stand-in for the Directus endpoints used by DirectusClient
+
+Keeps collections, fields, relations and items in memory and can inject
+latency, jitter, server errors, 429 throttling and access token expiry,
+so the client and the upload pipeline can be benchmarked without a real
+instance or network:
+
+    python mock_directus.py --port 8055 --latency-ms 20 --rate-limit-rate 0.02
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class MockError(Exception):
+    """An error response in Directus' error format."""
+
+    def __init__(self, status: int, message: str, code: str = "INVALID_PAYLOAD"):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    """Evaluate a single Directus filter operator."""
+    if operator == "_eq":
+        return value == operand
+    if operator == "_neq":
+        return value != operand
+    if operator == "_in":
+        return value in operand
+    if operator == "_nin":
+        return value not in operand
+    if operator == "_null":
+        return (value is None) == bool(operand)
+    if operator == "_nnull":
+        return (value is not None) == bool(operand)
+    if operator == "_starts_with":
+        return isinstance(value, str) and value.startswith(operand)
+    if operator == "_contains":
+        return isinstance(value, str) and operand in value
+    if value is None:
+        return False
+    if operator == "_gt":
+        return value > operand
+    if operator == "_gte":
+        return value >= operand
+    if operator == "_lt":
+        return value < operand
+    if operator == "_lte":
+        return value <= operand
+    raise MockError(400, f"Unsupported filter operator {operator}")
+
+
+class MockDirectus:
+    """In-memory Directus state plus fault injection settings."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 token_ttl_s: float = 900.0, accept_gzip: bool = True,
+                 enable_import: bool = True, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.token_ttl_s = token_ttl_s
+        self.accept_gzip = accept_gzip
+        self.enable_import = enable_import
+        self.rng = random.Random(seed)
+
+        self.lock = threading.RLock()
+        self.access_tokens: Dict[str, float] = {}
+        self.refresh_tokens = set()
+        self.collections: Dict[str, Dict] = {}
+        self.relations: List[Dict] = []
+        self.request_count = 0
+
+        # Directus instances already have the airport collection
+        self._add_collection({"collection": "airport", "meta": {}, "fields": [
+            {"field": "id", "type": "integer", "schema": {"is_primary_key": True}},
+            {"field": "icao", "type": "string", "schema": {"is_unique": True}},
+            {"field": "name", "type": "string"},
+            {"field": "default_freq", "type": "string"}
+        ]})
+
+    # -- state -------------------------------------------------------------
+
+    def _add_collection(self, config: Dict) -> None:
+        fields = {"id": {"field": "id", "type": "integer", "schema": {"is_primary_key": True}}}
+        for field in config.get("fields") or []:
+            fields[field["field"]] = field
+        self.collections[config["collection"]] = {
+            "collection": config["collection"],
+            "meta": config.get("meta") or {},
+            "fields": fields,
+            "items": {},
+            "next_id": 1,
+            # Values of unique fields, so inserts do not rescan every item
+            "unique": {}
+        }
+
+    def _collection(self, name: str) -> Dict:
+        if name not in self.collections:
+            raise MockError(403, "You don't have permission to access this.", "FORBIDDEN")
+        return self.collections[name]
+
+    def _issue_tokens(self) -> Dict:
+        access, refresh = uuid.uuid4().hex, uuid.uuid4().hex
+        self.access_tokens[access] = time.monotonic() + self.token_ttl_s
+        self.refresh_tokens.add(refresh)
+        return {"access_token": access, "refresh_token": refresh,
+                "expires": int(self.token_ttl_s * 1000)}
+
+    def authenticate(self, header: Optional[str]) -> None:
+        token = (header or "").replace("Bearer ", "", 1)
+        with self.lock:
+            expires = self.access_tokens.get(token)
+        if expires is None:
+            raise MockError(401, "Invalid user credentials.", "INVALID_CREDENTIALS")
+        if time.monotonic() > expires:
+            raise MockError(401, "Token expired.", "TOKEN_EXPIRED")
+
+    # -- query evaluation ----------------------------------------------------
+
+    def _related(self, collection: str, field: str) -> Optional[str]:
+        for relation in self.relations:
+            if relation["collection"] == collection and relation["field"] == field:
+                return relation["related_collection"]
+        return None
+
+    def _matches(self, collection: str, item: Dict, filter: Optional[Dict]) -> bool:
+        if not filter:
+            return True
+        for key, condition in filter.items():
+            if key == "_and":
+                if not all(self._matches(collection, item, f) for f in condition):
+                    return False
+            elif key == "_or":
+                if not any(self._matches(collection, item, f) for f in condition):
+                    return False
+            elif all(op.startswith("_") for op in condition):
+                if not all(_compare(item.get(key), op, operand) for op, operand in condition.items()):
+                    return False
+            else:
+                # Filter on a field of the related item (many-to-one)
+                related = self._related(collection, key)
+                target = self.collections.get(related, {}).get("items", {}).get(item.get(key))
+                if target is None or not self._matches(related, target, condition):
+                    return False
+        return True
+
+    def query(self, collection: str, query: Dict) -> List[Dict]:
+        """Evaluate filter, sort, limit, offset, fields and aggregate."""
+        with self.lock:
+            state = self._collection(collection)
+            rows = [item for item in state["items"].values()
+                    if self._matches(collection, item, query.get("filter"))]
+
+        aggregate = query.get("aggregate")
+        if aggregate:
+            result = {}
+            for func, field in aggregate.items():
+                if func == "count":
+                    result["count"] = len(rows)
+                    continue
+                values = [row.get(field) for row in rows if row.get(field) is not None]
+                value = None
+                if values:
+                    value = {"min": min, "max": max, "sum": sum}[func](values)
+                result[func] = {field: value}
+            return [result]
+
+        for key in reversed(query.get("sort") or []):
+            descending = key.startswith("-")
+            key = key.lstrip("-")
+            rows.sort(key=lambda row: (row.get(key) is None, row.get(key)), reverse=descending)
+
+        offset = int(query.get("offset") or 0)
+        limit = int(query.get("limit", 100))
+        rows = rows[offset:] if limit < 0 else rows[offset:offset + limit]
+
+        fields = query.get("fields") or ["*"]
+        if "*" not in fields:
+            rows = [{field: row.get(field) for field in fields} for row in rows]
+        return [dict(row) for row in rows]
+
+    def insert(self, collection: str, payload: Any) -> List[Dict]:
+        """Insert one or many items atomically, enforcing unique fields."""
+        items = payload if isinstance(payload, list) else [payload]
+        with self.lock:
+            state = self._collection(collection)
+            unique = self._unique_indexes(state)
+            for name, taken in unique.items():
+                batch = set()
+                for item in items:
+                    value = item.get(name)
+                    if value is not None and (value in taken or value in batch):
+                        raise MockError(400, f'Value for field "{name}" has to be unique.',
+                                        "RECORD_NOT_UNIQUE")
+                    batch.add(value)
+
+            created = []
+            for item in items:
+                row = dict(item)
+                row["id"] = state["next_id"]
+                state["next_id"] += 1
+                state["items"][row["id"]] = row
+                for name, taken in unique.items():
+                    if row.get(name) is not None:
+                        taken.add(row[name])
+                created.append(row)
+        return created
+
+    def _unique_indexes(self, state: Dict) -> Dict[str, set]:
+        """Get (building on first use) the value sets of the unique fields."""
+        for name, field in state["fields"].items():
+            if name != "id" and (field.get("schema") or {}).get("is_unique") \
+                    and name not in state["unique"]:
+                state["unique"][name] = {row.get(name) for row in state["items"].values()} - {None}
+        return state["unique"]
+
+    def update(self, collection: str, key: Optional[str], payload: Any) -> Any:
+        """Update a singleton, one item, a list of items or keys+data."""
+        with self.lock:
+            state = self._collection(collection)
+            items = state["items"]
+            # Updates may change unique values; the indexes are rebuilt on demand
+            state["unique"].clear()
+            if key is not None:
+                items[int(key)].update(payload)
+                return items[int(key)]
+            if state["meta"].get("singleton"):
+                if not items:
+                    return self.insert(collection, payload)[0]
+                row = next(iter(items.values()))
+                row.update(payload)
+                return row
+            if isinstance(payload, list):
+                for change in payload:
+                    items[change["id"]].update(change)
+                return [items[change["id"]] for change in payload]
+            for item_id in payload.get("keys", []):
+                items[item_id].update(payload.get("data") or {})
+            return [items[item_id] for item_id in payload.get("keys", [])]
+
+    def delete(self, collection: str, payload: Any) -> None:
+        """Delete by id list, {"keys": [...]} or {"query": {...}}."""
+        with self.lock:
+            state = self._collection(collection)
+            if isinstance(payload, dict) and "query" in payload:
+                ids = [row["id"] for row in self.query(collection, {**payload["query"], "fields": ["id"]})]
+            else:
+                ids = payload.get("keys", []) if isinstance(payload, dict) else payload
+            for item_id in ids:
+                row = state["items"].pop(item_id, None)
+                for name, taken in state["unique"].items():
+                    if row is not None:
+                        taken.discard(row.get(name))
+
+
+def _read_multipart_file(body: bytes, content_type: str) -> Tuple[str, bytes]:
+    """Extract (filename, content) of the first file part of a multipart body."""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode("utf-8")
+    for part in body.split(b"--" + boundary):
+        if b"\r\n\r\n" not in part:
+            continue
+        head, content = part.split(b"\r\n\r\n", 1)
+        if b'name="file"' in head:
+            filename = head.split(b'filename="', 1)[1].split(b'"', 1)[0].decode("utf-8")
+            return filename, content[:-2] if content.endswith(b"\r\n") else content
+    raise MockError(400, "No file in import request")
+
+
+class MockDirectusHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a MockDirectus instance."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+    server_version = "MockDirectus/1.0"
+
+    @property
+    def mock(self) -> MockDirectus:
+        return self.server.mock
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            body = b"".join(chunks)
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            if not self.mock.accept_gzip:
+                raise MockError(415, "Unsupported content encoding", "UNSUPPORTED_MEDIA_TYPE")
+            body = gzip.decompress(body)
+        return body
+
+    def _json_body(self) -> Any:
+        body = self._read_body()
+        return json.loads(body) if body else None
+
+    def _send(self, status: int, payload: Any = None, headers: Optional[Dict] = None) -> None:
+        body = b"" if payload is None else json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _dispatch(self, method: str) -> None:
+        mock = self.mock
+        with mock.lock:
+            mock.request_count += 1
+        url = urlparse(self.path)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        try:
+            # The body is read up front so keep-alive connections stay in sync
+            body = self._read_body() if method in ("POST", "PATCH", "DELETE", "SEARCH") else b""
+            handler = self._route(method, parts)
+            if handler is None:
+                raise MockError(404, f"Route {method} {url.path} doesn't exist.", "ROUTE_NOT_FOUND")
+            if parts[0] == "auth":
+                # Faults are only injected into API calls, never into login/refresh
+                status, payload = handler(parts, params, body)
+                return self._send(status, payload)
+
+            delay = mock.latency_ms + mock.rng.uniform(-mock.jitter_ms, mock.jitter_ms)
+            if delay > 0:
+                time.sleep(delay / 1000.0)
+            if mock.rng.random() < mock.rate_limit_rate:
+                return self._send(429, {"errors": [{"message": "Too many requests",
+                                                    "extensions": {"code": "REQUESTS_EXCEEDED"}}]},
+                                  {"Retry-After": "0.05"})
+            if mock.rng.random() < mock.error_rate:
+                return self._send(503, {"errors": [{"message": "Service unavailable",
+                                                    "extensions": {"code": "SERVICE_UNAVAILABLE"}}]})
+
+            mock.authenticate(self.headers.get("Authorization"))
+            status, payload = handler(parts, params, body)
+            self._send(status, payload)
+        except MockError as e:
+            self._send(e.status, {"errors": [{"message": str(e), "extensions": {"code": e.code}}]})
+        except (KeyError, ValueError, TypeError) as e:
+            self._send(400, {"errors": [{"message": f"Invalid payload: {e}",
+                                         "extensions": {"code": "INVALID_PAYLOAD"}}]})
+
+    def _route(self, method: str, parts: List[str]) -> Optional[Callable]:
+        if not parts:
+            return None
+        routes = {
+            ("POST", "auth"): self._auth,
+            ("GET", "collections"): self._get_collections,
+            ("POST", "collections"): self._create_collection,
+            ("PATCH", "collections"): self._update_collection,
+            ("GET", "fields"): self._get_fields,
+            ("POST", "fields"): self._create_field,
+            ("PATCH", "fields"): self._update_field,
+            ("GET", "relations"): self._get_relation,
+            ("POST", "relations"): self._create_relation,
+            ("GET", "items"): self._get_items,
+            ("SEARCH", "items"): self._search_items,
+            ("POST", "items"): self._create_items,
+            ("PATCH", "items"): self._update_items,
+            ("DELETE", "items"): self._delete_items,
+            ("POST", "utils"): self._import,
+        }
+        return routes.get((method, parts[0]))
+
+    # -- endpoints -----------------------------------------------------------
+
+    def _auth(self, parts, params, body):
+        mock = self.mock
+        payload = json.loads(body) if body else {}
+        with mock.lock:
+            if parts[1:] == ["login"]:
+                return 200, {"data": mock._issue_tokens()}
+            if parts[1:] == ["refresh"]:
+                token = payload.get("refresh_token")
+                if token not in mock.refresh_tokens:
+                    raise MockError(401, "Invalid user credentials.", "INVALID_CREDENTIALS")
+                mock.refresh_tokens.discard(token)
+                return 200, {"data": mock._issue_tokens()}
+        raise MockError(404, "Route doesn't exist.", "ROUTE_NOT_FOUND")
+
+    def _get_collections(self, parts, params, body):
+        with self.mock.lock:
+            return 200, {"data": [{"collection": c["collection"], "meta": c["meta"]}
+                                  for c in self.mock.collections.values()]}
+
+    def _create_collection(self, parts, params, body):
+        config = json.loads(body)
+        with self.mock.lock:
+            if config["collection"] in self.mock.collections:
+                raise MockError(400, f'Collection "{config["collection"]}" already exists.')
+            self.mock._add_collection(config)
+        return 200, {"data": {"collection": config["collection"]}}
+
+    def _update_collection(self, parts, params, body):
+        config = json.loads(body)
+        with self.mock.lock:
+            state = self.mock._collection(parts[1])
+            state["meta"].update(config.get("meta") or {})
+            return 200, {"data": {"collection": parts[1], "meta": state["meta"]}}
+
+    def _get_fields(self, parts, params, body):
+        with self.mock.lock:
+            state = self.mock._collection(parts[1])
+            return 200, {"data": [dict(field, collection=parts[1])
+                                  for field in state["fields"].values()]}
+
+    def _create_field(self, parts, params, body):
+        field = json.loads(body)
+        with self.mock.lock:
+            state = self.mock._collection(parts[1])
+            if field["field"] in state["fields"]:
+                raise MockError(400, f'Field "{field["field"]}" already exists.')
+            state["fields"][field["field"]] = field
+        return 200, {"data": field}
+
+    def _update_field(self, parts, params, body):
+        field = json.loads(body)
+        with self.mock.lock:
+            state = self.mock._collection(parts[1])
+            if parts[2] not in state["fields"]:
+                raise MockError(403, "You don't have permission to access this.", "FORBIDDEN")
+            state["fields"][parts[2]].update(field)
+            return 200, {"data": state["fields"][parts[2]]}
+
+    def _get_relation(self, parts, params, body):
+        with self.mock.lock:
+            for relation in self.mock.relations:
+                if [relation["collection"], relation["field"]] == parts[1:3]:
+                    return 200, {"data": relation}
+        raise MockError(403, "You don't have permission to access this.", "FORBIDDEN")
+
+    def _create_relation(self, parts, params, body):
+        relation = json.loads(body)
+        with self.mock.lock:
+            for existing in self.mock.relations:
+                if (existing["collection"], existing["field"]) == (relation["collection"], relation["field"]):
+                    raise MockError(400, "Field already has an associated relationship.")
+            self.mock.relations.append(relation)
+        return 200, {"data": relation}
+
+    def _get_items(self, parts, params, body):
+        query = {}
+        for key, value in params.items():
+            if key == "filter":
+                query["filter"] = json.loads(value)
+            elif key in ("fields", "sort"):
+                query[key] = value.split(",")
+            elif key.startswith("aggregate["):
+                query.setdefault("aggregate", {})[key[len("aggregate["):-1]] = value
+            else:
+                query[key] = value
+        return self._items_result(parts, query)
+
+    def _search_items(self, parts, params, body):
+        return self._items_result(parts, json.loads(body).get("query") or {})
+
+    def _items_result(self, parts, query):
+        mock = self.mock
+        state = mock._collection(parts[1])
+        if len(parts) > 2:
+            with mock.lock:
+                item = state["items"].get(int(parts[2]))
+            if item is None:
+                raise MockError(403, "You don't have permission to access this.", "FORBIDDEN")
+            return 200, {"data": item}
+        if state["meta"].get("singleton"):
+            rows = mock.query(parts[1], {"limit": 1})
+            return 200, {"data": rows[0] if rows else None}
+        return 200, {"data": mock.query(parts[1], query)}
+
+    def _create_items(self, parts, params, body):
+        payload = json.loads(body)
+        created = self.mock.insert(parts[1], payload)
+        return 200, {"data": created if isinstance(payload, list) else created[0]}
+
+    def _update_items(self, parts, params, body):
+        key = parts[2] if len(parts) > 2 else None
+        return 200, {"data": self.mock.update(parts[1], key, json.loads(body))}
+
+    def _delete_items(self, parts, params, body):
+        if len(parts) > 2:
+            self.mock.delete(parts[1], [int(parts[2])])
+        else:
+            self.mock.delete(parts[1], json.loads(body))
+        return 204, None
+
+    def _import(self, parts, params, body):
+        if parts[1:2] != ["import"] or not self.mock.enable_import:
+            raise MockError(404, "Route doesn't exist.", "ROUTE_NOT_FOUND")
+        filename, content = _read_multipart_file(body, self.headers.get("Content-Type", ""))
+        if filename.endswith(".csv"):
+            rows = list(csv.DictReader(io.StringIO(content.decode("utf-8"))))
+        else:
+            rows = json.loads(content)
+        if rows:
+            self.mock.insert(parts[2], rows)
+        return 204, None
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+    def do_SEARCH(self):
+        self._dispatch("SEARCH")
+
+
+class MockDirectusServer(ThreadingHTTPServer):
+    """Threaded HTTP server bound to a MockDirectus state."""
+
+    daemon_threads = True
+
+    def __init__(self, mock: MockDirectus, host: str = "127.0.0.1", port: int = 0):
+        self.mock = mock
+        super().__init__((host, port), MockDirectusHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockDirectusServer":
+        """Serve from a background thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Directus server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8055, help="0 picks a free port")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 503 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of 429 responses")
+    parser.add_argument("--token-ttl", type=float, default=900.0, help="access token lifetime in seconds")
+    parser.add_argument("--no-gzip", action="store_true", help="reject gzip request bodies with 415")
+    parser.add_argument("--no-import", action="store_true", help="disable /utils/import")
+    parser.add_argument("--seed", type=int, help="seed for latency and fault injection")
+    args = parser.parse_args()
+
+    mock = MockDirectus(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                        token_ttl_s=args.token_ttl, accept_gzip=not args.no_gzip,
+                        enable_import=not args.no_import, seed=args.seed)
+    server = MockDirectusServer(mock, args.host, args.port)
+    print(f"Mock Directus listening on {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+"""
+Staged generate-and-upload pipeline
+
+generator -> serializer -> uploader, connected by bounded queues so that
+generation, encoding and network I/O overlap while memory stays bounded
+by the queue sizes. Generation is pure Python and holds the GIL, so with
+several generator workers the batches are generated in worker processes.
+"""
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Set
+from config import PLAN_SEED
+from generator import DIRECTUS_COLUMNS, ATISGenerator
+from journal import BatchPlan, UploadJournal, entry_key, plan_batches, plan_key_prefixes
+from profiling import StageProfiler
+from record_log import RecordLog
+
+if TYPE_CHECKING:
+    # Only uploads need the client (and requests); offline generation never imports it
+    from directus_client import DirectusClient
+
+# Four difficulty tiers with weighted distribution
+# 20% super_easy, 30% easy, 35% medium, 15% hard
+DIFFICULTIES = ["super_easy", "easy", "medium", "hard"]
+DIFFICULTY_WEIGHTS = [0.20, 0.30, 0.35, 0.15]
+
+# Marks the end of a stage's input
+_DONE = object()
+
+_AIRPORT_INDEX = DIRECTUS_COLUMNS.index("airport")
+_DIFFICULTY_INDEX = DIRECTUS_COLUMNS.index("difficulty")
+_KEY_INDEX = DIRECTUS_COLUMNS.index("entry_key")
+# Logged records checked for existing entry keys per request
+LOG_KEY_CHUNK = 1000
+
+
+def generate_batch(generator: ATISGenerator, airports: List[Dict], seed: str,
+                   size: int, existing_keys: Optional[Set[str]] = None) -> List[Dict]:
+    """Generate the entries of one planned batch, reproducibly from its seed.
+    Entries whose key is in ``existing_keys`` are left out; every position is
+    still generated so the rng sequence always matches the plan.
+    """
+    rng = random.Random(seed)
+    generator.rng = rng
+    batch = []
+    for position in range(size):
+        difficulty = rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0]
+        airport = rng.choice(airports)
+        atis = generator.generate_atis(airport=airport, difficulty=difficulty)
+        atis["entry_key"] = entry_key(seed, position)
+        if not existing_keys or atis["entry_key"] not in existing_keys:
+            batch.append(atis)
+    return batch
+
+
+def worker_context() -> multiprocessing.context.BaseContext:
+    """Start method of worker processes: forkserver where available, else spawn.
+    Pools are started while other threads run, and forking those is unsafe.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+# Airports of a generator worker process, sent once when the worker starts
+_worker_airports: List[Dict] = []
+
+
+def _init_generator_worker(airports: List[Dict]) -> None:
+    global _worker_airports
+    _worker_airports = airports
+
+
+def generate_batch_records(seed: str, size: int, existing_keys: Set[str]) -> List[tuple]:
+    """Generator worker task: one planned batch as compact records, airport as ICAO code."""
+    generator = ATISGenerator()
+    return [generator.to_directus_record(atis, atis["airport"]["icao"])
+            for atis in generate_batch(generator, _worker_airports, seed, size, existing_keys)]
+
+
+def fetch_existing_keys(client: "DirectusClient", collection: str,
+                        batches: List[BatchPlan]) -> Set[str]:
+    """Fetch the entry keys of a plan that are already in Directus.
+    All keys of a run share a prefix, so one streamed key-only scan per
+    run replaces an existence check per row.
+    """
+    existing = set()
+    for prefix in plan_key_prefixes(batches):
+        for row in client.iter_items(collection, fields=["entry_key"],
+                                     filter={"entry_key": {"_starts_with": prefix}},
+                                     page_size=5000):
+            existing.add(row["entry_key"])
+    if existing:
+        print(f"  Found {len(existing)} entries of this plan already uploaded")
+    return existing
+
+
+class UploadPipeline:
+    """Generates ATIS entries and uploads them to Directus in overlapping stages."""
+
+    def __init__(self, client: "DirectusClient", airport_mapping: Dict[str, int],
+                 airports: List[Dict], batch_size: int = 25, queue_size: int = 8,
+                 generator_workers: int = 1, serializer_workers: int = 1,
+                 uploader_workers: int = 2, collection: str = "atis_entries",
+                 journal: Optional[UploadJournal] = None, run_id: Optional[int] = None,
+                 skip_existing: bool = True, profiler: Optional[StageProfiler] = None):
+        self.client = client
+        self.airport_mapping = airport_mapping
+        self.airports = [a for a in airports if a["icao"] in airport_mapping]
+        self.batch_size = batch_size
+        self.generator_workers = max(1, generator_workers)
+        self.serializer_workers = max(1, serializer_workers)
+        self.uploader_workers = max(1, uploader_workers)
+        self.collection = collection
+        self.journal = journal
+        self.run_id = run_id
+        self.skip_existing = skip_existing
+        # Optional per-stage timing of the generator workers
+        self.profiler = profiler
+        self.existing_keys: Set[str] = set()
+        # Set by run_log and process generation: batches are records (airport as ICAO), not ATIS data
+        self._icao_records = False
+
+        # Bounded queues provide back-pressure between the stages
+        self.generated: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.serialized: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "generated": 0,
+            "uploaded": 0,
+            "failed": 0,
+            "skipped": 0,
+            "difficulty_counts": {d: 0 for d in DIFFICULTIES},
+            "errors": []
+        }
+
+    def _generate(self, plan: Iterator[BatchPlan]) -> None:
+        """Generator stage: produce batches of raw ATIS data.
+        Each batch is generated from its own seed, so it can be reproduced on resume.
+        """
+        generator = ATISGenerator(profiler=self.profiler)
+
+        try:
+            while True:
+                with self._lock:
+                    batch_plan = next(plan, None)
+                if batch_plan is None:
+                    return
+
+                batch_index, seed, size = batch_plan
+                keys = [entry_key(seed, position) for position in range(size)]
+                if self.existing_keys.issuperset(keys):
+                    self._mark_skipped(batch_index, size)
+                    continue
+
+                batch = generate_batch(generator, self.airports, seed, size, self.existing_keys)
+                self._mark_skipped(None, size - len(batch))
+                self._emit_generated(batch_index, batch)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"].append(f"generator: {e}")
+
+    def _generate_in_processes(self, plan: Iterator[BatchPlan]) -> None:
+        """Generator stage on ``generator_workers`` processes: batches are generated
+        in parallel as records and emitted as they complete.
+        """
+        pending = {}
+
+        def emit(futures) -> None:
+            for future in futures:
+                batch_index, size = pending.pop(future)
+                records = future.result()
+                self._mark_skipped(None, size - len(records))
+                self._emit_records(batch_index, records)
+
+        try:
+            with ProcessPoolExecutor(self.generator_workers, mp_context=worker_context(),
+                                     initializer=_init_generator_worker,
+                                     initargs=(self.airports,)) as pool:
+                for batch_index, seed, size in plan:
+                    keys = [entry_key(seed, position) for position in range(size)]
+                    if self.existing_keys.issuperset(keys):
+                        self._mark_skipped(batch_index, size)
+                        continue
+                    # Keep every worker busy without generating far ahead of the upload
+                    if len(pending) >= 2 * self.generator_workers:
+                        emit(wait(pending, return_when=FIRST_COMPLETED).done)
+                    existing = {key for key in keys if key in self.existing_keys}
+                    pending[pool.submit(generate_batch_records, seed, size, existing)] = (batch_index, size)
+                emit(wait(pending).done)
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"].append(f"generator: {e}")
+
+    def _read_log(self, log: RecordLog, start: int) -> None:
+        """Reader stage: stream batches of logged records in place of the generators.
+        With ``skip_existing``, the keys of every LOG_KEY_CHUNK records are checked
+        in one request and records already in Directus are left out.
+        """
+        try:
+            for chunk in log.scan(start, batch_size=LOG_KEY_CHUNK):
+                if self.skip_existing:
+                    keys = [record[_KEY_INDEX] for record in chunk if record[_KEY_INDEX]]
+                    existing = self.client.existing_keys(self.collection, keys, chunk_size=LOG_KEY_CHUNK)
+                    if existing:
+                        logged = len(chunk)
+                        chunk = [record for record in chunk if record[_KEY_INDEX] not in existing]
+                        self._mark_skipped(None, logged - len(chunk))
+                for i in range(0, len(chunk), self.batch_size):
+                    self._emit_records(None, chunk[i:i + self.batch_size])
+        except Exception as e:
+            with self._lock:
+                self.stats["errors"].append(f"record log: {e}")
+
+    def _mark_skipped(self, batch_index: Optional[int], count: int) -> None:
+        """Account for entries that already exist in Directus."""
+        with self._lock:
+            self.stats["skipped"] += count
+        if batch_index is not None and self.journal is not None:
+            self.journal.mark_acked(self.run_id, batch_index)
+
+    def _emit_generated(self, batch_index: int, batch: List[Dict]) -> None:
+        with self._lock:
+            self.stats["generated"] += len(batch)
+            for atis in batch:
+                self.stats["difficulty_counts"][atis["difficulty"]] += 1
+            generated = self.stats["generated"]
+        self.generated.put((batch_index, batch))
+
+        if generated % 500 < len(batch):
+            print(f"  Generated {generated} entries...")
+
+    def _emit_records(self, batch_index: Optional[int], records: List[tuple]) -> None:
+        with self._lock:
+            self.stats["generated"] += len(records)
+            for record in records:
+                self.stats["difficulty_counts"][record[_DIFFICULTY_INDEX]] += 1
+            generated = self.stats["generated"]
+        self.generated.put((batch_index, records))
+
+        if generated % 500 < len(records):
+            print(f"  Generated {generated} entries...")
+
+    def _serialize(self) -> None:
+        """Serializer stage: convert batches to encoded Directus payloads."""
+        generator = ATISGenerator()
+
+        while True:
+            item = self.generated.get()
+            if item is _DONE:
+                return
+            batch_index, batch = item
+            try:
+                if self._icao_records:
+                    records = [(self.airport_mapping[record[_AIRPORT_INDEX]], *record[1:])
+                               for record in batch]
+                else:
+                    records = [
+                        generator.to_directus_record(atis, self.airport_mapping[atis["airport"]["icao"]])
+                        for atis in batch
+                    ]
+                body = self.client.serializer.dumps_records(DIRECTUS_COLUMNS, records)
+                self.serialized.put((batch_index, len(records), body))
+            except Exception as e:
+                with self._lock:
+                    self.stats["failed"] += len(batch)
+                    self.stats["errors"].append(f"serializer: {e}")
+
+    def _upload(self) -> None:
+        """Uploader stage: send encoded payloads to Directus."""
+        while True:
+            item = self.serialized.get()
+            if item is _DONE:
+                return
+            batch_index, count, body = item
+            try:
+                ok = self.client.insert_encoded(self.collection, body, count)
+            except Exception as e:
+                ok = False
+                print(f"  ✗ Error inserting batch: {e}")
+
+            if self.journal is not None and batch_index is not None:
+                if ok:
+                    self.journal.mark_acked(self.run_id, batch_index)
+                else:
+                    self.journal.mark_failed(self.run_id, batch_index)
+
+            with self._lock:
+                self.stats["uploaded" if ok else "failed"] += count
+                uploaded = self.stats["uploaded"]
+            if ok and uploaded % 500 < count:
+                print(f"  Uploaded {uploaded} entries...")
+
+    def run(self, count: int, seed: Optional[int] = None) -> Dict:
+        """Generate and upload ``count`` entries and return the run statistics."""
+        if seed is None:
+            seed = PLAN_SEED
+        return self.run_plan(plan_batches(count, self.batch_size, seed))
+
+    def run_plan(self, batches: List[BatchPlan]) -> Dict:
+        """Run all stages over a batch plan and return the run statistics."""
+        if not self.airports:
+            print("  ✗ No valid airports found in database!")
+            return self.stats
+
+        started = time.perf_counter()
+        if self.skip_existing:
+            self.existing_keys = fetch_existing_keys(self.client, self.collection, batches)
+        plan = iter(batches)
+
+        # The profiler times generation in this process, so it keeps a single generator thread
+        if self.generator_workers > 1 and self.profiler is None:
+            self._icao_records = True
+            generators = [threading.Thread(target=self._generate_in_processes, args=(plan,),
+                                           daemon=True)]
+        else:
+            generators = [threading.Thread(target=self._generate, args=(plan,), daemon=True)]
+        self._run_stages(generators)
+        self.stats["elapsed_s"] = time.perf_counter() - started
+        return self.stats
+
+    def run_log(self, log: RecordLog, start: int = 0) -> Dict:
+        """Upload the records of a record log from index ``start`` instead of generating.
+        Logged entries carry their airport as ICAO code; they are mapped to
+        Directus ids in the serializer stage.
+        """
+        started = time.perf_counter()
+        self._icao_records = True
+        self._run_stages([threading.Thread(target=self._read_log, args=(log, start), daemon=True)])
+        self.stats["elapsed_s"] = time.perf_counter() - started
+        return self.stats
+
+    def _run_stages(self, generators: List[threading.Thread]) -> None:
+        """Start the serializer and uploader stages behind the given producers and wait."""
+        serializers = [threading.Thread(target=self._serialize, daemon=True)
+                       for _ in range(self.serializer_workers)]
+        uploaders = [threading.Thread(target=self._upload, daemon=True)
+                     for _ in range(self.uploader_workers)]
+        for thread in generators + serializers + uploaders:
+            thread.start()
+
+        # Shut the stages down in order once their producers are finished
+        self._finish(generators, self.generated, len(serializers))
+        self._finish(serializers, self.serialized, len(uploaders))
+        for thread in uploaders:
+            thread.join()
+
+    @staticmethod
+    def _finish(producers: List[threading.Thread], outbox: queue.Queue,
+                consumers: int) -> None:
+        for thread in producers:
+            thread.join()
+        for _ in range(consumers):
+            outbox.put(_DONE)
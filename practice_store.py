@@ -0,0 +1,237 @@
+"""
+Local practice store for ATIS entries
+
+A read-optimized SQLite copy of atis_entries, so practice prompts are
+served without a Directus round trip. Entries are indexed on difficulty,
+airport, approach type and conditions (low visibility, CB clouds). The
+ids matching a filter combination are loaded once through those indexes,
+after which every random pick is a constant-time array lookup plus a
+primary key read.
+
+    python practice_store.py --sync
+    python practice_store.py --difficulty hard --low-visibility
+"""
+import argparse
+import random
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import PRACTICE_STORE_PATH
+from generator import DIRECTUS_COLUMNS
+from serialization import get_serializer
+from corpus import COMPRESSED_COLUMNS
+from sinks import JSON_COLUMNS, create_entries_table, flatten_record, load_text_codec
+
+# Visibility below which an entry counts as low visibility (meters)
+LOW_VISIBILITY_METERS = 1500
+
+# Filterable columns; low_visibility and has_cb are derived from the entry
+FILTERS = ("difficulty", "airport", "approach_type", "low_visibility", "has_cb")
+
+# Derived condition columns, computed by SQLite from the stored entry
+_DERIVED_COLUMNS = {
+    "low_visibility": f"visibility_meters < {LOW_VISIBILITY_METERS}",
+    # Clouds are stored as compact JSON, where a CB layer reads "cb":true
+    "has_cb": "coalesce(clouds, '') LIKE '%\"cb\":true%'",
+}
+
+FilterKey = Tuple[Optional[object], ...]
+
+
+class PracticeStore:
+    """SQLite-backed store with constant-time random picks per filter combination."""
+
+    def __init__(self, path: str = PRACTICE_STORE_PATH, table: str = "atis_entries"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sync_state "
+                           "(collection TEXT PRIMARY KEY, last_id INTEGER NOT NULL, synced_at TEXT)")
+        create_entries_table(self._conn, table)
+        self._ensure_indexes()
+        # Ids per filter combination, filled on first use and dropped on writes
+        self._ids: Dict[FilterKey, array] = {}
+        self._serializer = get_serializer()
+        # Set when the store is a SQLite export with compressed text columns
+        self._text_codec = load_text_codec(self._conn)
+
+    def _ensure_indexes(self) -> None:
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_xinfo({self.table})")}
+        for column, expression in _DERIVED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {self.table} ADD COLUMN {column} INTEGER "
+                                   f"GENERATED ALWAYS AS ({expression}) VIRTUAL")
+        for column in FILTERS:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{column} "
+                               f"ON {self.table} ({column})")
+
+    @staticmethod
+    def _key(filters: Dict) -> FilterKey:
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown practice filters: {', '.join(sorted(unknown))}")
+        return tuple(None if filters.get(name) is None else
+                     int(filters[name]) if name in _DERIVED_COLUMNS else filters[name]
+                     for name in FILTERS)
+
+    def _matching_ids(self, key: FilterKey) -> array:
+        ids = self._ids.get(key)
+        if ids is None:
+            clauses = [f"{name} = ?" for name, value in zip(FILTERS, key) if value is not None]
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            with self._lock:
+                rows = self._conn.execute(f"SELECT id FROM {self.table}{where}",
+                                          [value for value in key if value is not None])
+                ids = array("q", (row[0] for row in rows))
+            self._ids[key] = ids
+        return ids
+
+    def count(self, **filters) -> int:
+        """Number of entries matching the filters."""
+        return len(self._matching_ids(self._key(filters)))
+
+    def pick(self, rng: Optional[random.Random] = None, **filters) -> Optional[Dict]:
+        """Uniformly random entry matching the filters, or None if there is none.
+
+        Filters: difficulty, airport (ICAO), approach_type, low_visibility, has_cb.
+        """
+        ids = self._matching_ids(self._key(filters))
+        if not ids:
+            return None
+        return self.get(ids[(rng or random).randrange(len(ids))])
+
+    def get(self, entry_id: int) -> Optional[Dict]:
+        """Entry by id with its nested columns decoded."""
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT id, {', '.join(DIRECTUS_COLUMNS)} "
+                                        f"FROM {self.table} WHERE id = ?", (entry_id,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(("id", *DIRECTUS_COLUMNS), row))
+        loads = self._serializer.loads
+        for column in JSON_COLUMNS:
+            if entry[column] is not None:
+                entry[column] = loads(entry[column])
+        for column in COMPRESSED_COLUMNS:
+            if isinstance(entry[column], bytes):
+                entry[column] = self._text_codec.decode(entry[column])
+        entry["cavok"] = bool(entry["cavok"])
+        return entry
+
+    def write(self, rows: Iterable[Tuple]) -> int:
+        """Insert or replace rows of (id, *DIRECTUS_COLUMNS) in one transaction."""
+        dumps = self._serializer.dumps
+        flat = [[row[0], *flatten_record(row[1:], dumps)] for row in rows]
+        statement = (f"INSERT OR REPLACE INTO {self.table} (id, {', '.join(DIRECTUS_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * (len(DIRECTUS_COLUMNS) + 1))})")
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(statement, flat)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._ids = {}
+        return len(flat)
+
+    def last_synced_id(self, collection: str = "atis_entries") -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT last_id FROM sync_state WHERE collection = ?",
+                                     (collection,)).fetchone()
+        return row[0] if row else 0
+
+    def sync_from_directus(self, client, collection: str = "atis_entries",
+                           full: bool = False, page_size: int = 5000) -> int:
+        """Copy entries from Directus in a streamed, keyset-paginated bulk export.
+
+        Rows keep their Directus ids, so later syncs only fetch entries with a
+        higher id. ``full`` clears the store first, which also drops entries
+        that were deleted in Directus. Returns the number of entries copied.
+        """
+        if full:
+            with self._lock:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self._conn.execute("DELETE FROM sync_state WHERE collection = ?", (collection,))
+                self._ids = {}
+
+        # The store keeps ICAO codes rather than Directus airport ids
+        icao_by_id = {a["id"]: a.get("icao") for a in client.iter_items("airport", fields=["icao"])}
+        last_id = self.last_synced_id(collection)
+        rows = client.iter_items(collection, fields=DIRECTUS_COLUMNS, page_size=page_size,
+                                 filter={"id": {"_gt": last_id}} if last_id else None)
+
+        copied = 0
+        started = time.perf_counter()
+        chunk: List[Tuple] = []
+        for item in rows:
+            item["airport"] = icao_by_id.get(item.get("airport"), item.get("airport"))
+            chunk.append((item["id"], *(item.get(c) for c in DIRECTUS_COLUMNS)))
+            if len(chunk) >= page_size:
+                copied += self._write_synced(collection, chunk)
+                chunk = []
+                print(f"  Synced {copied} entries ({copied / (time.perf_counter() - started):.0f} rows/s)...")
+        if chunk:
+            copied += self._write_synced(collection, chunk)
+        return copied
+
+    def _write_synced(self, collection: str, chunk: List[Tuple]) -> int:
+        count = self.write(chunk)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (collection, last_id, synced_at) "
+                "VALUES (?, ?, datetime('now'))", (collection, chunk[-1][0]))
+        return count
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local ATIS practice store")
+    parser.add_argument("--path", default=PRACTICE_STORE_PATH)
+    parser.add_argument("--sync", action="store_true", help="copy new entries from Directus first")
+    parser.add_argument("--full", action="store_true", help="with --sync: rebuild the store from scratch")
+    parser.add_argument("--difficulty", choices=["super_easy", "easy", "medium", "hard"])
+    parser.add_argument("--airport", help="ICAO code of the airport")
+    parser.add_argument("--approach-type")
+    parser.add_argument("--low-visibility", action="store_true",
+                        help=f"visibility below {LOW_VISIBILITY_METERS} m")
+    parser.add_argument("--cb", action="store_true", help="cumulonimbus reported")
+    args = parser.parse_args()
+
+    store = PracticeStore(args.path)
+    if args.sync:
+        from directus_client import DirectusClient, DirectusError
+
+        client = DirectusClient()
+        if not client.login():
+            print("Failed to authenticate. Please check your credentials.")
+            return
+        try:
+            copied = store.sync_from_directus(client, full=args.full)
+        except DirectusError as e:
+            # Pages synced before the failure are kept; the next --sync continues
+            print(f"✗ {e}")
+            return
+        print(f"✓ Synced {copied} entries into {args.path}")
+
+    filters = {"difficulty": args.difficulty, "airport": args.airport,
+               "approach_type": args.approach_type,
+               "low_visibility": True if args.low_visibility else None,
+               "has_cb": True if args.cb else None}
+    entry = store.pick(**filters)
+    print(f"{store.count(**filters)} matching entries")
+    if entry is not None:
+        print(f"\n{entry['full_text']}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
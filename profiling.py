@@ -0,0 +1,220 @@
+"""
+Stage-level profiling for ATISGenerator
+
+A StageProfiler wraps the stage methods of one ATISGenerator instance, so
+an unprofiled generator runs the original methods with no added cost.
+Timings are aggregated per difficulty into log-spaced histograms, which
+keeps memory constant however many entries are generated.
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from data import DIFFICULTY_SETTINGS
+
+# Stage name -> ATISGenerator method, in pipeline order. Stages starting with
+# "render." run inside "render", which runs when an entry's full_text is rendered.
+STAGES = (
+    ("wind", "generate_wind"),
+    ("visibility", "generate_visibility"),
+    ("rvr", "generate_rvr"),
+    ("weather", "generate_weather"),
+    ("clouds", "generate_clouds"),
+    ("temperature", "generate_temperature"),
+    ("qnh", "generate_qnh"),
+    ("transition_level", "calculate_transition_level"),
+    ("runway_selection", "select_runways"),
+    ("approach_selection", "select_approach_type"),
+    ("remarks", "generate_remarks"),
+    ("render", "generate_full_text"),
+    ("render.wind", "format_wind_text"),
+    ("render.visibility", "format_visibility_text"),
+    ("render.weather", "format_weather_text"),
+    ("render.clouds", "format_clouds_text"),
+)
+
+TOTAL_STAGE = "generate_atis"
+RENDER_STAGE = "render"
+
+# Histogram buckets: 20 per decade from 100 ns to 1 s
+_BUCKETS_PER_DECADE = 20
+_MIN_NS = 100
+_NUM_BUCKETS = 7 * _BUCKETS_PER_DECADE + 1
+
+
+def _bucket(duration_ns: int) -> int:
+    if duration_ns <= _MIN_NS:
+        return 0
+    index = int(math.log10(duration_ns / _MIN_NS) * _BUCKETS_PER_DECADE) + 1
+    return min(index, _NUM_BUCKETS - 1)
+
+
+def _bucket_value_ns(index: int) -> float:
+    """Representative (geometric mid-point) duration of a bucket."""
+    if index == 0:
+        return float(_MIN_NS)
+    return _MIN_NS * 10 ** ((index - 0.5) / _BUCKETS_PER_DECADE)
+
+
+class _StageStats:
+    __slots__ = ("calls", "total_ns", "histogram")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.histogram = [0] * _NUM_BUCKETS
+
+    def percentile_ns(self, q: float) -> float:
+        threshold = q * self.calls
+        cumulative = 0
+        for index, count in enumerate(self.histogram):
+            cumulative += count
+            if count and cumulative >= threshold:
+                return _bucket_value_ns(index)
+        return 0.0
+
+
+class StageProfiler:
+    """Collects per-stage timings and call counts, grouped by difficulty.
+    Each thread records into its own table, so recording takes no lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tables: List[Dict[Tuple[str, str], _StageStats]] = []
+
+    def _table(self) -> Dict[Tuple[str, str], _StageStats]:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append(table)
+        return table
+
+    def record(self, difficulty: str, stage: str, duration_ns: int) -> None:
+        table = self._table()
+        stats = table.get((difficulty, stage))
+        if stats is None:
+            stats = table[(difficulty, stage)] = _StageStats()
+        stats.calls += 1
+        stats.total_ns += duration_ns
+        stats.histogram[_bucket(duration_ns)] += 1
+
+    def _merged(self) -> Dict[Tuple[str, str], _StageStats]:
+        merged: Dict[Tuple[str, str], _StageStats] = {}
+        with self._lock:
+            tables = list(self._tables)
+        for table in tables:
+            for key, stats in list(table.items()):
+                target = merged.get(key)
+                if target is None:
+                    target = merged[key] = _StageStats()
+                target.calls += stats.calls
+                target.total_ns += stats.total_ns
+                target.histogram = [a + b for a, b in zip(target.histogram, stats.histogram)]
+        return merged
+
+    def _timed(self, stage: str, method: Callable) -> Callable:
+        local = self._local
+        clock = time.perf_counter_ns
+        record = self.record
+
+        def timed(*args, **kwargs):
+            started = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(getattr(local, "difficulty", "unknown"), stage, clock() - started)
+
+        return timed
+
+    def _timed_render(self, method: Callable) -> Callable:
+        """Time generate_full_text under the difficulty of the rendered entry,
+        since lazy rendering happens after generate_atis has returned.
+        """
+        local = self._local
+        clock = time.perf_counter_ns
+        record = self.record
+
+        def timed(airport: Dict, data: Dict) -> str:
+            outer = getattr(local, "difficulty", "unknown")
+            local.difficulty = data.get("difficulty", "unknown")
+            started = clock()
+            try:
+                return method(airport, data)
+            finally:
+                record(local.difficulty, RENDER_STAGE, clock() - started)
+                local.difficulty = outer
+
+        return timed
+
+    def instrument(self, generator) -> None:
+        """Wrap the stage methods of a generator instance with timers."""
+        for stage, name in STAGES:
+            method = getattr(generator, name)
+            if stage == RENDER_STAGE:
+                setattr(generator, name, self._timed_render(method))
+            else:
+                setattr(generator, name, self._timed(stage, method))
+
+        generate_atis = generator.generate_atis
+        local = self._local
+        clock = time.perf_counter_ns
+
+        def profiled_generate_atis(airport: Optional[Dict] = None, difficulty: str = "medium"):
+            # Same fallback as generate_atis, so stages are grouped under the difficulty used
+            label = difficulty if difficulty in DIFFICULTY_SETTINGS else "medium"
+            local.difficulty = label
+            started = clock()
+            try:
+                return generate_atis(airport=airport, difficulty=difficulty)
+            finally:
+                self.record(label, TOTAL_STAGE, clock() - started)
+                local.difficulty = "unknown"
+
+        generator.generate_atis = profiled_generate_atis
+
+    def summary(self) -> Dict[str, Dict[str, Dict]]:
+        """Per difficulty and stage: calls, total, mean and p50/p90/p99 in microseconds."""
+        items = self._merged().items()
+        result: Dict[str, Dict[str, Dict]] = {}
+        for (difficulty, stage), stats in sorted(items):
+            result.setdefault(difficulty, {})[stage] = {
+                "calls": stats.calls,
+                "total_ms": stats.total_ns / 1e6,
+                "mean_us": stats.total_ns / stats.calls / 1e3,
+                "p50_us": stats.percentile_ns(0.50) / 1e3,
+                "p90_us": stats.percentile_ns(0.90) / 1e3,
+                "p99_us": stats.percentile_ns(0.99) / 1e3,
+            }
+        return result
+
+    def report_lines(self, top: int = 8) -> List[str]:
+        """Human readable report of the hottest stages across all difficulties."""
+        totals: Dict[str, List[float]] = {}
+        for (_, stage), stats in self._merged().items():
+            entry = totals.setdefault(stage, [0, 0])
+            entry[0] += stats.calls
+            entry[1] += stats.total_ns
+        if TOTAL_STAGE not in totals:
+            return ["No generation stages recorded"]
+        # Rendering is lazy and not part of generate_atis, so shares are of both together
+        render_calls, render_ns = totals.get(RENDER_STAGE, [0, 0])
+        overall_ns = totals[TOTAL_STAGE][1] + render_ns
+
+        lines = [f"{TOTAL_STAGE}: {totals[TOTAL_STAGE][0]} calls, {totals[TOTAL_STAGE][1] / 1e6:.1f} ms; "
+                 f"{RENDER_STAGE}: {render_calls} calls, {render_ns / 1e6:.1f} ms"]
+        hottest = sorted(((ns, stage, calls) for stage, (calls, ns) in totals.items()
+                          if stage != TOTAL_STAGE), reverse=True)[:top]
+        for ns, stage, calls in hottest:
+            lines.append(f"  {stage:<20} {ns / overall_ns * 100:5.1f}%  "
+                         f"{ns / 1e6:8.1f} ms  {calls:>8} calls  {ns / calls / 1e3:7.1f} us/call")
+
+        lines.append("Per difficulty (p50 / p99 per entry):")
+        for difficulty, stages in self.summary().items():
+            total = stages.get(TOTAL_STAGE)
+            if total:
+                lines.append(f"  {difficulty:<12} {total['p50_us']:7.1f} us / {total['p99_us']:7.1f} us"
+                             f"  ({total['calls']} entries)")
+        return lines
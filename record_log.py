@@ -0,0 +1,348 @@
+"""
+Append-only binary record log for corpora larger than RAM
+
+Two files grow side by side:
+
+    <path>        16-byte header, then one fixed-width record per entry:
+                  the scalar fields of to_directus_format packed with struct,
+                  plus the offset, length and CRC32 of the entry's heap part
+    <path>.heap   variable parts of every entry (information letter, approach,
+                  nested fields, remarks, full_text, entry key) as JSON
+
+Entry i starts at a fixed position in the record file, so the record file
+is its own offset index: seeking is O(1) through mmap and scans read
+records sequentially. Appends take an exclusive file lock (fcntl) and write
+the heap before the records, so generation workers in several processes can
+append to one log. Opening a log recovers from a crash by truncating both
+files to the last complete record whose CRC matches.
+
+    python record_log.py generate atis.atislog --count 1000000 --workers 4
+    python record_log.py info atis.atislog
+    python main.py --upload-log atis.atislog
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from datetime import timedelta
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from corpus import INT_COLUMNS, INT_NULL, TIME_NULL, _EPOCH, _time_value
+from generator import DIRECTUS_COLUMNS
+from serialization import get_serializer
+
+try:
+    import fcntl
+except ImportError:  # Without fcntl, appends are only serialized within one process
+    fcntl = None
+
+MAGIC = b"ATISLOG1"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")  # magic, version, record size
+
+# Fixed-width part: observation time, INT_COLUMNS, ICAO code, difficulty code,
+# then heap offset, heap length and CRC32 of the record and its heap part
+_RECORD = struct.Struct(f"<q{len(INT_COLUMNS)}i4sBQI")
+_CRC = struct.Struct("<I")
+RECORD_SIZE = _RECORD.size + _CRC.size
+
+# Codes are part of the file format; only ever append to this tuple
+DIFFICULTY_CODES = ("super_easy", "easy", "medium", "hard")
+_DIFFICULTY = {name: code for code, name in enumerate(DIFFICULTY_CODES)}
+
+# Columns stored in the heap, in this order
+HEAP_COLUMNS = ("information_letter", "approach_type", "rvr", "weather_phenomena", "clouds",
+                "active_runways", "remarks", "full_text", "entry_key")
+
+_INDEX = {name: DIRECTUS_COLUMNS.index(name) for name in DIRECTUS_COLUMNS}
+_INT_INDEXES = tuple(_INDEX[name] for name in INT_COLUMNS)
+_HEAP_INDEXES = tuple(_INDEX[name] for name in HEAP_COLUMNS)
+
+
+class RecordLog:
+    """Append-only log of records (tuples in DIRECTUS_COLUMNS order, airport as ICAO).
+
+    ``append`` is safe from several threads and, where fcntl is available,
+    from several processes. Readers see records appended by others after
+    they are complete.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.heap_path = path + ".heap"
+        self._serializer = get_serializer()
+        self._lock = threading.Lock()
+        self._records_fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._heap_fd = os.open(self.heap_path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._records_mm: Optional[mmap.mmap] = None
+        self._heap_mm: Optional[mmap.mmap] = None
+        self._count = 0
+        with self._file_lock():
+            header = _HEADER.pack(MAGIC, VERSION, RECORD_SIZE)
+            size = os.fstat(self._records_fd).st_size
+            if size < _HEADER.size and os.pread(self._records_fd, size, 0) == header[:size]:
+                # New, or a crash while the header was written
+                os.ftruncate(self._records_fd, 0)
+                os.write(self._records_fd, header)
+            else:
+                stored = os.pread(self._records_fd, _HEADER.size, 0).ljust(_HEADER.size, b"\0")
+                magic, version, record_size = _HEADER.unpack(stored)
+                if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+                    self.close()
+                    raise ValueError(f"{path} is not an ATIS record log (version {VERSION})")
+            self.recovered = self._recover()
+        self._remap()
+
+    def _file_lock(self):
+        return _FileLock(self._records_fd, self._lock)
+
+    # Crash recovery
+
+    def _recover(self) -> int:
+        """Truncate both files to the last complete record; returns records dropped."""
+        size = os.fstat(self._records_fd).st_size
+        count = (size - _HEADER.size) // RECORD_SIZE
+        heap_size = os.fstat(self._heap_fd).st_size
+        dropped = 0
+        while count:
+            record = os.pread(self._records_fd, RECORD_SIZE, _HEADER.size + (count - 1) * RECORD_SIZE)
+            offset, length = _RECORD.unpack_from(record)[-2:]
+            if offset + length <= heap_size:
+                heap = os.pread(self._heap_fd, length, offset)
+                if zlib.crc32(heap, zlib.crc32(record[:_RECORD.size])) == _CRC.unpack_from(record, _RECORD.size)[0]:
+                    break
+            count -= 1
+            dropped += 1
+        heap_end = 0
+        if count:
+            record = os.pread(self._records_fd, _RECORD.size, _HEADER.size + (count - 1) * RECORD_SIZE)
+            offset, length = _RECORD.unpack(record)[-2:]
+            heap_end = offset + length
+        if size != _HEADER.size + count * RECORD_SIZE:
+            os.ftruncate(self._records_fd, _HEADER.size + count * RECORD_SIZE)
+        if heap_size != heap_end:
+            os.ftruncate(self._heap_fd, heap_end)
+        return dropped
+
+    # Appending
+
+    def _pack(self, record: Sequence) -> Tuple[tuple, bytes]:
+        ints = tuple(INT_NULL if record[i] is None else int(record[i]) for i in _INT_INDEXES)
+        fixed = (_time_value(record[_INDEX["observation_time"]]), *ints,
+                 str(record[_INDEX["airport"]]).encode("ascii"),
+                 _DIFFICULTY[record[_INDEX["difficulty"]]])
+        heap = self._serializer.dumps([record[i] for i in _HEAP_INDEXES])
+        return fixed, heap
+
+    def append(self, records: Sequence[Sequence]) -> int:
+        """Append records atomically as one block; returns the index of the first."""
+        packed = [self._pack(record) for record in records]
+        with self._file_lock():
+            # Other processes may have appended since this log was opened
+            heap_offset = os.lseek(self._heap_fd, 0, os.SEEK_END)
+            first = (os.lseek(self._records_fd, 0, os.SEEK_END) - _HEADER.size) // RECORD_SIZE
+            block = bytearray()
+            for fixed, heap in packed:
+                record = _RECORD.pack(*fixed, heap_offset, len(heap))
+                block += record
+                block += _CRC.pack(zlib.crc32(heap, zlib.crc32(record)))
+                heap_offset += len(heap)
+            # Heap first: a record never points at heap bytes that were not written
+            _write_all(self._heap_fd, b"".join(heap for _, heap in packed))
+            _write_all(self._records_fd, block)
+            # Counts this block; record() and scan() map it when they first read it
+            self._count = max(self._count, first + len(packed))
+        return first
+
+    def flush(self) -> None:
+        """Make appended records durable (fsync both files)."""
+        os.fsync(self._heap_fd)
+        os.fsync(self._records_fd)
+
+    # Reading
+
+    def _remap(self) -> None:
+        """Map the files again to see records appended since the last mapping."""
+        size = os.fstat(self._records_fd).st_size
+        heap_size = os.fstat(self._heap_fd).st_size
+        count = (size - _HEADER.size) // RECORD_SIZE
+        # Heap parts are written first, so this only skips records left by a crash
+        while count and self._heap_end(count - 1) > heap_size:
+            count -= 1
+        for mm in (self._records_mm, self._heap_mm):
+            if mm is not None:
+                mm.close()
+        self._records_mm = mmap.mmap(self._records_fd, size, access=mmap.ACCESS_READ)
+        self._heap_mm = mmap.mmap(self._heap_fd, heap_size, access=mmap.ACCESS_READ) if heap_size else None
+        self._count = count
+
+    def _ensure_mapped(self) -> None:
+        """Map appended records that the current mapping does not cover yet."""
+        if _HEADER.size + self._count * RECORD_SIZE > len(self._records_mm):
+            self._remap()
+
+    def _heap_end(self, index: int) -> int:
+        offset, length = _RECORD.unpack(os.pread(self._records_fd, _RECORD.size,
+                                                 _HEADER.size + index * RECORD_SIZE))[-2:]
+        return offset + length
+
+    def __len__(self) -> int:
+        return self._count
+
+    def refresh(self) -> int:
+        """Pick up records appended by other writers; returns the new length."""
+        if os.fstat(self._records_fd).st_size != len(self._records_mm):
+            self._remap()
+        return self._count
+
+    def _unpack(self, fields: tuple) -> tuple:
+        micros = fields[0]
+        ints = [None if value == INT_NULL else value for value in fields[1:1 + len(INT_COLUMNS)]]
+        airport, difficulty, offset, length = fields[1 + len(INT_COLUMNS):]
+        heap = self._serializer.loads(self._heap_mm[offset:offset + length])
+        values = dict(zip(INT_COLUMNS, ints))
+        values["cavok"] = None if values["cavok"] is None else bool(values["cavok"])
+        values.update(zip(HEAP_COLUMNS, heap))
+        values["airport"] = airport.decode("ascii").rstrip("\0")
+        values["difficulty"] = DIFFICULTY_CODES[difficulty]
+        values["observation_time"] = None if micros == TIME_NULL else _EPOCH + timedelta(microseconds=micros)
+        return tuple(values[name] for name in DIRECTUS_COLUMNS)
+
+    def record(self, index: int) -> tuple:
+        """Record ``index`` in DIRECTUS_COLUMNS order, read in O(1) through mmap."""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        self._ensure_mapped()
+        return self._unpack(_RECORD.unpack_from(self._records_mm, _HEADER.size + index * RECORD_SIZE))
+
+    def entry(self, index: int) -> Dict:
+        """Record ``index`` in to_directus_format shape (airport as ICAO code)."""
+        entry = dict(zip(DIRECTUS_COLUMNS, self.record(index)))
+        if entry["observation_time"] is not None:
+            entry["observation_time"] = entry["observation_time"].isoformat()
+        return entry
+
+    def scan(self, start: int = 0, stop: Optional[int] = None,
+             batch_size: int = 1000) -> Iterator[List[tuple]]:
+        """Batches of records from ``start`` in file order."""
+        self._ensure_mapped()
+        stop = self._count if stop is None else min(stop, self._count)
+        for first in range(start, stop, batch_size):
+            last = min(first + batch_size, stop)
+            block = memoryview(self._records_mm)[_HEADER.size + first * RECORD_SIZE:
+                                                 _HEADER.size + last * RECORD_SIZE]
+            try:
+                yield [self._unpack(fields[:-1])
+                       for fields in struct.iter_unpack(_RECORD.format + "I", block)]
+            finally:
+                block.release()
+
+    def close(self) -> None:
+        for mm in (self._records_mm, self._heap_mm):
+            if mm is not None:
+                mm.close()
+        self._records_mm = self._heap_mm = None
+        for fd in (self._records_fd, self._heap_fd):
+            os.close(fd)
+
+
+class _FileLock:
+    """Thread lock plus an exclusive fcntl lock on the record file."""
+
+    def __init__(self, fd: int, lock: threading.Lock):
+        self.fd = fd
+        self.lock = lock
+
+    def __enter__(self):
+        self.lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self.lock.release()
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _append_batches(path: str, batches: List[Tuple[int, str, int]]) -> int:
+    """Worker process task: generate planned batches and append them to the log."""
+    from data import DACH_AIRPORTS
+    from generator import ATISGenerator
+    from pipeline import generate_batch
+
+    generator = ATISGenerator()
+    log = RecordLog(path)
+    try:
+        for _, seed, size in batches:
+            batch = generate_batch(generator, DACH_AIRPORTS, seed, size)
+            log.append([generator.to_directus_record(atis, atis["airport"]["icao"]) for atis in batch])
+    finally:
+        log.close()
+    return sum(size for _, _, size in batches)
+
+
+def append_generated(path: str, count: int, seed: Optional[int] = None,
+                     workers: int = 1, batch_size: int = 500) -> int:
+    """Generate ``count`` entries into a record log with concurrent worker processes."""
+    from concurrent.futures import ProcessPoolExecutor
+    from journal import plan_batches
+
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    RecordLog(path).close()  # create and recover before the workers start
+    plan = plan_batches(count, batch_size, seed)
+    chunks = [plan[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(executor.map(_append_batches, [path] * workers, chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate into or inspect an ATIS record log")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="append generated entries to a log")
+    generate.add_argument("path")
+    generate.add_argument("--count", type=int, default=10000)
+    generate.add_argument("--seed", type=int)
+    generate.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    info = commands.add_parser("info", help="summarize a log and time a full scan")
+    info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        started = time.perf_counter()
+        appended = append_generated(args.path, args.count, args.seed, args.workers)
+        elapsed = time.perf_counter() - started
+        print(f"✓ Appended {appended} entries to {args.path} with {args.workers} workers "
+              f"({appended / elapsed:.0f} entries/s)")
+        return
+
+    log = RecordLog(args.path)
+    if log.recovered:
+        print(f"  ↷ Dropped {log.recovered} incomplete records")
+    size = os.path.getsize(log.path) + os.path.getsize(log.heap_path)
+    print(f"{args.path}: {len(log)} entries, {size / 1024 / 1024:.1f} MiB "
+          f"({RECORD_SIZE} bytes per record + heap)")
+    counts = {name: 0 for name in DIFFICULTY_CODES}
+    started = time.perf_counter()
+    for batch in log.scan():
+        for record in batch:
+            counts[record[_INDEX["difficulty"]]] += 1
+    elapsed = time.perf_counter() - started
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
+    if len(log):
+        print(f"  Scanned in {elapsed:.2f}s ({len(log) / elapsed:.0f} records/s)")
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
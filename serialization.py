@@ -0,0 +1,80 @@
+"""
+JSON serializers for Directus request bodies
+
+Encodes batches either from dicts or straight from compact records / columns.
+Uses orjson when it is installed and falls back to the standard library.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+try:
+    import orjson  # Optional: much faster JSON encoding with native datetime support
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode values the standard json module does not handle."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JSONSerializer:
+    """Standard library JSON encoder producing compact UTF-8 bytes."""
+
+    name = "json"
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False,
+                                         default=_default)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._encoder.encode(obj).encode("utf-8")
+
+    def dumps_records(self, columns: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+        """Encode tuple records (in ``columns`` order) as a JSON array of objects."""
+        return self.dumps([dict(zip(columns, row)) for row in rows])
+
+    def dumps_columns(self, columns: Dict[str, Sequence]) -> bytes:
+        """Encode column arrays of equal length as a JSON array of objects."""
+        names = list(columns)
+        return self.dumps_records(names, zip(*columns.values()))
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(JSONSerializer):
+    """orjson encoder; serializes datetimes natively in C."""
+
+    name = "orjson"
+
+    def __init__(self):
+        pass
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+def get_serializer(name: str = "auto") -> JSONSerializer:
+    """Get a serializer by name: "auto" (fastest available), "orjson" or "json"."""
+    if name == "orjson" or (name == "auto" and orjson is not None):
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        return OrjsonSerializer()
+    if name in ("json", "auto"):
+        return JSONSerializer()
+    raise ValueError(f"Unknown serializer: {name}")
+
+
+def compress_body(body: bytes, min_size: int = 4096, level: int = 1) -> Optional[bytes]:
+    """Gzip a request body, or return None if it is too small to be worth it."""
+    if len(body) < min_size:
+        return None
+    return gzip.compress(body, compresslevel=level, mtime=0)
@@ -0,0 +1,417 @@
+"""
+Offline export sinks for generated ATIS entries
+
+Streams the generator output into local files instead of Directus: JSON
+Lines, CSV, SQLite, the memory-mapped corpus and the binary record log.
+SQLite and corpus exports can store full_text and remarks dictionary
+compressed (textcodec.py). One generation pass can feed several sinks at
+once; each sink writes on its own thread from a bounded queue, so memory
+stays bounded by the queue sizes and the slowest sink sets the pace.
+"""
+import csv
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from config import PLAN_SEED
+from corpus import COMPRESSED_COLUMNS, CorpusWriter
+from generator import DIRECTUS_COLUMNS, ATISGenerator
+from journal import plan_batches
+from pipeline import DIFFICULTIES, generate_batch
+from profiling import StageProfiler
+from record_log import RecordLog
+from serialization import get_serializer
+from textcodec import TextCodec
+
+# Marks the end of a sink's queue
+_DONE = object()
+
+# Record columns holding lists or dicts; CSV and SQLite store them as JSON text
+JSON_COLUMNS = ("rvr", "weather_phenomena", "clouds", "active_runways")
+
+# SQLite column types in DIRECTUS_COLUMNS order ("airport" holds the ICAO code)
+SQLITE_TYPES = {
+    "airport": "TEXT", "information_letter": "TEXT", "observation_time": "TEXT",
+    "wind_direction": "INTEGER", "wind_speed": "INTEGER", "wind_gust": "INTEGER",
+    "wind_variable_from": "INTEGER", "wind_variable_to": "INTEGER",
+    "visibility_meters": "INTEGER", "rvr": "TEXT", "weather_phenomena": "TEXT",
+    "clouds": "TEXT", "cavok": "INTEGER", "temperature": "INTEGER", "dewpoint": "INTEGER",
+    "qnh": "INTEGER", "active_runways": "TEXT", "approach_type": "TEXT",
+    "transition_level": "INTEGER", "remarks": "TEXT", "full_text": "TEXT",
+    "difficulty": "TEXT", "entry_key": "TEXT UNIQUE"
+}
+
+Record = Tuple
+
+_NESTED_INDEXES = tuple(DIRECTUS_COLUMNS.index(c) for c in JSON_COLUMNS)
+_TIME_INDEX = DIRECTUS_COLUMNS.index("observation_time")
+_COMPRESSED_INDEXES = tuple(DIRECTUS_COLUMNS.index(c) for c in COMPRESSED_COLUMNS)
+
+
+def flatten_record(record: Record, dumps: Callable[[object], bytes]) -> List:
+    """Record as a flat row: nested columns as JSON text, datetimes as ISO strings."""
+    row = list(record)
+    for index in _NESTED_INDEXES:
+        if row[index] is not None:
+            row[index] = dumps(row[index]).decode("utf-8")
+    if isinstance(row[_TIME_INDEX], datetime):
+        row[_TIME_INDEX] = row[_TIME_INDEX].isoformat()
+    return row
+
+
+def create_entries_table(conn: sqlite3.Connection, table: str = "atis_entries") -> None:
+    """Create the SQLite table of exported entries if it does not exist."""
+    columns = ", ".join(f"{c} {SQLITE_TYPES[c]}" for c in DIRECTUS_COLUMNS)
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, {columns})")
+
+
+def load_text_codec(conn: sqlite3.Connection) -> Optional[TextCodec]:
+    """Codec of a database whose text columns are dictionary compressed, if any."""
+    try:
+        row = conn.execute("SELECT dictionary FROM text_codec WHERE codec = ?",
+                           (TextCodec.name,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return None if row is None else TextCodec(row[0])
+
+
+def save_text_codec(conn: sqlite3.Connection, codec: TextCodec) -> TextCodec:
+    """Store a codec's dictionary, or return the one the database already uses."""
+    conn.execute("CREATE TABLE IF NOT EXISTS text_codec (codec TEXT PRIMARY KEY, dictionary BLOB)")
+    existing = load_text_codec(conn)
+    if existing is not None:
+        return existing
+    conn.execute("INSERT INTO text_codec (codec, dictionary) VALUES (?, ?)",
+                 (codec.name, codec.dictionary))
+    return codec
+
+
+class Sink:
+    """Base class of export sinks; records are tuples in DIRECTUS_COLUMNS order."""
+
+    name = "sink"
+    # Whether reopening adds to the existing file instead of replacing it
+    appendable = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rows = 0
+
+    def open(self) -> None:
+        pass
+
+    def write(self, records: Sequence[Record]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        """Release an opened sink without finishing the export."""
+        self.close()
+
+
+class _FlatteningSink(Sink):
+    """Sink storing nested columns as JSON text and datetimes as ISO strings."""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._dumps = get_serializer().dumps
+
+    def flatten(self, record: Record) -> List:
+        return flatten_record(record, self._dumps)
+
+
+class JSONLSink(Sink):
+    """One JSON object per line."""
+
+    name = "jsonl"
+
+    def __init__(self, path: str, serializer: str = "auto", append: bool = False):
+        super().__init__(path)
+        self.serializer = get_serializer(serializer)
+        self.append = append
+        self._file = None
+
+    def open(self) -> None:
+        self._file = open(self.path, "ab" if self.append else "wb")
+
+    def write(self, records: Sequence[Record]) -> None:
+        dumps = self.serializer.dumps
+        self._file.write(b"".join(dumps(dict(zip(DIRECTUS_COLUMNS, record))) + b"\n"
+                                  for record in records))
+        self.rows += len(records)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+class CSVSink(_FlatteningSink):
+    """CSV with a header row; nested columns are JSON encoded."""
+
+    name = "csv"
+
+    def __init__(self, path: str, append: bool = False):
+        super().__init__(path)
+        self.append = append
+
+    def open(self) -> None:
+        self._file = open(self.path, "a" if self.append else "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(DIRECTUS_COLUMNS)
+
+    def write(self, records: Sequence[Record]) -> None:
+        self._writer.writerows(self.flatten(record) for record in records)
+        self.rows += len(records)
+
+    def close(self) -> None:
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+
+
+class SQLiteSink(_FlatteningSink):
+    """SQLite table written with executemany, one transaction per chunk.
+    WAL mode with synchronous=NORMAL avoids an fsync per commit; entries
+    whose entry_key is already present are ignored, so reruns of a seed
+    do not duplicate rows.
+
+    With a ``text_codec``, full_text and remarks are stored as compressed
+    BLOBs and the dictionary in the text_codec table (see load_text_codec).
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, table: str = "atis_entries",
+                 text_codec: Optional[TextCodec] = None):
+        super().__init__(path)
+        self.table = table
+        self.text_codec = text_codec
+        self._conn: Optional[sqlite3.Connection] = None
+        self._insert = (f"INSERT OR IGNORE INTO {table} ({', '.join(DIRECTUS_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(DIRECTUS_COLUMNS))})")
+
+    def open(self) -> None:
+        # Written from the sink's own thread, which is not the one opening it
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        create_entries_table(self._conn, self.table)
+        if self.text_codec is not None:
+            # Appending to an existing export keeps its dictionary
+            self.text_codec = save_text_codec(self._conn, self.text_codec)
+
+    def flatten(self, record: Record) -> List:
+        row = super().flatten(record)
+        if self.text_codec is not None:
+            for index in _COMPRESSED_INDEXES:
+                if row[index] is not None:
+                    row[index] = self.text_codec.encode(row[index])
+        return row
+
+    def write(self, records: Sequence[Record]) -> None:
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(self._insert, [self.flatten(record) for record in records])
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self.rows += len(records)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+
+
+class CorpusSink(Sink):
+    """Memory-mapped corpus file (corpus.py), published atomically on close."""
+
+    name = "corpus"
+    appendable = False
+
+    def __init__(self, path: str, text_codec: Optional[TextCodec] = None):
+        super().__init__(path)
+        self.text_codec = text_codec
+
+    def open(self) -> None:
+        self._writer = CorpusWriter(self.text_codec)
+
+    def write(self, records: Sequence[Record]) -> None:
+        self._writer.extend(records)
+        self.rows += len(records)
+
+    def close(self) -> None:
+        self._writer.publish(self.path)
+
+    def abort(self) -> None:
+        # Nothing is on disk until publish, so an existing corpus stays as it was
+        self._writer = None
+
+
+class RecordLogSink(Sink):
+    """Append-only binary record log (record_log.py); appends to an existing log."""
+
+    name = "record_log"
+
+    def open(self) -> None:
+        self._log = RecordLog(self.path)
+
+    def write(self, records: Sequence[Record]) -> None:
+        self._log.append(records)
+        self.rows += len(records)
+
+    def close(self) -> None:
+        self._log.close()
+
+
+SINKS_BY_EXTENSION = {
+    ".jsonl": JSONLSink, ".ndjson": JSONLSink, ".csv": CSVSink,
+    ".sqlite": SQLiteSink, ".sqlite3": SQLiteSink, ".db": SQLiteSink,
+    ".atis": CorpusSink, ".atislog": RecordLogSink,
+}
+
+
+def open_sink(path: str, text_codec: Optional[TextCodec] = None, append: bool = False) -> Sink:
+    """Create the sink matching a file extension (.jsonl, .csv, .sqlite/.db, .atis, .atislog).
+
+    ``text_codec`` applies to the SQLite and corpus sinks; JSON Lines and CSV
+    stay plain text. With ``append``, JSON Lines and CSV files are extended
+    instead of replaced (SQLite and record logs always append).
+    """
+    for extension, sink_class in SINKS_BY_EXTENSION.items():
+        if path.lower().endswith(extension):
+            if sink_class in (SQLiteSink, CorpusSink):
+                return sink_class(path, text_codec=text_codec)
+            if sink_class in (JSONLSink, CSVSink):
+                return sink_class(path, append=append)
+            return sink_class(path)
+    raise ValueError(f"No export sink for {path} (use one of {', '.join(SINKS_BY_EXTENSION)})")
+
+
+class SinkWriters:
+    """One writer thread per sink, each fed from its own bounded queue.
+
+    Chunks are shared read-only by all sinks. A sink that fails stops
+    writing but keeps draining its queue, so producers never block on it.
+    """
+
+    def __init__(self, sinks: List[Sink], queue_size: int = 8):
+        self.sinks = sinks
+        self.errors: List[str] = []
+        self.stats: Dict[str, Dict] = {}
+        self._inboxes = [queue.Queue(maxsize=queue_size) for _ in sinks]
+        self._threads = [threading.Thread(target=self._drain, args=(sink, inbox), daemon=True)
+                         for sink, inbox in zip(sinks, self._inboxes)]
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Open every sink and start the writers; if a sink fails to open,
+        the sinks opened before it are aborted and the error is raised.
+        """
+        opened = []
+        try:
+            for sink in self.sinks:
+                sink.open()
+                opened.append(sink)
+        except BaseException:
+            for sink in reversed(opened):
+                sink.abort()
+            raise
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, records: List[Record], on_written: Optional[Callable[[], None]] = None) -> None:
+        """Queue a chunk for every sink; ``on_written`` runs once all of them wrote it."""
+        pending = [len(self.sinks)] if on_written is not None else None
+        for inbox in self._inboxes:
+            inbox.put((records, pending, on_written))
+
+    def _drain(self, sink: Sink, inbox: queue.Queue) -> None:
+        """Writer thread: write chunks until the end marker; keep draining after errors."""
+        busy = 0.0
+        failed = False
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if failed:
+                continue
+            records, pending, on_written = item
+            started = time.perf_counter()
+            try:
+                sink.write(records)
+            except Exception as e:
+                failed = True
+                with self._lock:
+                    self.errors.append(f"{sink.name} {sink.path}: {e}")
+                continue
+            finally:
+                busy += time.perf_counter() - started
+            if pending is not None:
+                with self._lock:
+                    pending[0] -= 1
+                    written = pending[0] == 0
+                if written:
+                    on_written()
+        self.stats[sink.path] = {"rows": sink.rows, "busy_s": busy}
+
+    def close(self) -> None:
+        """Wait for every queued chunk to be written, then close the sinks."""
+        for inbox in self._inboxes:
+            inbox.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+        for sink in self.sinks:
+            sink.close()
+
+
+class ExportPipeline:
+    """Generates ATIS entries once and fans every batch out to several sinks."""
+
+    def __init__(self, sinks: List[Sink], airports: List[Dict], batch_size: int = 500,
+                 queue_size: int = 8, profiler: Optional[StageProfiler] = None):
+        self.sinks = sinks
+        self.airports = airports
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.profiler = profiler
+        self.stats = {
+            "generated": 0,
+            "difficulty_counts": {d: 0 for d in DIFFICULTIES},
+            "sinks": {},
+            "errors": []
+        }
+
+    def run(self, count: int, seed: Optional[int] = None) -> Dict:
+        """Generate ``count`` entries into every sink and return the run statistics."""
+        if seed is None:
+            seed = PLAN_SEED
+        generator = ATISGenerator(profiler=self.profiler)
+        writers = SinkWriters(self.sinks, self.queue_size)
+
+        started = time.perf_counter()
+        writers.start()
+        try:
+            for _, batch_seed, size in plan_batches(count, self.batch_size, seed):
+                batch = generate_batch(generator, self.airports, batch_seed, size)
+                # Records are built once and shared read-only by all sinks
+                writers.put([generator.to_directus_record(atis, atis["airport"]["icao"])
+                             for atis in batch])
+
+                self.stats["generated"] += len(batch)
+                for atis in batch:
+                    self.stats["difficulty_counts"][atis["difficulty"]] += 1
+                if self.stats["generated"] % 10000 < len(batch):
+                    print(f"  Generated {self.stats['generated']} entries...")
+        finally:
+            writers.close()
+
+        self.stats["sinks"] = writers.stats
+        self.stats["errors"] = writers.errors
+        self.stats["seed"] = seed
+        self.stats["elapsed_s"] = time.perf_counter() - started
+        return self.stats
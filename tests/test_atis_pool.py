@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from atis_pool import ATISPool
+from data import DACH_AIRPORTS
+
+
+def wait_for_entry(pool: ATISPool, difficulty: str, airport: str, timeout: float = 10.0):
+    """Poll try_get until the refill thread has filled the airport's buffer."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        entry = pool.try_get(difficulty, airport)
+        if entry is not None:
+            return entry
+        time.sleep(0.01)
+    raise AssertionError(f"no pooled entry for {difficulty}/{airport}")
+
+
+def test_pooled_entries_are_rendered():
+    pool = ATISPool(DACH_AIRPORTS, difficulties=["medium"], capacity=4, low_water=2, seed=1).start()
+    try:
+        icao = DACH_AIRPORTS[0]["icao"]
+        entries = [pool.try_get("medium") for _ in range(4)]
+        entries.append(wait_for_entry(pool, "medium", icao))
+    finally:
+        pool.stop()
+
+    assert all(entry is not None for entry in entries)
+    # In the dict without a render() call: rendered when filling, not on the request
+    assert all(entry.get("full_text") for entry in entries)
+    assert entries[-1]["airport"]["icao"] == icao
+    assert pool.stats()["hits"] >= 5
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.tasks = 0
+
+    def submit(self, fn, *args, **kwargs):
+        self.tasks += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_refills_run_on_the_executor():
+    with CountingExecutor() as executor:
+        pool = ATISPool(DACH_AIRPORTS, difficulties=["hard"], capacity=8, low_water=4, seed=2,
+                        executor=executor).start()
+        try:
+            icao = DACH_AIRPORTS[1]["icao"]
+            entries = [pool.try_get("hard") for _ in range(8)]
+            entries.append(wait_for_entry(pool, "hard", icao))
+        finally:
+            pool.stop()
+
+    assert executor.tasks >= 2
+    # Executor results are plain dicts with the text already rendered
+    assert all(type(entry) is dict and entry["full_text"] for entry in entries)
+    assert entries[-1]["difficulty"] == "hard"
@@ -0,0 +1,62 @@
+from corpus import INT_COLUMNS, INT_NULL, Corpus, CorpusHandle, CorpusWriter, _time_value
+from data import DACH_AIRPORTS
+from generator import DIRECTUS_COLUMNS, ATISGenerator
+from pipeline import generate_batch
+
+
+def make_records(count: int, seed: str = "1-0"):
+    generator = ATISGenerator()
+    return [generator.to_directus_record(atis, atis["airport"]["icao"])
+            for atis in generate_batch(generator, DACH_AIRPORTS, seed, count)]
+
+
+def publish(path: str, records) -> None:
+    writer = CorpusWriter()
+    writer.extend(records)
+    writer.publish(path)
+
+
+def test_columns_read_back_through_mmap(tmp_path):
+    path = str(tmp_path / "corpus.atis")
+    records = make_records(20)
+    publish(path, records)
+
+    corpus = Corpus(path)
+    try:
+        assert len(corpus) == 20
+        for name in INT_COLUMNS:
+            expected = [INT_NULL if r[DIRECTUS_COLUMNS.index(name)] is None
+                        else int(r[DIRECTUS_COLUMNS.index(name)]) for r in records]
+            assert corpus.column(name).tolist() == expected
+        times = [_time_value(r[DIRECTUS_COLUMNS.index("observation_time")]) for r in records]
+        assert corpus.column("observation_time").tolist() == times
+
+        for row, record in enumerate(records):
+            entry = corpus.entry(row)
+            for name in ("airport", "difficulty", "full_text", "remarks", "entry_key",
+                         "clouds", "active_runways"):
+                assert entry[name] == record[DIRECTUS_COLUMNS.index(name)]
+        hard = list(corpus.ids(difficulty="hard"))
+        assert all(corpus.entry(row)["difficulty"] == "hard" for row in hard)
+    finally:
+        corpus.close()
+
+
+def test_handle_swaps_to_republished_corpus(tmp_path):
+    path = str(tmp_path / "corpus.atis")
+    publish(path, make_records(5))
+    handle = CorpusHandle(path, check_interval=0)
+    try:
+        first = handle.current()
+        assert len(first) == 5 and handle.swaps == 0
+
+        publish(path, make_records(8, "2-0"))
+        second = handle.current()
+        assert handle.swaps == 1
+        assert len(second) == 8
+        assert second.entry(0)["entry_key"] == "2-0-0"
+        # The replaced corpus stays readable until the next swap
+        assert first.entry(0)["entry_key"] == "1-0-0"
+        assert handle.current() is second
+    finally:
+        handle.close()
@@ -0,0 +1,74 @@
+import json
+import pickle
+import random
+from generator import ATISGenerator, RenderCache
+
+
+def counting_generator(seed: int, render_cache: RenderCache = None):
+    """Generator whose generate_full_text calls are counted in ``calls``."""
+    generator = ATISGenerator(rng=random.Random(seed), render_cache=render_cache)
+    calls = []
+    generate_full_text = generator.generate_full_text
+
+    def counted(airport, data):
+        calls.append(data)
+        return generate_full_text(airport, data)
+
+    generator.generate_full_text = counted
+    return generator, calls
+
+
+def test_structured_fields_do_not_render():
+    generator, calls = counting_generator(1)
+    entries = [generator.generate_atis(difficulty="hard") for _ in range(20)]
+    for entry in entries:
+        assert entry["wind"] and entry["qnh"]
+        assert "full_text" not in entry
+        assert "full_text" not in json.loads(json.dumps(entry, default=str))
+    assert calls == []
+
+
+def test_render_stores_full_text():
+    generator, calls = counting_generator(2)
+    entry = generator.generate_atis()
+    text = entry.render()
+    assert text.startswith(entry["airport"]["name"])
+    assert entry["full_text"] == dict(entry)["full_text"] == text
+    assert entry.render() == text
+    assert len(calls) == 1
+
+
+def test_serializers_render_unrendered_entries():
+    generator, calls = counting_generator(3)
+    entry = generator.generate_atis()
+    record = generator.to_directus_format(entry, 1)
+    assert record["full_text"] == entry["full_text"]
+    assert generator.to_directus_record(entry, 1)[20] == record["full_text"]
+    assert pickle.loads(pickle.dumps(generator.generate_atis()))["full_text"]
+    assert len(calls) == 2
+
+
+def test_identical_entries_render_once():
+    cache = RenderCache()
+    first, first_calls = counting_generator(4, cache)
+    second, second_calls = counting_generator(4, cache)
+    a = first.generate_atis()
+    b = second.generate_atis()
+    # observation_time is relative to now; pin it so both entries are identical
+    b["observation_time"] = a["observation_time"]
+
+    assert a.render() == b.render()
+    assert len(first_calls) + len(second_calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_render_cache_is_bounded():
+    cache = RenderCache(maxsize=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert cache.get("a") is None
+    assert cache.get("c") == "C"
+
+    disabled = RenderCache(maxsize=0)
+    disabled.put("a", "A")
+    assert disabled.get("a") is None
@@ -0,0 +1,63 @@
+from typing import Dict, List, Set
+from data import DACH_AIRPORTS
+from journal import UploadJournal, entry_key, plan_batches
+from pipeline import UploadPipeline
+from serialization import get_serializer
+
+
+class RecordingClient:
+    """Stands in for DirectusClient: keeps the uploaded entries, failing chosen batches."""
+
+    def __init__(self, fail_keys: Set[str] = frozenset()):
+        self.serializer = get_serializer("json")
+        self.fail_keys = fail_keys
+        self.entries: Dict[str, str] = {}
+
+    def insert_encoded(self, collection: str, body: bytes, count: int) -> bool:
+        rows = self.serializer.loads(body)
+        if any(row["entry_key"] in self.fail_keys for row in rows):
+            return False
+        self.entries.update((row["entry_key"], row["full_text"]) for row in rows)
+        return True
+
+
+def upload(client: RecordingClient, journal: UploadJournal, run_id: int, batches: List) -> Dict:
+    mapping = {a["icao"]: i for i, a in enumerate(DACH_AIRPORTS, 1)}
+    pipeline = UploadPipeline(client, mapping, DACH_AIRPORTS, batch_size=10,
+                              journal=journal, run_id=run_id, skip_existing=False)
+    return pipeline.run_plan(batches)
+
+
+def test_plan_is_deterministic():
+    batches = plan_batches(25, 10, 7)
+    assert batches == plan_batches(25, 10, 7)
+    assert batches == [(0, "7-0", 10), (1, "7-1", 10), (2, "7-2", 5)]
+    assert entry_key("7-2", 4) == "7-2-4"
+
+
+def test_resumed_run_skips_journaled_batches(tmp_path):
+    journal = UploadJournal(str(tmp_path / "journal.sqlite"))
+    run_id, batches = journal.start_run(30, 10, seed=3)
+
+    # Batch 1 is rejected, so the run stays incomplete
+    interrupted = RecordingClient(fail_keys={entry_key("3-1", 0)})
+    upload(interrupted, journal, run_id, batches)
+    assert not journal.finish_run(run_id)
+
+    run = journal.latest_incomplete_run()
+    assert run["id"] == run_id
+    pending = journal.pending_batches(run_id)
+    assert [index for index, _, _ in pending] == [1]
+
+    resumed = RecordingClient()
+    stats = upload(resumed, journal, run_id, pending)
+    assert stats["uploaded"] == 10
+    assert sorted(resumed.entries) == sorted(entry_key("3-1", p) for p in range(10))
+    assert journal.finish_run(run_id)
+    assert journal.latest_incomplete_run() is None
+
+    # The same seed reproduces the same keys and entries in a single run
+    complete = RecordingClient()
+    upload(complete, journal, *journal.start_run(30, 10, seed=3))
+    assert complete.entries == {**interrupted.entries, **resumed.entries}
+    journal.close()
@@ -0,0 +1,102 @@
+import os
+from data import DACH_AIRPORTS
+from generator import ATISGenerator
+from pipeline import generate_batch
+from record_log import RECORD_SIZE, RecordLog
+
+
+def make_records(count: int, seed: str = "1-0"):
+    generator = ATISGenerator()
+    return [generator.to_directus_record(atis, atis["airport"]["icao"])
+            for atis in generate_batch(generator, DACH_AIRPORTS, seed, count)]
+
+
+def write_log(path: str, records) -> None:
+    log = RecordLog(path)
+    log.append(records)
+    log.close()
+
+
+def test_append_updates_length(tmp_path):
+    records = make_records(5)
+    log = RecordLog(str(tmp_path / "atis.atislog"))
+    try:
+        assert log.append(records[:3]) == 0
+        assert len(log) == 3
+        assert log.append(records[3:]) == 3
+        assert len(log) == 5
+        assert log.record(4)[-1] == records[4][-1]
+        assert [record for batch in log.scan(batch_size=2) for record in batch][3] == log.record(3)
+    finally:
+        log.close()
+
+
+def test_truncated_header_starts_an_empty_log(tmp_path):
+    path = str(tmp_path / "atis.atislog")
+    write_log(path, make_records(2))
+    with open(path, "r+b") as f:
+        f.truncate(10)
+
+    log = RecordLog(path)
+    try:
+        assert len(log) == 0
+        assert os.path.getsize(log.heap_path) == 0
+        log.append(make_records(1))
+        assert len(log) == 1
+    finally:
+        log.close()
+
+
+def test_partial_record_is_dropped(tmp_path):
+    path = str(tmp_path / "atis.atislog")
+    records = make_records(3)
+    write_log(path, records)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - RECORD_SIZE // 2)
+
+    expected = str(tmp_path / "expected.atislog")
+    write_log(expected, records[:2])
+
+    log = RecordLog(path)
+    try:
+        # The half-written record is cut off; the heap part it pointed to goes with it
+        assert log.recovered == 0
+        assert len(log) == 2
+        assert log.record(1) == tuple(records[1])
+        assert os.path.getsize(log.heap_path) == os.path.getsize(expected + ".heap")
+    finally:
+        log.close()
+
+
+def test_corrupt_record_is_dropped(tmp_path):
+    path = str(tmp_path / "atis.atislog")
+    write_log(path, make_records(3))
+    with open(path + ".heap", "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"!!")
+
+    log = RecordLog(path)
+    try:
+        assert log.recovered == 1
+        assert len(log) == 2
+    finally:
+        log.close()
+
+
+def test_heap_past_the_last_record_is_truncated(tmp_path):
+    path = str(tmp_path / "atis.atislog")
+    write_log(path, make_records(2))
+    heap_size = os.path.getsize(path + ".heap")
+    # A crash between writing the heap and the records of a block
+    with open(path + ".heap", "ab") as f:
+        f.write(b'["orphaned heap part"]')
+
+    log = RecordLog(path)
+    try:
+        assert log.recovered == 0
+        assert len(log) == 2
+        assert os.path.getsize(log.heap_path) == heap_size
+        assert log.append(make_records(1, "1-1")) == 2
+        assert log.record(2)[-1] == "1-1-0"
+    finally:
+        log.close()
@@ -0,0 +1,39 @@
+from corpus import Corpus, CorpusWriter
+from data import DACH_AIRPORTS
+from generator import ATISGenerator
+from pipeline import generate_batch
+from textcodec import MAX_DICTIONARY_SIZE, TextCodec, build_dictionary
+
+
+def sample_texts(count: int = 20, seed: str = "1-0"):
+    generator = ATISGenerator()
+    return [atis.render() for atis in generate_batch(generator, DACH_AIRPORTS, seed, count)]
+
+
+def test_round_trip_with_a_rebuilt_dictionary():
+    texts = sample_texts()
+    encoded = [TextCodec(build_dictionary(samples=50)).encode(text) for text in texts]
+
+    # The dictionary is rebuilt from the same seed, so a fresh codec decodes the values
+    rebuilt = TextCodec(build_dictionary(samples=50))
+    assert [rebuilt.decode(data) for data in encoded] == texts
+    assert sum(map(len, encoded)) < sum(len(text.encode("utf-8")) for text in texts)
+    assert len(rebuilt.dictionary) <= MAX_DICTIONARY_SIZE
+
+
+def test_corpus_decodes_with_its_stored_dictionary(tmp_path):
+    path = str(tmp_path / "corpus.atis")
+    generator = ATISGenerator()
+    entries = generate_batch(generator, DACH_AIRPORTS, "1-0", 10)
+    writer = CorpusWriter(TextCodec(build_dictionary(samples=50, seed=1)))
+    writer.extend(generator.to_directus_record(atis, atis["airport"]["icao"]) for atis in entries)
+    writer.publish(path)
+
+    corpus = Corpus(path)
+    try:
+        # A dictionary built differently now does not matter: the corpus carries its own
+        assert corpus.text_codec.dictionary != build_dictionary(samples=50)
+        assert corpus.text_sizes("full_text")[1]
+        assert [corpus.text("full_text", row) for row in range(10)] == [atis.render() for atis in entries]
+    finally:
+        corpus.close()
@@ -0,0 +1,129 @@
+"""
+Dictionary compression for ATIS text columns
+
+full_text and remarks repeat the same phraseology in every entry (airport
+names, "information", "Recorded at", "Expect ILS approach", "Advise on
+initial contact you have information ..."). Each value is compressed on
+its own with raw deflate and a preset zlib dictionary of that phraseology,
+so single entries still decompress independently (random access) while
+sharing the redundancy of the whole corpus.
+
+The dictionary is stored alongside the compressed data, so files stay
+readable when the generator's wording changes.
+
+    python textcodec.py --count 20000
+"""
+import argparse
+import random
+import time
+import zlib
+from typing import Sequence
+from data import REMARKS_BY_DIFFICULTY
+
+# zlib only uses the last 32 KiB of a preset dictionary
+MAX_DICTIONARY_SIZE = 32 * 1024
+_WBITS = -15  # raw deflate: no zlib header or checksum per value
+
+
+def build_dictionary(samples: int = 400, seed: int = 0) -> bytes:
+    """Preset dictionary from the generator's phraseology.
+
+    Airport names and all remarks come first; rendered sample texts of
+    every difficulty fill the end, where deflate reaches them with the
+    shortest distances.
+    """
+    from data import DACH_AIRPORTS
+    from generator import ATISGenerator
+    from pipeline import DIFFICULTIES
+
+    names = sorted({a["name"] for a in DACH_AIRPORTS})
+    remarks = sorted({r for rs in REMARKS_BY_DIFFICULTY.values() for r in rs})
+    parts = [" ".join(names), ". ".join(remarks)]
+
+    generator = ATISGenerator(rng=random.Random(seed))
+    for index in range(samples):
+        parts.append(generator.generate_atis(difficulty=DIFFICULTIES[index % len(DIFFICULTIES)]).render())
+
+    dictionary = " ".join(parts).encode("utf-8")
+    return dictionary[-MAX_DICTIONARY_SIZE:]
+
+
+class TextCodec:
+    """Per-value raw deflate with a preset dictionary."""
+
+    name = "zlib-dict"
+
+    def __init__(self, dictionary: bytes, level: int = 9):
+        self.dictionary = bytes(dictionary)
+        self.level = level
+        # Primed once; copies skip re-hashing the dictionary for every value
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS, 9,
+                                            zlib.Z_DEFAULT_STRATEGY, self.dictionary)
+        self._decompressor = zlib.decompressobj(_WBITS, zdict=self.dictionary)
+
+    @classmethod
+    def default(cls) -> "TextCodec":
+        return cls(build_dictionary())
+
+    def encode(self, text: str) -> bytes:
+        compressor = self._compressor.copy()
+        return compressor.compress(text.encode("utf-8")) + compressor.flush()
+
+    def decode(self, data) -> str:
+        decompressor = self._decompressor.copy()
+        return (decompressor.decompress(data) + decompressor.flush()).decode("utf-8")
+
+
+def measure(codec: TextCodec, texts: Sequence[str]) -> dict:
+    """Compression ratio and decode throughput of a codec on sample texts."""
+    raw_size = sum(len(t.encode("utf-8")) for t in texts)
+    started = time.perf_counter()
+    encoded = [codec.encode(t) for t in texts]
+    encode_s = time.perf_counter() - started
+    started = time.perf_counter()
+    for data in encoded:
+        codec.decode(data)
+    decode_s = time.perf_counter() - started
+
+    plain_size = sum(len(zlib.compress(t.encode("utf-8"), 9)) - 6 for t in texts)
+    compressed_size = sum(len(d) for d in encoded)
+    return {
+        "entries": len(texts),
+        "raw_bytes": raw_size,
+        "compressed_bytes": compressed_size,
+        "ratio": raw_size / compressed_size,
+        "ratio_without_dictionary": raw_size / plain_size,
+        "encode_entries_per_s": len(texts) / encode_s,
+        "decode_entries_per_s": len(texts) / decode_s,
+        "decode_mb_per_s": raw_size / decode_s / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dictionary compression of full_text")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42, help="seed of the measured entries")
+    args = parser.parse_args()
+
+    from generator import ATISGenerator
+    from pipeline import DIFFICULTIES, DIFFICULTY_WEIGHTS
+
+    rng = random.Random(args.seed)
+    generator = ATISGenerator(rng=rng)
+    entries = [generator.generate_atis(difficulty=rng.choices(DIFFICULTIES, DIFFICULTY_WEIGHTS)[0])
+               for _ in range(args.count)]
+
+    codec = TextCodec.default()
+    print(f"Dictionary: {len(codec.dictionary)} bytes")
+    columns = {"full_text": [e.render() for e in entries],
+               "remarks": [e["remarks"] for e in entries if e["remarks"]]}
+    for column, texts in columns.items():
+        result = measure(codec, texts)
+        print(f"{column}: {result['raw_bytes'] / 1e6:.1f} MB -> {result['compressed_bytes'] / 1e6:.2f} MB, "
+              f"ratio {result['ratio']:.1f}x (plain zlib per entry {result['ratio_without_dictionary']:.1f}x), "
+              f"decode {result['decode_entries_per_s']:.0f} entries/s ({result['decode_mb_per_s']:.0f} MB/s), "
+              f"encode {result['encode_entries_per_s']:.0f} entries/s")
+
+
+if __name__ == "__main__":
+    main()